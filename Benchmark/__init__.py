@@ -0,0 +1 @@
+"""基于假META程序与合成模型的性能基准测试"""
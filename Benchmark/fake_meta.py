@@ -0,0 +1,303 @@
+"""
+假META后处理程序：按meta_post64.sh的调用方式（-b -noses -fastses -exec "命令1;命令2;..."）解析命令，
+基于合成模型描述生成META_post.log、多工况CSV与PNG截图，用于在无许可证环境下测量性能
+
+延迟参数（环境变量，单位秒）：
+    FAKE_META_STARTUP_DELAY   启动及加载许可证耗时（默认0.2）
+    FAKE_META_COMMAND_DELAY   每条命令的耗时（默认0）
+    FAKE_META_ROW_DELAY       CSV每输出一百万行的额外耗时（默认0）
+    FAKE_META_PNG_DELAY       每张截图的额外渲染耗时（默认0）
+"""
+import os
+import re
+import sys
+import time
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import load_spec, state_values
+
+STARTUP_DELAY = float(os.environ.get("FAKE_META_STARTUP_DELAY", 0.2))
+COMMAND_DELAY = float(os.environ.get("FAKE_META_COMMAND_DELAY", 0))
+ROW_DELAY = float(os.environ.get("FAKE_META_ROW_DELAY", 0))
+PNG_DELAY = float(os.environ.get("FAKE_META_PNG_DELAY", 0))
+DEFAULT_WINDOW_SIZE = (1600, 1000)
+CSV_CHUNK_ROWS = 500000
+
+
+class FakeSession:
+    """单次META批处理会话的状态"""
+
+    def __init__(self):
+        self.spec = None
+        self.loaded = False
+        self.state = 0
+        self.window_size = DEFAULT_WINDOW_SIZE
+        self.visible_elements: Optional[np.ndarray] = None
+        # 全量导出（identify lres）的工况范围（None为全部）及关闭的节点坐标输出项
+        self.export_states: Optional[List[int]] = None
+        self.export_excluded: set = set()
+        self.node_options_off: set = set()
+        self.log: List[str] = []
+
+    # ---------- 模型数据 ----------
+    def element_pids(self) -> np.ndarray:
+        n = self.spec["n_elements"]
+        return (np.arange(n) * self.spec["n_parts"] // n) + 1
+
+    def element_nodes(self, elements: np.ndarray) -> np.ndarray:
+        """单元（0起始下标）包含的节点（0起始下标）"""
+        nx, _ = self.spec["grid"]
+        first = (elements // (nx - 1)) * nx + elements % (nx - 1)
+        return np.unique(np.concatenate([first, first + 1, first + nx, first + nx + 1]))
+
+    def node_coords(self) -> np.ndarray:
+        nx, ny = self.spec["grid"]
+        xs, ys = np.meshgrid(np.arange(nx) * 10.0, np.arange(ny) * 10.0)
+        return np.column_stack([xs.ravel(), ys.ravel(), np.zeros(nx * ny)])
+
+    def part_elements(self, pids: List[int]) -> np.ndarray:
+        return np.flatnonzero(np.isin(self.element_pids(), pids))
+
+    @staticmethod
+    def parse_names(text: str, prefix: str) -> List[int]:
+        """从名称列表（如PART_3,MAT_1）中解析编号，无法识别的名称忽略"""
+        return [int(m.group(1)) for m in re.finditer(rf"{prefix}_(\d+)", text)]
+
+    # ---------- 命令执行 ----------
+    def execute(self, command: str) -> None:
+        handlers = [
+            (r'read geom \w+ (.+)$', self.read_geom),
+            (r'read (?:dis|onlyfun) \w+ (\S+) all\s*(.*)$', self.read_results),
+            (r'options state "(\d+)"', self.set_state),
+            (r'options message "(.*)"$', lambda text: self.log.append(text)),
+            (r'identify advfilter (\w+) add:(\w+):([\w.]+):(.+):Keep All', self.advfilter),
+            (r'identify outopts multistates include (.+)$', self.set_export_states),
+            (r'identify outopts multistates exclude (.+)$', self.exclude_export_states),
+            (r'identify node outopts (origpos[xyz]) (on|off)$', self.set_node_option),
+            (r'identify (node|element) lres (all|visible) "(.+)"', self.export_csv),
+            (r'erase (all|none)', self.erase),
+            (r'add (pid|mid|ansapart|set)( name)? (.+)$', self.add),
+            (r'function info( nodal)? visible', self.function_info),
+            (r'identify (loads|spc|ansapart|part|mid|set)\b\s*(.*)$', self.identify_model),
+            (r'window resize "MetaPost" (\d+),(\d+)', self.resize),
+            (r'write png "(.+)"', self.write_png),
+            (r"echo '(.*)'", lambda text: self.log.append(text)),
+        ]
+        for pattern, handler in handlers:
+            match = re.match(pattern, command)
+            if match:
+                handler(*match.groups())
+                return
+        self.log.append(f"> {command}")
+
+    def read_geom(self, path: str) -> None:
+        path = path.strip()
+        try:
+            self.spec = load_spec(path)
+        except OSError:
+            self.log.append(f"ERROR: Could not read file {path}")
+            return
+        self.log.append(f"Reading geometry file: {path}")
+        self.log.append(f"Nodes: {self.spec['n_nodes']}  Elements: {self.spec['n_elements']}  "
+                        f"Properties: {self.spec['n_parts']}  Materials: {self.spec['n_materials']}")
+
+    def read_results(self, path: str, function: str) -> None:
+        if self.spec is None:
+            self.log.append(f"ERROR: No model loaded, cannot read results {path}")
+            return
+        self.log.append(f"Reading results {function or 'Deformations'} from {path}")
+        for label in self.spec["states"]:
+            self.log.append(f'Reading "{label}"')
+        self.loaded = True
+
+    def set_state(self, state: str) -> None:
+        if self.spec is None:
+            return
+        self.state = min(int(state), len(self.spec["states"]) - 1)
+        self.log.append(f'Current state: "{self.spec["states"][self.state]}"')
+
+    def advfilter(self, output_type: str, entity_name: str, param: str, entities: str) -> None:
+        if not self.loaded:
+            self.log.append("ERROR: No results loaded")
+            return
+        by_name = param == "name"
+        if entity_name in ("Nodes", "Elements"):
+            entity = "node" if entity_name == "Nodes" else "element"
+            values = state_values(self.spec, entity, self.state)
+            ids = [int(i) for i in re.findall(r"\d+", entities)] if not by_name else []
+            for entity_id in ids:
+                if 1 <= entity_id <= len(values):
+                    self.log.append(f"{entity_name[:-1]} {entity_id:>10d} : FunctionTop = {values[entity_id - 1]:.6E}")
+                else:
+                    self.log.append(f"{entity_name[:-1]} {entity_id} not found")
+            return
+        # 属性/材料/集合：输出所含单元的最大结果
+        if entity_name == "Materials":
+            mids = self.parse_names(entities, "MAT") if by_name else [int(i) for i in re.findall(r"\d+", entities)]
+            pids = [p for p in range(1, self.spec["n_parts"] + 1) if (p - 1) % self.spec["n_materials"] + 1 in mids]
+        else:
+            pids = self.parse_names(entities, "PART") if by_name else [int(i) for i in re.findall(r"\d+", entities)]
+        values = state_values(self.spec, "element", self.state)
+        element_pids = self.element_pids()
+        for pid in pids:
+            elements = np.flatnonzero(element_pids == pid)
+            if len(elements) == 0:
+                self.log.append(f"{entity_name[:-1]} {pid} not found")
+                continue
+            top = elements[np.argmax(values[elements])]
+            self.log.append(f"{entity_name[:-1]} {pid} (PART_{pid}): Max FunctionTop = {values[top]:.6E} "
+                            f"at Element {top + 1}")
+
+    def set_export_states(self, states: str) -> None:
+        self.export_states = None if states.strip() == "all" else [int(i) for i in re.findall(r"\d+", states)]
+
+    def exclude_export_states(self, states: str) -> None:
+        self.export_excluded.update(int(i) for i in re.findall(r"\d+", states))
+
+    def set_node_option(self, option: str, value: str) -> None:
+        if value == "off":
+            self.node_options_off.add(option)
+        else:
+            self.node_options_off.discard(option)
+
+    def export_csv(self, entity: str, scope: str, path: str) -> None:
+        if not self.loaded:
+            self.log.append("ERROR: No results loaded")
+            return
+        # 仅导出指定工况及可见实体（visible）
+        states = [state for state in (range(len(self.spec["states"])) if self.export_states is None else self.export_states)
+                  if 0 <= state < len(self.spec["states"]) and state not in self.export_excluded]
+        index = None
+        if scope == "visible" and self.visible_elements is not None:
+            index = self.element_nodes(self.visible_elements) if entity == "node" else self.visible_elements
+        n_rows = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for state in states:
+                label = self.spec["states"][state]
+                values = state_values(self.spec, entity, state)
+                if entity == "node":
+                    coords = self.node_coords()
+                    disp = values[:, None] * np.array([[0.001, 0.002, 0.0005]], dtype=np.float32)
+                    frame = pd.DataFrame({
+                        "Id": np.arange(1, len(values) + 1),
+                        "origPosx": coords[:, 0], "origPosy": coords[:, 1], "origPosz": coords[:, 2],
+                        "Dispx": disp[:, 0], "Dispy": disp[:, 1], "Dispz": disp[:, 2],
+                        "Disptotal": np.linalg.norm(disp, axis=1),
+                        "FunctionTop": values,
+                    })
+                else:
+                    pids = self.element_pids()
+                    frame = pd.DataFrame({
+                        "Id": np.arange(1, len(values) + 1),
+                        "Pid": pids,
+                        "PidName": [f"PART_{p}" for p in pids],
+                        "FunctionTop": values,
+                    })
+                if entity == "node" and self.node_options_off:
+                    frame = frame.drop(columns=[f"origPos{option[-1]}" for option in self.node_options_off])
+                if index is not None:
+                    frame = frame.iloc[index].reset_index(drop=True)
+                # META输出的每行末尾带一个多余的逗号
+                frame[""] = ""
+                f.write(f"{label},\n")
+                f.write(",".join(frame.columns) + "\n")
+                for start in range(0, len(frame), CSV_CHUNK_ROWS):
+                    frame.iloc[start:start + CSV_CHUNK_ROWS].to_csv(f, header=False, index=False, float_format="%.6g")
+                n_rows += len(frame)
+        time.sleep(ROW_DELAY * n_rows / 1e6)
+        self.log.append(f'Writing {n_rows} {entity} results to "{path}"')
+
+    def erase(self, what: str) -> None:
+        if self.spec is not None:
+            self.visible_elements = np.array([], dtype=np.int64) if what == "all" else None
+
+    def add(self, kind: str, by_name: Optional[str], entities: str) -> None:
+        if self.spec is None:
+            return
+        if kind == "mid":
+            mids = self.parse_names(entities, "MAT") if by_name else [int(i) for i in re.findall(r"\d+", entities)]
+            pids = [p for p in range(1, self.spec["n_parts"] + 1) if (p - 1) % self.spec["n_materials"] + 1 in mids]
+        else:
+            pids = self.parse_names(entities, "PART") if by_name else [int(i) for i in re.findall(r"\d+", entities)]
+        elements = self.part_elements(pids)
+        current = self.visible_elements if self.visible_elements is not None else np.array([], dtype=np.int64)
+        self.visible_elements = np.union1d(current, elements)
+        self.log.append(f"Added {len(elements)} elements of {kind} {entities}")
+
+    def function_info(self, nodal: Optional[str]) -> None:
+        if not self.loaded:
+            self.log.append("ERROR: No results loaded")
+            return
+        entity = "node" if nodal else "element"
+        values = state_values(self.spec, entity, self.state)
+        if self.visible_elements is None:
+            index = np.arange(len(values))
+        elif nodal:
+            index = self.element_nodes(self.visible_elements)
+        else:
+            index = self.visible_elements
+        if len(index) == 0:
+            self.log.append("Function info: no visible entities")
+            return
+        top, bottom = index[np.argmax(values[index])], index[np.argmin(values[index])]
+        name = "Node" if nodal else "Element"
+        self.log.append(f"Function info ({self.spec['states'][self.state]}): "
+                        f"Max = {values[top]:.6E} at {name} {top + 1}, Min = {values[bottom]:.6E} at {name} {bottom + 1}")
+
+    def identify_model(self, info_type: str, entities: str) -> None:
+        if self.spec is None:
+            return
+        if info_type == "loads":
+            for step in range(1, len(self.spec["states"]) + 1):
+                self.log.append(f"CLOAD id: {step}")
+                self.log.append(f"    Node 1  DOF 3  Magnitude {1000.0 * step:.4E}")
+        elif info_type == "spc":
+            self.log.append("SPC id: 1  Node 1  DOF 123456")
+        elif info_type == "mid":
+            for mid in range(1, self.spec["n_materials"] + 1):
+                self.log.append(f"MAT1 id: {mid} name: MAT_{mid} E: 2.100000E+05 NU: 0.3")
+        else:
+            count = np.bincount(self.element_pids(), minlength=self.spec["n_parts"] + 1)
+            for pid in range(1, self.spec["n_parts"] + 1):
+                mid = (pid - 1) % self.spec["n_materials"] + 1
+                self.log.append(f"PSHELL id: {pid} name: PART_{pid} mid: {mid} T: 2.0 elements: {count[pid]}")
+
+    def resize(self, width: str, height: str) -> None:
+        self.window_size = (int(width), int(height))
+
+    def write_png(self, path: str) -> None:
+        from PIL import Image, ImageDraw
+        width, height = self.window_size
+        # 模拟云图：按位置渐变的伪彩色
+        x = np.linspace(0.0, 1.0, width, dtype=np.float32)[np.newaxis, :]
+        y = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, np.newaxis]
+        field = np.sin(np.pi * x) * np.cos(np.pi * y * 0.5 + self.state)
+        rgb = np.stack([field, 1.0 - np.abs(field), 1.0 - field], axis=-1)
+        image = Image.fromarray((np.clip(rgb, 0.0, 1.0) * 255).astype(np.uint8), "RGB")
+        ImageDraw.Draw(image).text((20, 20), os.path.basename(path), fill="black")
+        image.save(path, "PNG")
+        time.sleep(PNG_DELAY)
+        self.log.append(f'Writing image "{path}" ({width}x{height})')
+
+
+def main(argv: List[str]) -> int:
+    command_str = argv[argv.index("-exec") + 1] if "-exec" in argv and argv.index("-exec") + 1 < len(argv) else ""
+    commands = [command.strip() for command in command_str.split(";") if command.strip()]
+    session = FakeSession()
+    session.log.append("META Post-Processor (benchmark stub)")
+    time.sleep(STARTUP_DELAY)
+    for command in commands:
+        session.execute(command)
+        time.sleep(COMMAND_DELAY)
+    session.log.append("Session finished")
+    with open("META_post.log", "w", encoding="utf-8") as f:
+        f.write("\n".join(session.log) + "\n")
+    print("\n".join(session.log))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,360 @@
+"""
+性能基准测试：使用假META程序和合成模型测量MCPToolKit各方法、CSV/Parquet读写、截图拼接及fig_inter的耗时
+用法（在仓库根目录执行）：
+    python -m Benchmark.run --nodes 10000 100000 --repeat 5
+结果写入bench_output.txt（每项的样本数、p50/p95/平均耗时及吞吐量）
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import asyncio
+import argparse
+import platform
+import tempfile
+import traceback
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+from . import synthetic
+
+FAKE_META = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_meta.py")
+SN_CURVES = {"steel": {"sf": 900.0, "b": -0.09, "su": 600.0, "endurance_limit": 0.0}}
+# fig_inter基准的绘图代码（大数据量折线，覆盖降采样路径）
+FIG_CODE = """
+import numpy as np
+x = np.linspace(0, 100, {points})
+fig, ax = plt.subplots(figsize=(8, 4))
+ax.plot(x, np.sin(x) + np.random.default_rng(0).normal(0, 0.1, len(x)), color=li_colors["dark_green"])
+ax.set_title("基准测试")
+"""
+
+
+class BenchResult:
+    """一个基准项的耗时样本及统计"""
+
+    def __init__(self, name: str, size: str, samples: List[float], items: float = 0, unit: str = "", note: str = ""):
+        self.name = name
+        self.size = size
+        self.samples = samples
+        self.items = items
+        self.unit = unit
+        self.note = note
+
+    def line(self) -> str:
+        if not self.samples:
+            return f"{self.name:<40} {self.size:<14} SKIPPED: {self.note}"
+        p50, p95 = np.percentile(self.samples, [50, 95])
+        mean = float(np.mean(self.samples))
+        throughput = f"{self.items / p50:,.0f} {self.unit}/s" if self.items and p50 > 0 else f"{1.0 / p50:,.2f} ops/s"
+        text = (f"{self.name:<40} {self.size:<14} n={len(self.samples):<3} p50={p50 * 1000:>10.1f}ms "
+                f"p95={p95 * 1000:>10.1f}ms mean={mean * 1000:>10.1f}ms  {throughput}")
+        return text + (f"  ({self.note})" if self.note else "")
+
+
+def measure(
+    name: str,
+    size: str,
+    func: Callable[[], Any],
+    repeat: int,
+    setup: Optional[Callable[[], Any]] = None,
+    items: float = 0,
+    unit: str = "",
+    check: Optional[Callable[[Any], Optional[str]]] = None,
+) -> BenchResult:
+    """
+    重复执行func并记录耗时（setup在计时外执行），出错时记录为跳过并附带原因
+    :param check: 校验返回值，返回非空字符串表示结果异常
+    """
+    samples = []
+    note = ""
+    try:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = func()
+            samples.append(time.perf_counter() - start)
+            if check is not None:
+                note = check(result) or ""
+                if note:
+                    return BenchResult(name, size, [], note=f"结果异常: {note}")
+    except Exception as e:
+        traceback.print_exc()
+        return BenchResult(name, size, [], note=f"{type(e).__name__}: {e}")
+    return BenchResult(name, size, samples, items, unit, note)
+
+
+def _expect_file(result) -> Optional[str]:
+    path = result[0] if isinstance(result, tuple) else result
+    return None if isinstance(path, str) and os.path.exists(path) else str(result)[:200]
+
+
+def _expect_text(marker: str) -> Callable[[Any], Optional[str]]:
+    return lambda result: None if marker in str(result) else str(result)[:200]
+
+
+def _write_fake_meta_launcher(work_dir: str) -> str:
+    """生成调用假META的可执行脚本（使用当前Python解释器）"""
+    path = os.path.join(work_dir, "meta_post64.sh")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_META}" "$@"\n')
+    os.chmod(path, 0o755)
+    return path
+
+
+def bench_toolkit(toolkit, models: Dict[str, str], size: str, repeat: int, image_dir: str) -> List[BenchResult]:
+    """MCPToolKit各方法（不传query，不调用大模型）"""
+    h3d, odb = models["h3d"], models["odb"]
+    spec = synthetic.load_spec(h3d)
+    n_states = len(spec["states"])
+    ids = list(range(1, min(spec["n_nodes"], 200) + 1))
+
+    def invalidate_export() -> None:
+        # 已导出的CSV晚于结果文件时直接复用，每次计时前更新结果文件修改时间，使每个样本都重新执行META导出
+        os.utime(h3d)
+
+    results = [
+        measure("get_all_node_results", size, lambda: toolkit.get_all_node_results(h3d, "Mises"), repeat,
+                setup=invalidate_export, items=spec["n_nodes"] * n_states, unit="rows", check=_expect_file),
+        measure("get_all_element_results", size, lambda: toolkit.get_all_element_results(h3d, "Mises"), repeat,
+                setup=invalidate_export, items=spec["n_elements"] * n_states, unit="rows", check=_expect_file),
+        measure("get_case_catalog(refresh)", size, lambda: toolkit.get_case_catalog(odb, refresh=True), repeat,
+                check=_expect_text("case_id")),
+        measure("get_case_catalog(cached)", size, lambda: toolkit.get_case_catalog(odb), repeat,
+                check=_expect_text("case_id")),
+        measure("get_multi_node_results", size,
+                lambda: toolkit.get_multi_node_results(h3d, "Mises", ids_per_case={1: ids, 2: ids}), repeat,
+                items=2 * len(ids), unit="ids", check=_expect_text("FunctionTop")),
+        measure("get_multi_element_results", size,
+                lambda: toolkit.get_multi_element_results(h3d, "Mises", ids_per_case={1: ids}), repeat,
+                items=len(ids), unit="ids", check=_expect_text("FunctionTop")),
+        measure("get_multi_part_results", size,
+                lambda: toolkit.get_multi_part_results(h3d, "Mises", ids_per_case={1: [1, 2, 3]}), repeat,
+                check=_expect_text("Max FunctionTop")),
+        measure("get_multi_material_results", size,
+                lambda: toolkit.get_multi_material_results(h3d, "Mises", names_per_case={1: ["MAT_1"]}), repeat,
+                check=_expect_text("Max FunctionTop")),
+        measure("get_multi_set_results", size,
+                lambda: toolkit.get_multi_set_results(h3d, "Mises", ids_per_case={1: [1]}), repeat,
+                check=_expect_text("Max FunctionTop")),
+        measure("get_max_result_for_entities", size,
+                lambda: toolkit.get_max_result_for_entities(h3d, "Mises", "property", ids_per_case={1: [1, 2]}), repeat,
+                check=_expect_text("Function info")),
+        measure("get_model_info", size, lambda: toolkit.get_model_info(h3d, "property"), repeat,
+                check=_expect_text("PSHELL")),
+        measure("capture_screenshots(preview)", size,
+                lambda: toolkit.capture_screenshots(h3d, "Mises", "property", ids_per_case={1: [1]},
+                                                    output_dir=image_dir, mode="preview"), repeat,
+                check=_expect_text("<img")),
+        measure("capture_screenshots(full)", size,
+                lambda: toolkit.capture_screenshots(h3d, "Mises", "property", ids_per_case={1: [1]},
+                                                    output_dir=image_dir), repeat,
+                check=_expect_text("<img")),
+        # 全量导出不含状态0，结果库中的case_id为1..n_states-1；工况目录在计时外加载
+        measure("compute_fatigue_damage", size,
+                lambda: toolkit.compute_fatigue_damage(h3d, SN_CURVES, {i: 1e5 for i in range(1, n_states)},
+                                                       node_or_element_result="element", default_material="steel"),
+                repeat, setup=lambda: toolkit.get_case_catalog(h3d),
+                items=spec["n_elements"], unit="elements", check=_expect_text("疲劳损伤计算完成")),
+    ]
+    # 雨流计数需要ODB多时间步节点结果库
+    toolkit.get_all_node_results(odb, "Mises")
+    odb_spec = synthetic.load_spec(odb)
+    results.append(measure("compute_rainflow_damage", size,
+                           lambda: toolkit.compute_rainflow_damage(odb, SN_CURVES, default_material="steel"), repeat,
+                           items=odb_spec["n_nodes"], unit="nodes", check=_expect_text("疲劳损伤计算完成")))
+    return results
+
+
+def bench_csv_parquet(csv_path: str, size: str, repeat: int, work_dir: str) -> List[BenchResult]:
+    """多工况CSV的流式读取、结果库构建、Parquet写入/读取，以及SQL结果流式导出Parquet"""
+    import pandas as pd
+    from MCP_FemResExtract.result_reader import iter_result_blocks, scan_result_blocks
+    from MCP_FemResExtract.result_store import ResultStore
+
+    n_rows = sum(block.n_rows for block in scan_result_blocks(csv_path))
+    csv_mb = os.path.getsize(csv_path) / 1024 / 1024
+    parquet_path = os.path.join(work_dir, "bench_results.parquet")
+    store_dir = os.path.join(work_dir, "bench_store", "node_Mises")
+
+    def read_all():
+        return sum(len(df) for _, df in iter_result_blocks(csv_path))
+
+    def read_columns():
+        return sum(len(df) for _, df in iter_result_blocks(csv_path, columns=["Id", "FunctionTop"]))
+
+    def write_parquet():
+        frames = [df.assign(case=case_name) for case_name, df in iter_result_blocks(csv_path)]
+        pd.concat(frames, ignore_index=True).to_parquet(parquet_path, index=False)
+
+    results = [
+        measure("scan_result_blocks", size, lambda: scan_result_blocks(csv_path), repeat,
+                items=csv_mb, unit="MB"),
+        measure("iter_result_blocks(all columns)", size, read_all, repeat, items=n_rows, unit="rows"),
+        measure("iter_result_blocks(Id,FunctionTop)", size, read_columns, repeat, items=n_rows, unit="rows"),
+        measure("ResultStore.build_from_csv", size, lambda: ResultStore.build_from_csv(csv_path, store_dir), repeat,
+                setup=lambda: shutil.rmtree(store_dir, ignore_errors=True), items=n_rows, unit="rows"),
+        measure("csv -> parquet", size, write_parquet, repeat, items=n_rows, unit="rows"),
+        measure("read_parquet(Id,FunctionTop)", size,
+                lambda: pd.read_parquet(parquet_path, columns=["Id", "FunctionTop"]), repeat,
+                items=n_rows, unit="rows"),
+    ]
+
+    # SQL流式导出：以节点结果构造SQLite表
+    db_path = os.path.join(work_dir, "bench.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    with sqlite3.connect(db_path) as connection:
+        pd.read_parquet(parquet_path).to_sql("results", connection, index=False)
+    try:
+        import SQLTools
+        db = SQLTools.CachedSQLDatabase.from_uri(f"sqlite:///{db_path}")
+        results.append(measure(
+            "sql stream_query_to_parquet", size,
+            lambda: SQLTools.stream_query_to_parquet(db, "SELECT * FROM results", os.path.join(work_dir, "sql_exports")),
+            repeat, items=n_rows, unit="rows", check=_expect_text(".parquet")))
+    except ImportError as e:
+        results.append(BenchResult("sql stream_query_to_parquet", size, [], note=f"ImportError: {e}"))
+    return results
+
+
+def bench_stitch(toolkit, size: str, repeat: int, image_dir: str, resolution) -> List[BenchResult]:
+    """7个视图截图的拼接（每次在计时外重新生成原始截图，拼接后会被删除）"""
+    from PIL import Image
+    width, height = resolution
+    paths = [os.path.join(image_dir, f"stitch_default_{view}_20250101_000000.png")
+             for view in ("isometric", "top", "front", "left", "btm", "back", "right")]
+    tile = Image.fromarray(np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8), "RGB")
+
+    def setup():
+        for path in paths:
+            tile.save(path, "PNG", compress_level=1)
+
+    return [
+        measure(f"stitch_screenshots({layout})", size, lambda layout=layout: toolkit._stitch_screenshots(
+            paths, output_path=os.path.join(image_dir, f"bench_stitched_{layout}"), layout=layout),
+            repeat, setup=setup, items=len(paths), unit="views")
+        for layout in ("vertical", "grid")
+    ]
+
+
+def bench_fig_inter(size: str, repeat: int, points: int) -> List[BenchResult]:
+    """fig_inter绘图工具（按配置使用沙箱子进程或进程内执行）"""
+    try:
+        import MCP_FigGenerator
+    except Exception as e:
+        return [BenchResult("fig_inter", size, [], note=f"{type(e).__name__}: {e}")]
+    code = FIG_CODE.format(points=points)
+
+    def check(result):
+        return None if json.loads(result).get("status") == "success" else result[:200]
+
+    results = []
+    for sandbox in (True, False):
+        MCP_FigGenerator.fig_generator.sandbox = sandbox
+        results.append(measure(
+            f"fig_inter(sandbox={sandbox})", size,
+            lambda: asyncio.run(MCP_FigGenerator.fig_inter(code)), repeat,
+            items=points, unit="points", check=check))
+    return results
+
+
+def bench_rainflow(repeat: int, n_histories: int, n_steps: int, seed: int = 0) -> List[BenchResult]:
+    """雨流计数及损伤累计内核（随机游走时间历程，不经过META及结果库）"""
+    from MCP_FemResExtract.fatigue import SNCurve
+    from MCP_FemResExtract.rainflow import rainflow_count, rainflow_damage
+    rng = np.random.default_rng(seed)
+    histories = np.cumsum(rng.normal(0.0, 20.0, size=(n_histories, n_steps)), axis=1).astype(np.float32) + 200.0
+    curve = SNCurve(sf=900.0, b=-0.09, su=600.0)
+    n_count = min(n_histories, 100000)
+    return [
+        measure("rainflow_count", f"{n_count}x{n_steps}", lambda: rainflow_count(histories[:n_count]), repeat,
+                items=n_count, unit="histories"),
+        measure("rainflow_damage", f"{n_histories}x{n_steps}", lambda: rainflow_damage(histories, [curve]), repeat,
+                items=n_histories, unit="histories"),
+    ]
+
+
+def main(argv: List[str] = None) -> str:
+    parser = argparse.ArgumentParser(description="DuraAI性能基准测试（假META + 合成模型）")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10000, 100000], help="合成模型节点数（可多个）")
+    parser.add_argument("--steps", type=int, default=3, help="分析步/工况数")
+    parser.add_argument("--frames", type=int, default=4, help="ODB每个分析步的帧数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数")
+    parser.add_argument("--fig-points", type=int, default=200000, help="fig_inter基准折线点数")
+    parser.add_argument("--rainflow-histories", type=int, default=1000000, help="雨流计数基准的时间历程数")
+    parser.add_argument("--rainflow-steps", type=int, default=64, help="雨流计数基准每条历程的时间步数")
+    parser.add_argument("--startup-delay", type=float, default=0.2, help="假META启动耗时（秒）")
+    parser.add_argument("--command-delay", type=float, default=0.0, help="假META每条命令耗时（秒）")
+    parser.add_argument("--row-delay", type=float, default=0.0, help="假META每输出一百万行CSV的耗时（秒）")
+    parser.add_argument("--work-dir", default=None, help="工作目录（默认临时目录，结束后删除）")
+    parser.add_argument("--output", default="bench_output.txt", help="结果输出文件")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["toolkit", "csv", "stitch", "fig", "rainflow"], help="跳过的基准组")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output)
+    work_dir = os.path.abspath(args.work_dir) if args.work_dir else tempfile.mkdtemp(prefix="duraai_bench_")
+    os.makedirs(work_dir, exist_ok=True)
+    image_dir = os.path.join(work_dir, "images")
+    os.makedirs(image_dir, exist_ok=True)
+
+    # 假META的延迟参数通过环境变量传给子进程
+    os.environ["FAKE_META_STARTUP_DELAY"] = str(args.startup_delay)
+    os.environ["FAKE_META_COMMAND_DELAY"] = str(args.command_delay)
+    os.environ["FAKE_META_ROW_DELAY"] = str(args.row_delay)
+
+    from MCP_FemResExtract.core import MCPToolKit
+    # 关闭后台预热，避免预热任务占用许可证干扰各方法的耗时测量
+    toolkit = MCPToolKit(meta_post_path=_write_fake_meta_launcher(work_dir), use_sudo=False, prefetch=False)
+
+    cwd = os.getcwd()
+    results: List[BenchResult] = []
+    try:
+        os.chdir(work_dir)
+        for n_nodes in args.nodes:
+            model_dir = os.path.join(work_dir, f"model_{n_nodes}")
+            models = {
+                result_type: synthetic.create_model(model_dir, f"bench_{result_type}", n_nodes, result_type,
+                                                    n_steps=args.steps, frames_per_step=args.frames)
+                for result_type in ("h3d", "odb")
+            }
+            spec = synthetic.load_spec(models["h3d"])
+            size = f"{spec['n_nodes']}n/{spec['n_elements']}e"
+            print(f"模型 {size}（工作目录 {work_dir}）")
+            if "toolkit" not in args.skip:
+                results += bench_toolkit(toolkit, models, size, args.repeat, image_dir)
+            if "csv" not in args.skip:
+                csv_path = os.path.splitext(models["odb"])[0] + "_all_node_Mises_results.csv"
+                if not os.path.exists(csv_path):
+                    toolkit.get_all_node_results(models["odb"], "Mises")
+                results += bench_csv_parquet(csv_path, size, args.repeat, model_dir)
+        if "stitch" not in args.skip:
+            results += bench_stitch(toolkit, "1600x1000x7", args.repeat, image_dir, (1600, 1000))
+        if "fig" not in args.skip:
+            results += bench_fig_inter(f"{args.fig_points}pts", args.repeat, args.fig_points)
+        if "rainflow" not in args.skip:
+            results += bench_rainflow(args.repeat, args.rainflow_histories, args.rainflow_steps)
+    finally:
+        os.chdir(cwd)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    header = [
+        f"DuraAI benchmark  {time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"python {platform.python_version()}  {platform.platform()}  cpus={os.cpu_count()}",
+        f"fake META delays: startup={args.startup_delay}s command={args.command_delay}s row={args.row_delay}s/1M rows",
+        f"repeat={args.repeat} steps={args.steps} frames/step={args.frames}",
+        "",
+    ]
+    report = "\n".join(header + [result.line() for result in results]) + "\n"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(report)
+    print(f"结果已写入: {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
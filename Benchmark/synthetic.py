@@ -0,0 +1,152 @@
+import os
+import json
+import numpy as np
+from typing import Any, Dict, List
+
+# 合成模型描述文件：与结果文件同目录的<文件名>.bench.json，假META据此生成日志、CSV与截图
+SPEC_SUFFIX = ".bench.json"
+
+
+def spec_path_for(path: str) -> str:
+    """结果文件/几何文件对应的合成模型描述文件路径"""
+    return os.path.splitext(path)[0] + SPEC_SUFFIX
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """根据结果文件或几何文件路径读取合成模型描述"""
+    with open(spec_path_for(path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _state_labels(result_type: str, n_steps: int, frames_per_step: int) -> List[str]:
+    """
+    生成结果状态描述（即META日志中Reading行的内容）
+    ODB：每个分析步的起始帧与上一分析步末时刻相同，与真实ODB一致，用于覆盖工况去重逻辑
+    H3D：每个分析步为一个Subcase
+    """
+    if result_type == "h3d":
+        return [f"Subcase {i + 1} (Subcase_{i + 1})" for i in range(n_steps)]
+    labels = []
+    time_point = 0.0
+    for step in range(1, n_steps + 1):
+        start = time_point
+        for frame in range(frames_per_step):
+            time_point = start + frame / max(frames_per_step - 1, 1)
+            labels.append(f"STEP {step}        (AnonymousSTEP{step}),TIME {time_point:.8E}")
+    return labels
+
+
+def grid_shape(n_nodes: int) -> tuple:
+    """节点数对应的平板网格尺寸（行节点数, 列节点数）"""
+    nx = max(2, int(np.sqrt(n_nodes)))
+    ny = max(2, int(np.ceil(n_nodes / nx)))
+    return nx, ny
+
+
+def _write_fem(path: str, coords: np.ndarray, quads: np.ndarray, pids: np.ndarray, n_parts: int, n_materials: int) -> None:
+    """写出Nastran自由格式的.fem几何文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("$ synthetic benchmark model\nBEGIN BULK\n")
+        for i, (x, y, z) in enumerate(coords, start=1):
+            f.write(f"GRID,{i},,{x:.3f},{y:.3f},{z:.3f}\n")
+        for i, (quad, pid) in enumerate(zip(quads, pids), start=1):
+            f.write(f"CQUAD4,{i},{pid},{quad[0]},{quad[1]},{quad[2]},{quad[3]}\n")
+        for pid in range(1, n_parts + 1):
+            f.write(f"PSHELL,{pid},{(pid - 1) % n_materials + 1},2.0\n")
+        for mid in range(1, n_materials + 1):
+            f.write(f"MAT1,{mid},210000.,,0.3\n")
+        f.write("FORCE,1,1,0,1.0,0.0,0.0,1000.0\nSPC1,1,123456,1\nENDDATA\n")
+
+
+def _write_inp(path: str, coords: np.ndarray, quads: np.ndarray, pids: np.ndarray, n_parts: int, n_materials: int, n_steps: int) -> None:
+    """写出Abaqus .inp几何文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("** synthetic benchmark model\n*NODE\n")
+        for i, (x, y, z) in enumerate(coords, start=1):
+            f.write(f"{i}, {x:.3f}, {y:.3f}, {z:.3f}\n")
+        for pid in range(1, n_parts + 1):
+            f.write(f"*ELEMENT, TYPE=S4, ELSET=PART_{pid}\n")
+            for i in np.flatnonzero(pids == pid):
+                f.write(f"{i + 1}, {quads[i][0]}, {quads[i][1]}, {quads[i][2]}, {quads[i][3]}\n")
+            f.write(f"*SHELL SECTION, ELSET=PART_{pid}, MATERIAL=MAT_{(pid - 1) % n_materials + 1}\n2.0\n")
+        for mid in range(1, n_materials + 1):
+            f.write(f"*MATERIAL, NAME=MAT_{mid}\n*ELASTIC\n210000., 0.3\n")
+        for step in range(1, n_steps + 1):
+            f.write(f"*STEP, NAME=STEP{step}\n*STATIC\n*CLOAD\n1, 3, {1000.0 * step}\n*END STEP\n")
+
+
+def create_model(
+    out_dir: str,
+    name: str,
+    n_nodes: int,
+    result_type: str = "h3d",
+    n_steps: int = 3,
+    frames_per_step: int = 3,
+    n_parts: int = 10,
+    n_materials: int = 3,
+    seed: int = 0,
+) -> str:
+    """
+    生成合成有限元模型：平板四边形网格几何文件（.fem/.inp）、占位结果文件（.h3d/.odb）及模型描述
+    :param out_dir: 输出目录
+    :param name: 模型名称（文件名）
+    :param n_nodes: 目标节点数（取整为平板网格）
+    :param result_type: 结果文件类型（'h3d'或'odb'）
+    :param n_steps: 分析步/工况数
+    :param frames_per_step: ODB每个分析步的帧数
+    :param n_parts: 属性（PSHELL/ELSET）数
+    :param n_materials: 材料数
+    :param seed: 结果数值随机种子
+    :return: 结果文件路径
+    """
+    if result_type not in ("h3d", "odb"):
+        raise ValueError(f"不支持的结果文件类型: {result_type}")
+    os.makedirs(out_dir, exist_ok=True)
+    base_path = os.path.join(out_dir, name)
+    nx, ny = grid_shape(n_nodes)
+
+    # 平板网格：节点按行排列，单元为相邻四个节点
+    xs, ys = np.meshgrid(np.arange(nx) * 10.0, np.arange(ny) * 10.0)
+    coords = np.column_stack([xs.ravel(), ys.ravel(), np.zeros(nx * ny)])
+    col, row = np.meshgrid(np.arange(nx - 1), np.arange(ny - 1))
+    first = (row * nx + col).ravel() + 1
+    quads = np.column_stack([first, first + 1, first + nx + 1, first + nx])
+    pids = (np.arange(len(quads)) * n_parts // len(quads)) + 1
+
+    if result_type == "h3d":
+        _write_fem(base_path + ".fem", coords, quads, pids, n_parts, n_materials)
+    else:
+        _write_inp(base_path + ".inp", coords, quads, pids, n_parts, n_materials, n_steps)
+
+    spec = {
+        "name": name,
+        "result_type": result_type,
+        "n_nodes": int(len(coords)),
+        "n_elements": int(len(quads)),
+        "grid": [nx, ny],
+        "n_parts": n_parts,
+        "n_materials": n_materials,
+        "states": _state_labels(result_type, n_steps, frames_per_step),
+        "seed": seed,
+    }
+    result_file = f"{base_path}.{result_type}"
+    with open(result_file, "wb") as f:
+        f.write(b"SYNTHETIC-BENCHMARK-RESULT\n")
+    with open(spec_path_for(result_file), "w", encoding="utf-8") as f:
+        json.dump(spec, f, ensure_ascii=False, indent=2)
+    return result_file
+
+
+def state_values(spec: Dict[str, Any], entity: str, state: int) -> np.ndarray:
+    """
+    实体在指定结果状态下的标量结果（确定性生成：空间分布 x 状态载荷系数 + 噪声）
+    :param spec: 合成模型描述
+    :param entity: 'node'或'element'
+    :param state: 结果状态序号（从0开始）
+    :return: 结果数组（按ID升序）
+    """
+    n = spec["n_nodes"] if entity == "node" else spec["n_elements"]
+    rng = np.random.default_rng(spec["seed"] * 1000 + state * 2 + (entity == "element"))
+    base = 100.0 + 300.0 * np.sin(np.linspace(0.0, np.pi, n)) ** 2
+    factor = 0.5 + 0.5 * np.sin(state * 0.9 + 0.3)
+    return (base * factor + rng.normal(0.0, 5.0, n)).astype(np.float32)
@@ -1,4 +1,4 @@
-import os,json
+import os,json,tempfile
 from dotenv import load_dotenv
 from typing import Dict,Any
 class EnvConfig:
@@ -24,12 +24,64 @@ class EnvConfig:
         self.li_model_v3 = os.environ.get("LI_MODEL_NAME_V3")
         self.manage_root_path = os.environ.get("MANAGE_ROOT_PATH", "/data/work/")  # 默认值为 /data/work/
         self.metabath_path = os.environ.get("METABAT_PATH", r"/local_data/BETA_CAE/BETA_CAE_Systems/meta_post_v24.1.5/meta_post64.sh")
+        self.meta_sudo = os.environ.get("META_SUDO", "1") == "1"  # 是否通过sudo -E启动META
+        # META许可证调度：可同时运行的META进程数、为交互查询预留的许可证数、每个任务的工作目录根路径
+        self.meta_license_seats = int(os.environ.get("META_LICENSE_SEATS", 2))
+        self.meta_reserved_interactive_seats = int(os.environ.get("META_RESERVED_INTERACTIVE_SEATS", 1))
+        self.meta_work_dir = os.environ.get("META_WORK_DIR", os.path.join(tempfile.gettempdir(), "meta_jobs"))
+        # 多实体结果查询微批处理：合并窗口（毫秒，0表示不合并）及单批最多合并的查询数
+        self.meta_batch_window_ms = float(os.environ.get("META_BATCH_WINDOW_MS", 200))
+        self.meta_batch_max_queries = int(os.environ.get("META_BATCH_MAX_QUERIES", 20))
+        # 全量结果导出按工况范围分片并行执行的分片数（0表示自动取批量任务可用许可证数，1表示不分片）
+        self.meta_export_shards = int(os.environ.get("META_EXPORT_SHARDS", 0))
+        # 结果文件预热：首次引用（或出现在MANAGE_ROOT_PATH下）时后台生成工况目录、结果库、实体索引及部件摘要
+        # 预热的结果类型（逗号分隔）、同时预热的文件数、管理目录扫描间隔（秒，0表示不扫描）
+        self.prefetch_enabled = os.environ.get("PREFETCH_ENABLED", "1") == "1"
+        self.prefetch_categories = [c.strip() for c in os.environ.get("PREFETCH_CATEGORIES", "Mises").split(",") if c.strip()]
+        self.prefetch_workers = int(os.environ.get("PREFETCH_WORKERS", 1))
+        self.prefetch_scan_interval = float(os.environ.get("PREFETCH_SCAN_INTERVAL", 60))
+        # 管理目录文件监视（watchdog）：新增/重新求解的结果文件去抖后删除派生文件并重新预热；watchdog不可用时回退为轮询扫描
+        self.watch_enabled = os.environ.get("WATCH_ENABLED", "1") == "1"
+        self.watch_debounce_sec = float(os.environ.get("WATCH_DEBOUNCE_SEC", 30))
+        # 结果文件目录（SQLite）：数据库路径及从路径解析车型的正则（如X01、M8）
+        self.catalog_db_path = os.environ.get("CATALOG_DB_PATH", os.path.join(self.manage_root_path, "result_catalog.sqlite3"))
+        self.catalog_vehicle_pattern = os.environ.get("CATALOG_VEHICLE_PATTERN", r"(?<![A-Za-z0-9])([A-Z]\d{1,2}[A-Z]?)(?![A-Za-z0-9])")
         self.font_path = os.environ.get("FONT_PATH", r"/usr/share/fonts/lixiangfont/LiciumFont2022-Light.otf")
         self.images_path = os.environ.get("IMAGES_PATH", "/home/chehejia/agent-chat-ui-main/public/images")
+        # META图形窗口原始尺寸（宽,高）：截图时某视图设置了分辨率后，未设置分辨率的视图恢复为该尺寸
+        self.meta_window_size = [int(v) for v in os.environ.get("META_WINDOW_SIZE", "1920,1080").split(",")]
         self.feishu_app_id = os.environ.get("FEISHU_APP_ID")
         self.feishu_app_secret = os.environ.get("FEISHU_APP_SECRET")
         self.li_api_URL_qwen = os.environ.get("LI_API_URL_QWEN")
         self.li_model_qwen = os.environ.get("LI_MODEL_NAME_QWEN")
+        # 绘图沙箱配置（子进程执行绘图代码，限制CPU秒数/内存/墙钟时间）
+        self.fig_sandbox = os.environ.get("FIG_SANDBOX", "1") == "1"
+        self.fig_cpu_seconds = int(os.environ.get("FIG_CPU_SECONDS", 30))
+        self.fig_memory_mb = int(os.environ.get("FIG_MEMORY_MB", 2048))
+        self.fig_timeout = float(os.environ.get("FIG_TIMEOUT", 60))
+        # 大数据量绘图降采样配置（折线点数/散点点数上限及处理方式）
+        self.fig_max_line_points = int(os.environ.get("FIG_MAX_LINE_POINTS", 5000))
+        self.fig_max_scatter_points = int(os.environ.get("FIG_MAX_SCATTER_POINTS", 20000))
+        self.fig_line_method = os.environ.get("FIG_LINE_METHOD", "minmax")
+        self.fig_scatter_method = os.environ.get("FIG_SCATTER_METHOD", "hexbin")
+        # 云图截图拼接输出配置（格式webp/jpeg/png、压缩质量、缩略图最长边像素）
+        self.stitch_format = os.environ.get("STITCH_FORMAT", "webp")
+        self.stitch_quality = int(os.environ.get("STITCH_QUALITY", 85))
+        self.stitch_thumbnail_size = int(os.environ.get("STITCH_THUMBNAIL_SIZE", 480))
+        # SQL表结构缓存：探测information_schema表版本的最小间隔（秒）
+        self.sql_schema_probe_interval = float(os.environ.get("SQL_SCHEMA_PROBE_INTERVAL", 30))
+        # SQL连接池配置（连接数、溢出连接数、取用前ping检测、连接回收秒数）及流式查询导出配置
+        self.sql_pool_size = int(os.environ.get("SQL_POOL_SIZE", 5))
+        self.sql_max_overflow = int(os.environ.get("SQL_MAX_OVERFLOW", 10))
+        self.sql_pool_pre_ping = os.environ.get("SQL_POOL_PRE_PING", "1") == "1"
+        self.sql_pool_recycle = int(os.environ.get("SQL_POOL_RECYCLE", 3600))
+        self.sql_export_path = os.environ.get("SQL_EXPORT_PATH", os.path.join(self.manage_root_path, "sql_exports"))
+        self.sql_chunk_rows = int(os.environ.get("SQL_CHUNK_ROWS", 50000))
+        # SQL查询结果缓存容量（MB），按引用表版本失效
+        self.sql_result_cache_mb = int(os.environ.get("SQL_RESULT_CACHE_MB", 64))
+        # 指标输出：JSONL事件文件路径（为空不输出）、Prometheus抓取端口（0表示不启动）
+        self.metrics_jsonl_path = os.environ.get("METRICS_JSONL_PATH", "")
+        self.metrics_port = int(os.environ.get("METRICS_PORT", 0))
     
 
     def load_servers(self,file_path: str ="servers_config.json" ) -> Dict[str, Any]:
@@ -0,0 +1,180 @@
+import numpy as np
+from typing import List, Tuple
+from matplotlib.collections import PathCollection
+from matplotlib.colors import LinearSegmentedColormap
+
+# 聚合图默认色带：灰色 -> 墨绿色（均取自FigGenerator.COLORS预设颜色）
+DENSITY_CMAP = LinearSegmentedColormap.from_list(
+    "li_density", [(192/255, 184/255, 187/255), (13/255, 87/255, 80/255)]
+)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets降采样，保留曲线视觉形状
+    :param x: 横坐标数组（需单调）
+    :param y: 纵坐标数组
+    :param n_out: 输出点数
+    :return: 降采样后的(x, y)
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return x, y
+
+    every = (n - 2) / (n_out - 2)
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # 下一个桶的平均点作为三角形第三个顶点
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if next_start >= next_end:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        idx[i + 1] = a
+    return x[idx], y[idx]
+
+
+def minmax_decimate(x: np.ndarray, y: np.ndarray, n_out: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按索引分桶，每个桶保留最小值和最大值两个点（保证峰值不丢失）
+    :param x: 横坐标数组
+    :param y: 纵坐标数组
+    :param n_out: 输出点数上限
+    :return: 降采样后的(x, y)
+    """
+    n = len(x)
+    n_bins = n_out // 2
+    if n_out >= n or n_bins < 1:
+        return x, y
+
+    bin_size = n // n_bins
+    usable = n_bins * bin_size
+    y_bins = y[:usable].reshape(n_bins, bin_size)
+    offsets = np.arange(n_bins) * bin_size
+    idx = np.concatenate([offsets + y_bins.argmin(axis=1), offsets + y_bins.argmax(axis=1)])
+    # 剩余不足一个桶的尾部数据单独保留极值
+    if usable < n:
+        tail = y[usable:]
+        idx = np.concatenate([idx, [usable + tail.argmin(), usable + tail.argmax()]])
+    idx = np.unique(idx)
+    return x[idx], y[idx]
+
+
+def _finite_runs(xy: np.ndarray) -> List[Tuple[int, int]]:
+    """连续有限值点段的[起, 止)索引列表（NaN/inf处折线断开）"""
+    finite = np.isfinite(xy).all(axis=1)
+    edges = np.diff(np.r_[0, finite.astype(np.int8), 0])
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def _display_label(artist, kind: str, unit: str, index: int) -> str:
+    """说明中使用的图元名称：未设置标签（matplotlib自动命名为_child0等）时按序号命名"""
+    label = artist.get_label()
+    if not label or label.startswith("_"):
+        return f"第{index + 1}{unit}{kind}（未命名）"
+    return f"{kind}'{label}'"
+
+
+def _decimate(x: np.ndarray, y: np.ndarray, n_out: int, method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """将一段折线降采样到不超过n_out个点"""
+    if len(x) <= n_out:
+        return x, y
+    if method == "lttb" and n_out >= 3 and np.all(np.diff(x) >= 0):
+        return lttb(x, y, n_out)
+    # minmax_decimate在尾部不足一个桶时额外保留2个点，预留出这部分点数
+    return minmax_decimate(x, y, n_out - 2 if n_out >= 4 else n_out)
+
+
+def _reduce_line(line, max_points: int, method: str, name: str) -> str:
+    """对单条折线降采样，返回降采样说明（未处理时返回空字符串）
+    NaN/inf在matplotlib中表示折线断开：各连续有限值段分别降采样，段之间重新插入NaN保留断开。
+    输出点数（含断开处的NaN）不超过max_points：每段至少保留2个点，段数过多时相邻段合并为一组降采样（组内断开不再保留）
+    """
+    xy = line.get_xydata()
+    n = len(xy)
+    if n <= max_points:
+        return ""
+    runs = _finite_runs(xy)
+    if not runs:
+        # 全部为NaN/inf，图中不显示任何线段，无需处理
+        return ""
+    # 每组至少2个点加1个NaN分隔
+    groups = np.array_split(np.arange(len(runs)), min(len(runs), max(1, (max_points + 1) // 3)))
+    segments = [np.concatenate([xy[runs[i][0]:runs[i][1]] for i in group]) for group in groups]
+    n_finite = sum(len(segment) for segment in segments)
+    spare = max_points - (len(segments) - 1) - 2 * len(segments)
+    pieces = []
+    for segment in segments:
+        n_out = 2 + int(spare * len(segment) / n_finite)
+        x, y = _decimate(segment[:, 0], segment[:, 1], n_out, method)
+        if pieces:
+            pieces.append(np.array([[np.nan, np.nan]]))
+        pieces.append(np.column_stack([x, y]))
+    reduced = np.concatenate(pieces)
+    line.set_data(reduced[:, 0], reduced[:, 1])
+    detail = f"，{len(runs)}段" + (f"合并为{len(segments)}组" if len(segments) < len(runs) else "") if len(runs) > 1 else ""
+    return f"{name}：{n}点 -> {len(reduced)}点（{method if method == 'lttb' else 'minmax'}降采样{detail}）"
+
+
+def _aggregate_scatter(ax, collection, gridsize: int, method: str, name: str) -> str:
+    """将点数过多的散点图替换为六边形分箱或二维直方图，返回处理说明"""
+    offsets = np.asarray(collection.get_offsets())
+    n = len(offsets)
+    values = collection.get_array()
+    label = collection.get_label()
+    zorder = collection.get_zorder()
+    collection.remove()
+
+    x, y = offsets[:, 0], offsets[:, 1]
+    if values is not None and len(values) == n:
+        # 带颜色映射的散点（如应力云点）按桶取最大值，保留危险点；二维直方图无法取最大值，统一用hexbin
+        method = "hexbin"
+        ax.hexbin(x, y, C=np.asarray(values), reduce_C_function=np.max,
+                  gridsize=gridsize, cmap=collection.get_cmap(), label=label, zorder=zorder)
+        detail = "按桶取最大值"
+    else:
+        if method == "hist2d":
+            ax.hist2d(x, y, bins=gridsize, cmap=DENSITY_CMAP, cmin=1)
+        else:
+            ax.hexbin(x, y, gridsize=gridsize, mincnt=1, cmap=DENSITY_CMAP, label=label, zorder=zorder)
+        detail = "按点密度着色"
+    return f"{name}：{n}点 -> {method}聚合（{gridsize}格，{detail}）"
+
+
+def reduce_figure(
+    fig,
+    max_line_points: int = 5000,
+    max_scatter_points: int = 20000,
+    line_method: str = "minmax",
+    scatter_method: str = "hexbin",
+    gridsize: int = 100,
+) -> List[str]:
+    """
+    在保存图像前检查大数据量的折线/散点并进行降采样或聚合
+    :param fig: matplotlib图像对象
+    :param max_line_points: 单条折线点数上限，超过时降采样
+    :param max_scatter_points: 单组散点点数上限，超过时改为聚合图
+    :param line_method: 折线降采样方式（'minmax'或'lttb'）
+    :param scatter_method: 散点聚合方式（'hexbin'或'hist2d'）
+    :param gridsize: 聚合网格数
+    :return: 数据缩减说明列表（无缩减时为空列表）
+    """
+    reports = []
+    for ax in getattr(fig, "axes", []):
+        for i, line in enumerate(ax.get_lines()):
+            report = _reduce_line(line, max_line_points, line_method, _display_label(line, "折线", "条", i))
+            if report:
+                reports.append(report)
+        for i, collection in enumerate(list(ax.collections)):
+            if isinstance(collection, PathCollection) and len(collection.get_offsets()) > max_scatter_points:
+                name = _display_label(collection, "散点", "组", i)
+                reports.append(_aggregate_scatter(ax, collection, gridsize, scatter_method, name))
+    return reports
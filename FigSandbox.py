@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import signal
+import threading
+import subprocess
+import traceback
+from typing import Dict, List, Any
+
+# 子进程输出结果的标记行前缀，避免与用户代码中的print输出混淆
+RESULT_MARKER = "__FIG_SANDBOX_RESULT__"
+# 传给沙箱子进程的环境变量（其余变量如大模型API密钥等不传入）
+SANDBOX_ENV_KEYS = ("PATH", "HOME", "LANG", "LC_ALL", "LC_CTYPE", "TMPDIR", "TEMP", "TMP", "SYSTEMROOT", "MPLCONFIGDIR")
+# 等待子进程退出时的轮询间隔（秒）
+WAIT_POLL_INTERVAL = 0.02
+
+
+def apply_chinese_font(ax, chinese_font):
+    """应用中文字体到图表所有元素，包括刻度值（主进程与沙箱子进程共用）"""
+    # 设置标题、标签等使用中文字体
+    title = ax.get_title()
+    if title:
+        ax.set_title(title, fontproperties=chinese_font)
+
+    xlabel = ax.get_xlabel()
+    if xlabel:
+        ax.set_xlabel(xlabel, fontproperties=chinese_font)
+
+    ylabel = ax.get_ylabel()
+    if ylabel:
+        ax.set_ylabel(ylabel, fontproperties=chinese_font)
+
+    # 设置坐标轴刻度文字
+    for label in ax.get_xticklabels():
+        label.set_fontproperties(chinese_font)
+    for label in ax.get_yticklabels():
+        label.set_fontproperties(chinese_font)
+
+    # 设置图例使用中文
+    legend = ax.get_legend()
+    if legend:
+        for text in legend.get_texts():
+            text.set_fontproperties(chinese_font)
+
+
+def _error(error_type: str, message: str) -> Dict[str, Any]:
+    """构造结构化错误信息"""
+    return {"status": "error", "error_type": error_type, "message": message}
+
+
+def _limit_resources(cpu_seconds: int, memory_mb: int) -> None:
+    """在沙箱子进程内设置CPU时间及地址空间上限（仅POSIX系统，子进程启动后、导入绘图库前调用）"""
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    memory_bytes = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def _sandbox_env() -> Dict[str, str]:
+    """沙箱子进程的最小环境变量，并限制BLAS线程数，避免多线程预留的虚拟内存触发地址空间限制"""
+    env = {key: os.environ[key] for key in SANDBOX_ENV_KEYS if key in os.environ}
+    env.update(OPENBLAS_NUM_THREADS="1", OMP_NUM_THREADS="1", MKL_NUM_THREADS="1")
+    return env
+
+
+def _communicate_posix(proc: subprocess.Popen, request: str, timeout: float):
+    """
+    写入请求并读取子进程输出，用wait4回收子进程以取得其CPU时间（Popen.communicate不返回资源用量）
+    :return: (stdout, stderr, 是否超时被杀, 子进程CPU时间（秒）)
+    """
+    outputs = {}
+
+    def read(name: str, stream) -> None:
+        outputs[name] = stream.read()
+
+    readers = [threading.Thread(target=read, args=(name, stream), daemon=True)
+               for name, stream in (("stdout", proc.stdout), ("stderr", proc.stderr))]
+    for reader in readers:
+        reader.start()
+    try:
+        proc.stdin.write(request)
+        proc.stdin.close()
+    except (BrokenPipeError, OSError):
+        pass
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    while True:
+        pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            try:
+                # 子进程为独立会话的进程组组长，整组杀掉
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, status, rusage = os.wait4(proc.pid, 0)
+            break
+        time.sleep(WAIT_POLL_INTERVAL)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for reader in readers:
+        reader.join()
+    return outputs.get("stdout", ""), outputs.get("stderr", ""), timed_out, rusage.ru_utime + rusage.ru_stime
+
+
+def run_sandboxed(
+    py_code: str,
+    fname: str,
+    font_path: str,
+    colors: Dict[str, tuple],
+    save_paths: List[str],
+    cpu_seconds: int = 30,
+    memory_mb: int = 2048,
+    timeout: float = 60,
+    reduce_options: Dict[str, Any] = None,
+) -> Dict[str, Any]:
+    """
+    在受限子进程中执行绘图代码并保存图像
+    :param py_code: Python绘图代码
+    :param fname: 图像对象的变量名
+    :param font_path: 中文字体文件路径
+    :param colors: 预设颜色表
+    :param save_paths: 图像保存路径列表
+    :param cpu_seconds: CPU时间上限（秒）
+    :param memory_mb: 地址空间上限（MB）
+    :param timeout: 墙钟时间上限（秒），超时后整组杀掉子进程
+    :param reduce_options: 大数据量降采样参数（传给FigDownsample.reduce_figure），为None时不降采样
+    :return: 结构化结果字典，status为success或error，error附带error_type，exit_code为子进程退出码
+    """
+    request = json.dumps({
+        "cpu_seconds": cpu_seconds,
+        "memory_mb": memory_mb,
+        "py_code": py_code,
+        "fname": fname,
+        "font_path": font_path,
+        "colors": colors,
+        "save_paths": save_paths,
+        "reduce_options": reduce_options,
+    }, ensure_ascii=False)
+
+    # 独立会话（进程组）在exec前由subprocess完成，不使用preexec_fn（多线程进程中不安全），资源限制由子进程自行设置
+    proc = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="ignore",
+        env=_sandbox_env(),
+        start_new_session=True,
+    )
+    # 记录是否因墙钟超时由本进程杀掉子进程，与CPU/内存限制导致的终止区分
+    if os.name == "posix":
+        stdout, stderr, timed_out, cpu_time = _communicate_posix(proc, request, timeout)
+    else:
+        timed_out, cpu_time = False, None
+        try:
+            stdout, stderr = proc.communicate(request, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            proc.kill()
+            stdout, stderr = proc.communicate()
+    if timed_out:
+        return dict(_error("timeout", f"绘图代码执行超过{timeout}秒，已终止"), exit_code=proc.returncode)
+
+    # 解析子进程写出的结果标记行（附带子进程退出码供调用方统计）
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return dict(json.loads(line[len(RESULT_MARKER):]), exit_code=proc.returncode)
+
+    # 子进程未正常输出结果，根据退出信号判断原因：CPU时间达到软上限时内核发送SIGXCPU，
+    # 达到硬上限（软上限+1秒，如SIGXCPU被用户代码捕获）时发送SIGKILL；其余未超时的SIGKILL通常是内存不足被系统（OOM killer）杀掉
+    cpu_exceeded = cpu_time is not None and cpu_time >= cpu_seconds
+    if os.name == "posix" and (proc.returncode == -signal.SIGXCPU or (proc.returncode == -signal.SIGKILL and cpu_exceeded)):
+        result = _error("cpu_limit", f"绘图代码CPU时间超过{cpu_seconds}秒，已终止")
+    elif "MemoryError" in stderr:
+        result = _error("memory_limit", f"绘图代码内存占用超过{memory_mb}MB，已终止")
+    elif os.name == "posix" and proc.returncode == -signal.SIGKILL:
+        result = _error("killed", f"绘图子进程被系统强制终止（SIGKILL），通常是内存不足被系统终止，请减少数据量后重试")
+    else:
+        result = _error("crash", f"绘图子进程异常退出（返回码 {proc.returncode}）：{stderr[-2000:]}")
+    return dict(result, exit_code=proc.returncode)
+
+
+def _worker_main():
+    """沙箱子进程入口：从stdin读取请求，执行绘图代码并将结果写到stdout"""
+    request = json.loads(sys.stdin.read())
+    if os.name == "posix":
+        _limit_resources(request["cpu_seconds"], request["memory_mb"])
+    result_stream = sys.stdout
+    # 用户代码的print输出重定向到stderr，stdout只保留结果行
+    sys.stdout = sys.stderr
+
+    def emit(result):
+        result_stream.write(RESULT_MARKER + json.dumps(result, ensure_ascii=False) + "\n")
+        result_stream.flush()
+
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import pandas as pd
+        import seaborn as sns
+        from matplotlib.font_manager import FontProperties
+
+        chinese_font = FontProperties(fname=request["font_path"])
+        plt.rcParams["font.family"] = [chinese_font.get_name()]
+
+        local_vars = {
+            "plt": plt,
+            "pd": pd,
+            "sns": sns,
+            "chinese_font": chinese_font,
+            "li_colors": {k: tuple(v) for k, v in request["colors"].items()},
+        }
+        exec(request["py_code"], {}, local_vars)
+
+        fig = local_vars.get(request["fname"], None)
+        if not fig:
+            emit(_error("figure_not_found", "⚠️ 图像对象未找到，请确认变量名正确并为 matplotlib 图对象。"))
+            return
+
+        if hasattr(fig, "axes"):
+            for ax in fig.axes:
+                apply_chinese_font(ax, chinese_font)
+
+        # 渲染前对大数据量折线/散点降采样
+        reductions = []
+        if request.get("reduce_options") is not None:
+            import FigDownsample
+            reductions = FigDownsample.reduce_figure(fig, **request["reduce_options"])
+
+        for path in request["save_paths"]:
+            fig.savefig(path, bbox_inches="tight")
+        emit({"status": "success", "save_paths": request["save_paths"], "reductions": reductions})
+    except MemoryError:
+        emit(_error("memory_limit", "绘图代码内存占用超过限制，已终止"))
+    except Exception as e:
+        emit(_error("exec_error", f"❌ 执行失败：{str(e)}\n{traceback.format_exc(limit=3)}"))
+
+
+if __name__ == "__main__":
+    _worker_main()
@@ -1,3 +1,5 @@
 from .tools import get_mcp_tools
+from .result_reader import iter_result_blocks, scan_result_blocks
+from .result_store import ResultStore
 
-__all__ = ["get_mcp_tools"]
\ No newline at end of file
+__all__ = ["get_mcp_tools", "iter_result_blocks", "scan_result_blocks", "ResultStore"]
\ No newline at end of file
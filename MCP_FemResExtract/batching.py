@@ -0,0 +1,102 @@
+import uuid
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Batch:
+    """一个收集中的批次"""
+
+    def __init__(self):
+        self.items: List[Tuple[Any, Future]] = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    微批处理：窗口期内提交到同一键的请求合并为一批执行
+    - 首个请求等待窗口结束（或批次达到上限）后执行整批，其余请求等待各自的结果
+    - 批处理函数按提交顺序返回每个请求的结果；抛出异常时该批所有请求得到同一异常
+    - 窗口为0时不合并，直接逐个执行
+    """
+
+    def __init__(self, run_batch: Callable[[Hashable, List[Any]], List[Any]], window: float, max_items: int = 0):
+        """
+        :param run_batch: 批处理函数 (键, 请求列表) -> 结果列表
+        :param window: 合并窗口（秒）
+        :param max_items: 单批请求数上限，达到后立即执行（0表示不限）
+        """
+        self.run_batch = run_batch
+        self.window = window
+        self.max_items = max_items
+        self._lock = threading.Lock()
+        self._open: Dict[Hashable, _Batch] = {}
+
+    def submit(self, key: Hashable, payload: Any) -> Any:
+        """提交请求并阻塞等待其结果"""
+        if self.window <= 0:
+            return self.run_batch(key, [payload])[0]
+        future: Future = Future()
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            batch.items.append((payload, future))
+            if self.max_items and len(batch.items) >= self.max_items:
+                del self._open[key]
+                batch.full.set()
+        if not leader:
+            return future.result()
+
+        batch.full.wait(self.window)
+        with self._lock:
+            if self._open.get(key) is batch:
+                del self._open[key]
+            items = list(batch.items)
+        try:
+            results = self.run_batch(key, [item for item, _ in items])
+        except BaseException as e:
+            for _, item_future in items:
+                item_future.set_exception(e)
+        else:
+            for (_, item_future), result in zip(items, results):
+                item_future.set_result(result)
+        return future.result()
+
+
+def new_marker() -> str:
+    """生成批次内请求的分段标记（写入options message，用于从合并日志中拆分各请求的结果）"""
+    return f"===== DuraAI batch section {uuid.uuid4().hex} ====="
+
+
+def split_sections(log_content: str, markers: List[str]) -> List[str]:
+    """
+    按分段标记拆分合并执行的日志：每个请求得到公共头部（模型/结果加载信息）及自己标记到下一标记之间的内容
+    标记按顺序查找，返回结果中不含标记行
+    :param log_content: 合并执行的日志
+    :param markers: 各请求的分段标记（与命令链中的顺序一致）
+    :return: 各请求的日志；标记缺失（如META中途退出）时返回完整日志
+    """
+    # 各标记所在行的(行首, 下一行行首)
+    positions: List[Optional[Tuple[int, int]]] = []
+    start = 0
+    for marker in markers:
+        pos = log_content.find(marker, start)
+        if pos < 0:
+            positions.append(None)
+            continue
+        start = pos + len(marker)
+        line_end = log_content.find("\n", start)
+        positions.append((log_content.rfind("\n", 0, pos) + 1, len(log_content) if line_end < 0 else line_end + 1))
+    found = [pos for pos in positions if pos is not None]
+    header = log_content[:found[0][0]] if found else log_content
+    sections: List[str] = []
+    for i, pos in enumerate(positions):
+        if pos is None:
+            sections.append(log_content)
+            continue
+        end = next((p[0] for p in positions[i + 1:] if p is not None), len(log_content))
+        # 去除标记行本身，只保留本请求的输出
+        sections.append(header + log_content[pos[1]:end])
+    return sections
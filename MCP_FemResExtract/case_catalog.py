@@ -0,0 +1,143 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel
+from .fingerprint import file_fingerprint
+
+# META日志中读取结果状态的行，如：Reading "STEP 2        (AnonymousSTEP2),TIME 1.10302734E+00"
+READING_PATTERN = re.compile(r'Reading\s+"([^"]+)"')
+STEP_PATTERN = re.compile(r'STEP\s+(\d+)\s*\(([^)]*)\)\s*,\s*TIME\s+([-+0-9.Ee]+)')
+SUBCASE_PATTERN = re.compile(r'Subcase\s+(\d+)\s*(?:\(([^)]*)\))?')
+# 判断两个时间点等效的容差
+TIME_TOLERANCE = 1e-9
+CATALOG_VERSION = 1
+
+
+class CaseEntry(BaseModel):
+    """结果文件中的一个结果状态"""
+    state_index: int                  # 日志中读取顺序（从0开始）
+    label: str                        # 日志中的原始状态描述
+    step: Optional[int] = None        # ODB分析步编号
+    step_name: Optional[str] = None   # ODB分析步名称
+    time: Optional[float] = None      # ODB时间点
+    subcase: Optional[int] = None     # H3D/Nastran工况编号
+    subcase_label: Optional[str] = None
+    effective: bool = True            # 是否为有效工况（与上一分析步末时刻等效的起始帧为无效）
+    case_id: Optional[int] = None     # 有效工况的case_id（即options state使用的编号）
+
+
+class CaseCatalog(BaseModel):
+    """结果文件的工况目录"""
+    result_file: str
+    source: Dict[str, float] = {}
+    version: int = CATALOG_VERSION
+    entries: List[CaseEntry] = []
+
+    @property
+    def effective_cases(self) -> List[CaseEntry]:
+        return [entry for entry in self.entries if entry.effective]
+
+    def resolve(self, case: Union[int, str]) -> Optional[CaseEntry]:
+        """
+        根据case_id、工况编号/名称或原始状态描述查找有效工况
+        :param case: case_id（int）或字符串（如'STEP 2 TIME 2.0'、'Subcase 3'、分析步/工况名称）
+        :return: 对应的有效工况，未找到返回None
+        """
+        if isinstance(case, int) or (isinstance(case, str) and case.strip().isdigit()):
+            case_id = int(case)
+            return next((e for e in self.effective_cases if e.case_id == case_id), None)
+        text = case.strip()
+        step_match = re.search(r'STEP\s+(\d+).*?TIME\s+([-+0-9.Ee]+)', text, re.IGNORECASE)
+        if step_match:
+            step, time = int(step_match.group(1)), float(step_match.group(2))
+            return next((e for e in self.effective_cases
+                         if e.step == step and e.time is not None and abs(e.time - time) <= TIME_TOLERANCE), None)
+        subcase_match = re.search(r'Subcase\s+(\d+)', text, re.IGNORECASE)
+        if subcase_match:
+            subcase = int(subcase_match.group(1))
+            return next((e for e in self.effective_cases if e.subcase == subcase), None)
+        return next((e for e in self.effective_cases
+                     if text in (e.label, e.step_name, e.subcase_label)), None)
+
+    def to_text(self) -> str:
+        """生成供大模型/用户阅读的有效工况列表"""
+        lines = []
+        for entry in self.effective_cases:
+            if entry.step is not None:
+                lines.append(f"STEP {entry.step} ({entry.step_name}), TIME {entry.time:.8E} (case_id: {entry.case_id})")
+            elif entry.subcase is not None:
+                name = f" ({entry.subcase_label})" if entry.subcase_label else ""
+                lines.append(f"Subcase {entry.subcase}{name} (case_id: {entry.case_id})")
+            else:
+                lines.append(f"{entry.label} (case_id: {entry.case_id})")
+        return "\n".join(lines)
+
+
+def parse_case_catalog(log_content: str, result_file: str = "") -> CaseCatalog:
+    """
+    从META日志的Reading行确定性地生成工况目录
+    仅识别STEP/TIME与Subcase状态行，同一状态可能因多次read命令重复出现，按首次出现顺序去重；
+    ODB中每个分析步的起始帧若与上一帧时间等效（或为初始0时刻）则视为无效工况
+    :param log_content: META_post.log内容
+    :param result_file: 结果文件路径
+    :return: 工况目录
+    """
+    labels = list(dict.fromkeys(
+        label for label in (match.group(1).strip() for match in READING_PATTERN.finditer(log_content))
+        if STEP_PATTERN.search(label) or SUBCASE_PATTERN.search(label)
+    ))
+    entries: List[CaseEntry] = []
+    prev_step, prev_time = None, None
+    for index, label in enumerate(labels):
+        entry = CaseEntry(state_index=index, label=label, case_id=index)
+        step_match = STEP_PATTERN.search(label)
+        subcase_match = SUBCASE_PATTERN.search(label)
+        if step_match:
+            entry.step = int(step_match.group(1))
+            entry.step_name = step_match.group(2).strip()
+            entry.time = float(step_match.group(3))
+            first_frame = entry.step != prev_step
+            if first_frame:
+                same_as_prev = prev_time is not None and abs(entry.time - prev_time) <= TIME_TOLERANCE
+                initial = prev_time is None and abs(entry.time) <= TIME_TOLERANCE
+                entry.effective = not (same_as_prev or initial)
+            prev_step, prev_time = entry.step, entry.time
+        elif subcase_match:
+            entry.subcase = int(subcase_match.group(1))
+            entry.subcase_label = (subcase_match.group(2) or "").strip() or None
+        if not entry.effective:
+            entry.case_id = None
+        entries.append(entry)
+    return CaseCatalog(result_file=result_file, entries=entries)
+
+
+def catalog_path_for(result_file: str) -> str:
+    """工况目录缓存文件：与结果文件同目录的<文件名>_case_catalog.json"""
+    return f"{os.path.splitext(result_file)[0]}_case_catalog.json"
+
+
+def load_cached_catalog(result_file: str) -> Optional[CaseCatalog]:
+    """读取缓存的工况目录，结果文件变化（大小/修改时间）或缓存不存在时返回None"""
+    path = catalog_path_for(result_file)
+    if not os.path.exists(path) or not os.path.exists(result_file):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            catalog = CaseCatalog.model_validate(json.load(f))
+    except (OSError, ValueError):
+        return None
+    if catalog.version != CATALOG_VERSION or catalog.source != file_fingerprint(result_file):
+        return None
+    return catalog
+
+
+def save_catalog(catalog: CaseCatalog) -> str:
+    """写入工况目录缓存，返回缓存文件路径"""
+    catalog.source = file_fingerprint(catalog.result_file)
+    path = catalog_path_for(catalog.result_file)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(catalog.model_dump_json(indent=2))
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,151 @@
+import re
+import hashlib
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# 命令操作类型
+LOAD_GEOM = "load_geom"        # read geom：加载几何
+LOAD_RESULT = "load_result"    # read dis / read onlyfun：加载结果
+OPTION = "option"              # 开关类设置（取值on/off/enable/disable），后设置覆盖先设置
+ADDITIVE = "additive"          # 累加类设置（multilabels/multistates include/exclude），仅去除紧邻的完全重复
+STATE = "state"                # options state：切换工况
+MESSAGE = "message"            # options message：日志分段标记，始终保留
+ACTION = "action"              # 查询/导出/截图等动作，会使用当前设置
+BARRIER = "barrier"            # 会重置模型或设置的命令，之前的状态全部失效
+
+LOAD_GEOM_PATTERN = re.compile(r"^read geom \S+ (.+)$")
+LOAD_RESULT_PATTERN = re.compile(r"^read (dis|onlyfun) ")
+STATE_PATTERN = re.compile(r'^options state "?([^"]*)"?$')
+MESSAGE_PATTERN = re.compile(r"^options message ")
+OPTION_PATTERN = re.compile(
+    r"^(?P<key>(?:identify|write|grstyle)\s(?!advfilter|lres).*?)\s+(?P<value>on|off|enable|disable|enabled|disabled)$"
+)
+ADDITIVE_PATTERN = re.compile(r"^identify outopts multi(?:labels|states) (?:include|exclude) ")
+BARRIER_PATTERN = re.compile(r"^(?:window clearcreate|options metadefaults read|read session|session )")
+
+
+class CommandOp(NamedTuple):
+    """命令链中的一个类型化操作"""
+    kind: str       # 操作类型
+    key: str        # 加载对象/设置项/工况标识
+    value: str      # 设置取值（OPTION）或加载命令（LOAD_RESULT）
+    text: str       # 规范化后的命令文本
+
+
+def normalize_command(command: str) -> str:
+    """规范化命令文本：去除首尾空白，引号外的连续空白合并为一个空格"""
+    parts = re.split(r'("[^"]*")', command.strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def parse_command(command: str) -> CommandOp:
+    """将一条META命令解析为类型化操作"""
+    text = normalize_command(command)
+    match = LOAD_GEOM_PATTERN.match(text)
+    if match:
+        return CommandOp(LOAD_GEOM, match.group(1), "", text)
+    match = LOAD_RESULT_PATTERN.match(text)
+    if match:
+        # key为加载槽位（dis变形结果/onlyfun当前标量函数），value为加载内容
+        return CommandOp(LOAD_RESULT, match.group(1), text, text)
+    match = STATE_PATTERN.match(text)
+    if match:
+        return CommandOp(STATE, match.group(1), "", text)
+    if MESSAGE_PATTERN.match(text):
+        return CommandOp(MESSAGE, "", "", text)
+    if ADDITIVE_PATTERN.match(text):
+        return CommandOp(ADDITIVE, text, "", text)
+    match = OPTION_PATTERN.match(text)
+    if match:
+        return CommandOp(OPTION, match.group("key"), match.group("value"), text)
+    if BARRIER_PATTERN.match(text):
+        return CommandOp(BARRIER, "", "", text)
+    return CommandOp(ACTION, "", "", text)
+
+
+class CommandPlan:
+    """
+    META命令链的类型化表示：去除冗余加载与设置，并生成可作为缓存键的规范形式
+    """
+
+    def __init__(self, ops: List[CommandOp]):
+        self.ops = ops
+
+    @classmethod
+    def from_commands(cls, commands: Iterable[str]) -> "CommandPlan":
+        return cls([parse_command(command) for command in commands if command and command.strip()])
+
+    @property
+    def commands(self) -> List[str]:
+        return [op.text for op in self.ops]
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def optimize(self) -> "CommandPlan":
+        """
+        顺序扫描命令链，去除不改变META状态的命令（不调整动作的先后顺序）：
+            1. 已加载的同一几何文件再次read geom（中间无重置命令）
+            2. 与当前几何下已生效的结果相同的read dis/onlyfun（read onlyfun替换当前标量函数，
+               只有与当前函数相同时才去除，切换回之前的函数时保留）
+            3. 设置为当前已生效取值的开关；两次设置之间没有动作时，前一次设置被覆盖，予以去除
+            4. 紧跟在相同累加类设置之后的重复设置（include/exclude的效果与顺序有关，不跨其他命令去重）
+            5. 切换到当前工况的options state
+        """
+        kept: List[Optional[CommandOp]] = []
+        geometry: Optional[str] = None
+        # 各加载槽位（dis/onlyfun）当前生效的加载命令
+        results: Dict[str, str] = {}
+        options: Dict[str, str] = {}
+        # 上一条保留的命令为累加类设置时的设置文本
+        last_additive: Optional[str] = None
+        state: Optional[str] = None
+        # 自上一个动作以来设置的开关（设置项 -> kept中的位置）
+        pending: Dict[str, int] = {}
+
+        for op in self.ops:
+            if op.kind == LOAD_GEOM:
+                if op.key == geometry:
+                    continue
+                geometry, state = op.key, None
+                results.clear()
+            elif op.kind == LOAD_RESULT:
+                if geometry is not None and results.get(op.key) == op.value:
+                    continue
+                if op.key == "dis":
+                    # 重新加载变形结果后不再假定之前的标量函数仍然生效
+                    results.pop("onlyfun", None)
+                results[op.key] = op.value
+                state = None
+            elif op.kind == OPTION:
+                if op.key in pending:
+                    kept[pending.pop(op.key)] = None
+                elif options.get(op.key) == op.value:
+                    continue
+                options[op.key] = op.value
+                pending[op.key] = len(kept)
+            elif op.kind == ADDITIVE:
+                if op.key == last_additive:
+                    continue
+            elif op.kind == STATE:
+                if op.key == state:
+                    continue
+                state = op.key
+            elif op.kind == ACTION:
+                pending.clear()
+            elif op.kind == BARRIER:
+                geometry, state = None, None
+                results.clear()
+                options.clear()
+                pending.clear()
+            kept.append(op)
+            last_additive = op.key if op.kind == ADDITIVE else None
+        return CommandPlan([op for op in kept if op is not None])
+
+    def canonical(self) -> str:
+        """优化后命令链的规范文本（每行一条命令），相同语义的命令链得到相同文本"""
+        return "\n".join(self.optimize().commands)
+
+    def cache_key(self) -> str:
+        """规范文本的SHA-256摘要，用作META结果缓存/去重的键"""
+        return hashlib.sha256(self.canonical().encode("utf-8")).hexdigest()
+
@@ -1,4 +1,5 @@
 import subprocess
+import numpy as np
 import pandas as pd
 import csv
 from typing import List, Dict, Union, Optional, Tuple, Any
@@ -8,11 +9,71 @@ from langchain_openai import ChatOpenAI
 from langchain_deepseek import ChatDeepSeek
 from dotenv import load_dotenv
 import EnvConfig
+from Metrics import metrics
+from .result_store import ResultStore
+from .result_reader import write_wide_results, scan_result_blocks
+from .fatigue import SNCurve, miner_damage, material_curve_index
+from .rainflow import rainflow_damage
+from .command_plan import CommandPlan
+from .scheduler import MetaScheduler, SingleFlight, current_user
+from .batching import MicroBatcher, new_marker, split_sections
+from .case_catalog import CaseCatalog, parse_case_catalog, load_cached_catalog, save_catalog
+from .prefetch import (ResultPrefetcher, build_entity_index, build_part_summary, entity_index_path_for,
+                       part_summary_path_for, save_summary, load_summary)
+from .file_catalog import ResultFileCatalog, STATUS_QUEUED, STATUS_READY, STATUS_ERROR
 from PIL import Image, ImageDraw, ImageFont
-import os, datetime, json
+import os, datetime, json, shutil, tempfile, hashlib, sqlite3
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 env = EnvConfig.EnvConfig()
 
+# 各结果文件类型读取变形结果的函数名（read dis）及各结果类型对应的标量函数（read onlyfun）
+RESULT_DEFORMATIONS = {"Hypermesh": "Displacement", "Abaqus": "Displacements"}
+RESULT_FUNCTIONS = {
+    "Hypermesh": {
+        "Displacement": "Displacement,Magnitude",
+        "Mises": "ElementStresses(2D&3D),VonMises,Max",
+    },
+    "Abaqus": {
+        "Displacement": "Displacements,Magnitude",
+        "Mises": "Stresscomponents,VonMises,MaxofInOut/AllLayers,Centroid",
+        "Strain": "Straincomponents,Triaxiality,MaxofInOut/AllLayers,Centroid",
+        "PlasticStrain": "Equivalentplasticstrain,MaxofInOut/AllLayers,Centroid",
+    },
+}
+
+# 全量导出可选输出字段（列投影）对应的identify outopts设置项，Id及结果字段FunctionTop始终输出
+EXPORT_COLUMN_OPTIONS = {
+    "node": {"origPosx": "origposx", "origPosy": "origposy", "origPosz": "origposz", "Name": "name", "Comment": "comment"},
+    "element": {"Name": "elemname", "Comment": "comment", "Cog": "cog", "Nodes": "nodes"},
+}
+
+# 截图拼接支持的布局及输出格式（格式 -> 扩展名）
+STITCH_LAYOUTS = ("vertical", "horizontal", "grid")
+STITCH_FORMATS = {"webp": ".webp", "jpeg": ".jpg", "jpg": ".jpg", "png": ".png"}
+# 拼接图输出路径中可直接使用的扩展名（决定保存格式）
+STITCH_EXTENSIONS = (".webp", ".jpg", ".jpeg", ".png")
+
+# 云图截图视图角度（按原固定顺序）、预览模式默认视图与分辨率
+SCREENSHOT_VIEWS = ("isometric", "top", "front", "left", "btm", "back", "right")
+PREVIEW_VIEWS = ("isometric",)
+PREVIEW_RESOLUTION = (800, 600)
+# 截图前调整META图形窗口尺寸的命令模板
+WINDOW_SIZE_COMMAND = 'window resize "MetaPost" {width},{height}'
+
+
+@lru_cache(maxsize=8)
+def _load_label_font(size: int) -> ImageFont.ImageFont:
+    """加载截图标注字体（优先使用配置的中文字体），结果按字号缓存"""
+    for font_file in (env.font_path, "arial.ttf"):
+        try:
+            return ImageFont.truetype(font_file, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
 # 初始化大模型
 # model = ChatDeepSeek(model="deepseek-chat",api_key=env.deepseek_api_key)
 model = ChatOpenAI(
@@ -21,12 +82,61 @@ model = ChatOpenAI(
     base_url=env.li_api_URL_v3,
 )
 
+# 无法从日志中解析出工况时，提示大模型自行推导工况编号的说明
+CASE_TEACHING_SECTION = """            6. 日志文件中以Reading开头的行表示正在读取的结果文件，这些行信息包含结果文件中的工况数量信息：
+                对于ODB文件需要特殊注意。例如日志内容为:
+                Reading "STEP 1        (AnonymousSTEP1),TIME 0.00000000E+00"
+                Reading "STEP 1        (AnonymousSTEP1),TIME 1.00000000E+00"
+                Reading "STEP 2        (AnonymousSTEP2),TIME 1.00000000E+00"
+                Reading "STEP 2        (AnonymousSTEP2),TIME 1.10302734E+00"
+                Reading "STEP 2        (AnonymousSTEP2),TIME 1.36381531E+00"
+                Reading "STEP 2        (AnonymousSTEP2),TIME 2.00000000E+00"
+                Reading "STEP 3        (AnonymousSTEP3),TIME 2.00000000E+00"
+                Reading "STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00"
+                其中共有三个分析步骤，STEP 1包含两个时间点（0和1），STEP 2包含四个时间点（1、1.103、1.364和2），STEP 3包含两个时间点（2和3）。
+                注意：STEP 1工况的TIME 1与STEP 2工况的TIME 0是等效的，在提取工况信息时，请特别注意这种时间点的等效性，避免重复提取或遗漏信息。第一个时间节点开始的工况编号为0，依次类推(STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00的id为7)。
+                所以最终有效的工况为：
+                STEP 1        (AnonymousSTEP1),TIME 1.00000000E+00 (case_id: 1)
+                STEP 2        (AnonymousSTEP2),TIME 1.10302734E+00 (case_id: 3)
+                STEP 2        (AnonymousSTEP2),TIME 1.36381531E+00 (case_id: 4)
+                STEP 2        (AnonymousSTEP2),TIME 2.00000000E+00 (case_id: 5)
+                STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00 (case_id: 7)"""
+
+
+class ResultSubQuery(BaseModel):
+    """批量结果查询中的一个子查询"""
+    type: str = Field(description="子查询类型（'node', 'element', 'part', 'material', 'set'实体结果；'max'实体最大结果；'model_info'模型信息）")
+    ids_per_case: Optional[Dict[int, List[int]]] = Field(default=None, description="字典，键为工况ID，值为该工况下的实体ID列表")
+    names_per_case: Optional[Dict[int, List[str]]] = Field(default=None, description="字典，键为工况ID，值为该工况下的实体名称列表")
+    entity_type: Optional[str] = Field(default=None, description="max子查询的实体类型（'material', 'property', 'ansapart'）")
+    node_or_element_result: str = Field(default="node", description="max子查询使用节点还是单元结果（'node'或'element'，默认'node'）")
+    info_type: Optional[str] = Field(default=None, description="model_info子查询的信息类型（'loads', 'spc', 'ansapart', 'property', 'material', 'set'）")
+    query: Optional[str] = Field(default=None, description="从该子查询日志中提取相关信息的查询需求（可选，不填返回原始日志）")
+
+
+# 进程内共享的META任务调度器
+meta_scheduler = MetaScheduler(env.meta_license_seats, env.meta_reserved_interactive_seats)
+# 进行中META任务去重：命令链规范形式相同的并发请求共享同一次执行
+meta_inflight = SingleFlight()
+# 管理目录下结果文件的SQLite目录
+result_file_catalog = ResultFileCatalog(env.catalog_db_path, env.manage_root_path, env.catalog_vehicle_pattern)
+
 
 class MCPToolKit:
     """有限元分析结果查询工具集，支持完整操作链（优化后支持多ID和名称批量查询）"""
     
-    def __init__(self, meta_post_path: str = env.metabath_path):
+    def __init__(self, meta_post_path: str = env.metabath_path, use_sudo: bool = env.meta_sudo, scheduler: MetaScheduler = None,
+                 prefetch: bool = env.prefetch_enabled, file_catalog: ResultFileCatalog = None):
         self.meta_post_path = meta_post_path
+        self.use_sudo = use_sudo
+        # META任务调度器（按许可证数限制并发，默认使用进程内共享的调度器）
+        self.scheduler = scheduler or meta_scheduler
+        self.inflight = meta_inflight
+        # 多实体结果查询微批处理：窗口期内同一结果文件、同一结果类型的查询合并为一次META执行
+        self.batcher = MicroBatcher(self._run_entity_batch, env.meta_batch_window_ms / 1000, env.meta_batch_max_queries)
+        # 结果文件预热：首次引用时后台生成工况目录、结果库、实体索引及部件摘要
+        self.prefetcher = ResultPrefetcher(self._warm_up, env.prefetch_workers) if prefetch else None
+        self.file_catalog = file_catalog or result_file_catalog
         self.output_dir = "./"
         # 实体类型与命令参数映射表，新增name参数支持
         self.entity_type_map = {
@@ -37,67 +147,114 @@ class MCPToolKit:
             "set": ("Groups", "nodeoutput", "id.range", "name"),  # 新增集合类型
         }
     
-    def _stitch_screenshots(self, screenshot_paths: List[str], output_path: str = None) -> str:
+    def _stitch_screenshots(
+        self,
+        screenshot_paths: List[str],
+        output_path: str = None,
+        labels: List[str] = None,
+        layout: str = "vertical",
+        columns: int = 2,
+        image_format: str = env.stitch_format,
+    ) -> str:
         """
-        将多个截图纵向拼接成一张图片，并在每张图片下方添加视图角度标注，完成后删除原始图片
+        将多个截图拼接成一张图片，并在每张图片下方添加视图角度标注，完成后删除原始图片
+        各视图并行解码，同时在途（已解码未粘贴）的视图不超过并行线程数，解码完成即粘贴并释放，峰值内存约为画布加线程数个视图
         :param screenshot_paths: 截图文件路径列表
-        :param output_path: 输出文件路径，默认为None，将在第一个截图同目录下生成
+        :param output_path: 输出文件路径，默认为None，将在第一个截图同目录下生成；扩展名为.webp/.jpg/.jpeg/.png时按该格式保存，
+                            否则追加image_format对应的扩展名
+        :param labels: 每张截图的标注文字，默认为None，从文件名中提取
+        :param layout: 拼接布局（'vertical'纵向、'horizontal'横向、'grid'网格）
+        :param columns: 网格布局的列数
+        :param image_format: 输出格式（'webp'、'jpeg'、'png'），同时生成同格式缩略图
         :return: 拼接后的图片HTML格式字符串
         """
         if not screenshot_paths:
             raise ValueError("截图路径列表不能为空")
+        if layout not in STITCH_LAYOUTS:
+            raise ValueError(f"不支持的拼接布局: {layout}，支持布局：{list(STITCH_LAYOUTS)}")
         
-        # 打开所有图片
         # 检查文件是否存在
         for path in screenshot_paths:
             if not os.path.exists(path):
                 raise FileNotFoundError(f"文件不存在: {path}")
         
-        images = [Image.open(path) for path in screenshot_paths]
-        
-        # 获取每张图片的宽度和高度
-        widths, heights = zip(*(img.size for img in images))
+        if labels is None:
+            # 从文件名中提取视图角度（文件名格式：..._default_<view>_<日期>_<时间>.png）
+            labels = [os.path.basename(path).split('_default_')[-1].split('_')[0] for path in screenshot_paths]
         
-        # 计算拼接后图片的总高度和最大宽度
-        total_height = sum(heights)
-        max_width = max(widths)
+        # 只读取图片头获取尺寸，不解码像素
+        sizes = []
+        for path in screenshot_paths:
+            with Image.open(path) as img:
+                sizes.append(img.size)
         
-        # 创建新的空白图片，预留空间用于文字标注（每张图片下方预留50像素）
-        stitched_image = Image.new('RGB', (max_width, total_height + len(images)*50), color='white')
+        # 计算每张图片的粘贴位置，每张图片下方预留50像素用于文字标注
+        label_height = 50
+        cell_width = max(w for w, _ in sizes)
+        cell_height = max(h for _, h in sizes) + label_height
+        positions = []
+        if layout == "vertical":
+            y_offset = 0
+            for _, h in sizes:
+                positions.append((0, y_offset))
+                y_offset += h + label_height
+            canvas_size = (cell_width, y_offset)
+        elif layout == "horizontal":
+            x_offset = 0
+            for w, _ in sizes:
+                positions.append((x_offset, 0))
+                x_offset += w + 10
+            canvas_size = (x_offset - 10, cell_height)
+        else:
+            columns = max(1, min(columns, len(sizes)))
+            rows = (len(sizes) + columns - 1) // columns
+            positions = [((i % columns) * cell_width, (i // columns) * cell_height) for i in range(len(sizes))]
+            canvas_size = (columns * cell_width, rows * cell_height)
         
-        # 准备绘制文字
+        stitched_image = Image.new('RGB', canvas_size, color='white')
         draw = ImageDraw.Draw(stitched_image)
-        # 修改字体加载方式，使用默认字体
-        try:
-            font = ImageFont.truetype("arial.ttf", 30)
-        except OSError:
-            font = ImageFont.load_default()
+        font = _load_label_font(30)
         
-        # 将每张图片粘贴到新图片上，并添加标注
-        y_offset = 0
-        for i, (img, path) in enumerate(zip(images, screenshot_paths)):
-            # 获取视图角度（从文件名中提取）
-            view_name = os.path.basename(path).split('_')[-2].replace('_', ' ')
-            
-            # 粘贴图片
-            stitched_image.paste(img, (0, y_offset))
-            
-            # 添加视图角度标注
-            draw.text((10, y_offset + img.size[1] + 10), 
-                     f"视图角度: {view_name}", 
-                     fill="black", 
-                     font=font)
-            
-            y_offset += img.size[1] + 50
+        def _decode(path):
+            with Image.open(path) as img:
+                return img.convert('RGB')
+        
+        # 并行解码：最多同时提交workers个解码任务，每完成一个即粘贴、释放并补充提交下一个
+        workers = min(len(screenshot_paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            queued = iter(range(len(screenshot_paths)))
+            in_flight = {pool.submit(_decode, screenshot_paths[i]): i for i in islice(queued, workers)}
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = in_flight.pop(future)
+                    img = future.result()
+                    x, y = positions[i]
+                    stitched_image.paste(img, (x, y))
+                    draw.text((x + 10, y + img.size[1] + 10), f"视图角度: {labels[i]}", fill="black", font=font)
+                    img.close()
+                    next_index = next(queued, None)
+                    if next_index is not None:
+                        in_flight[pool.submit(_decode, screenshot_paths[next_index])] = next_index
         
-        # 如果没有指定输出路径，则在第一个截图同目录下生成
+        # 如果没有指定输出路径，则在第一个截图同目录下生成；指定的输出路径带有支持的图片扩展名时按该格式保存
+        ext = STITCH_FORMATS.get(image_format.lower(), STITCH_FORMATS["png"])
         if output_path is None:
             base_dir = os.path.dirname(screenshot_paths[0])
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = os.path.join(base_dir, f"stitched_image_{timestamp}.png")
+            output_path = os.path.join(base_dir, f"stitched_image_{timestamp}")
+        output_base, output_ext = os.path.splitext(output_path)
+        if output_ext.lower() in STITCH_EXTENSIONS:
+            ext = output_ext
+        else:
+            output_path = output_base + ext
+        thumbnail_path = output_base + "_thumb" + ext
         
-        # 保存拼接后的图片
-        stitched_image.save(output_path)
+        # 保存压缩后的拼接图片及缩略图
+        self._save_compressed(stitched_image, output_path)
+        stitched_image.thumbnail((env.stitch_thumbnail_size, env.stitch_thumbnail_size))
+        self._save_compressed(stitched_image, thumbnail_path)
+        stitched_image.close()
         
         # 删除原始图片
         for path in screenshot_paths:
@@ -108,59 +265,127 @@ class MCPToolKit:
         
         # 返回HTML格式字符串
         filename = os.path.basename(output_path)
-        return f"<img src='/images/{filename}' style='max-width: 100%; height: auto;'>"
+        thumbnail_name = os.path.basename(thumbnail_path)
+        return (f"<img src='/images/{filename}' data-thumbnail='/images/{thumbnail_name}' "
+                f"style='max-width: 100%; height: auto;'>")
 
-    def _run_commands(self, commands: List[str], query: str = None) -> str:
+    @staticmethod
+    def _save_compressed(image: Image.Image, path: str) -> None:
+        """按扩展名以压缩格式保存图片（webp/jpeg有损压缩，png无损压缩）"""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".webp":
+            image.save(path, "WEBP", quality=env.stitch_quality, method=4)
+        elif ext in (".jpg", ".jpeg"):
+            image.save(path, "JPEG", quality=env.stitch_quality, optimize=True, progressive=True)
+        else:
+            image.save(path, "PNG", optimize=True)
+
+    def _run_commands(self, commands: List[str], query: str = None, priority: str = "interactive", label: str = "query") -> str:
         """执行META命令序列并返回日志
         :param commands: 命令列表
         :param query: 查询需求，用于从日志中提取相关信息
+        :param priority: 调度优先级（interactive交互查询、screenshot截图、bulk批量导出）
+        :param label: 任务标签（工具方法名），用于耗时估算及队列展示
         :return: 执行结果或提取的相关信息
         """
-        with open('./commands.txt', 'w', encoding='utf-8') as f:
-            f.write('\n'.join(commands))
         try:
+            log_content = self._run_meta(commands, priority, label)
+        except Exception as e:
+            return f"Error: {str(e)}"
+        return self._log_result(log_content, query)
+
+    def _run_meta(self, commands: List[str], priority: str = "interactive", label: str = "query") -> Optional[str]:
+        """优化命令链后按许可证排队执行，返回META_post.log内容（未生成日志时返回None）
+        相同命令链正在执行时等待其结果，不再启动新的META进程
+        """
+        # 去除冗余的重复加载及设置命令
+        plan = CommandPlan.from_commands(commands).optimize()
+        metrics.inc("meta_commands_removed_total", len(commands) - len(plan))
+        commands = plan.commands
+        with metrics.span("meta_job", priority=priority) as span:
+            log_content, shared = self.inflight.do(
+                plan.cache_key(),
+                lambda: self.scheduler.run(lambda: self._execute_commands(commands), priority=priority, label=label)
+            )
+            span["coalesced"] = shared
+        if shared:
+            metrics.inc("meta_coalesced_total", label=label)
+        return log_content
+
+    def _log_result(self, log_content: Optional[str], query: str = None) -> str:
+        """返回日志内容，提供查询需求时用大模型提取相关信息（在释放许可证后进行）"""
+        if query and log_content is not None:
+            return self._extract_relevant_info(log_content, query)
+        return log_content if log_content is not None else "Log file not found"
+
+    def _execute_commands(self, commands: List[str]) -> Optional[str]:
+        """在独立的任务目录中启动META执行命令序列，返回META_post.log内容（未生成日志时返回None）
+        每个任务使用单独的工作目录，并发执行时commands.txt与META_post.log互不覆盖
+        :param commands: 命令列表
+        :return: 日志内容
+        """
+        os.makedirs(env.meta_work_dir, exist_ok=True)
+        job_dir = tempfile.mkdtemp(prefix="meta_job_", dir=env.meta_work_dir)
+        try:
+            with open(os.path.join(job_dir, 'commands.txt'), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(commands))
+            # 命令中以相对路径引用的META默认配置文件
+            if os.path.exists('./META.default'):
+                os.symlink(os.path.abspath('./META.default'), os.path.join(job_dir, 'META.default'))
             # 构建完整命令字符串（用分号分隔）
             command_str = ';'.join(commands)
             # print(command_str)
-            full_command = [
-                'sudo', '-E',
+            full_command = (['sudo', '-E'] if self.use_sudo else []) + [
                 self.meta_post_path,
                 '-b', '-noses','-fastses', '-exec',
                 f"{command_str}"
             ]
             # 执行命令
-            out = subprocess.run(
-                full_command,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="ignore"
-            )
+            with metrics.span("meta_run") as span:
+                span["n_commands"] = len(commands)
+                out = subprocess.run(
+                    full_command,
+                    capture_output=True,
+                    text=True,
+                    encoding="utf-8",
+                    errors="ignore",
+                    cwd=job_dir
+                )
+                span["exit_code"] = out.returncode
+            metrics.inc("subprocess_exit_total", component="meta_post", code=out.returncode)
             # print(out)
-            return self._extract_log_content(query)
-        except Exception as e:
-            return f"Error: {str(e)}"
-    
+            return self._read_log(job_dir)
+        finally:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+    def _read_log(self, log_dir: str) -> Optional[str]:
+        """读取指定目录下的META_post.log文件内容，不存在时返回None"""
+        log_file = os.path.join(log_dir, "META_post.log")
+        if not os.path.exists(log_file):
+            return None
+        with metrics.span("meta_log_read") as span:
+            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+            span["bytes"] = os.path.getsize(log_file)
+        metrics.inc("meta_log_bytes_total", span["bytes"])
+        return content
+
     def _extract_log_content(self, query: str = None) -> str:
         """读取当前工作目录下的META_post.log文件内容
         :param query: 查询需求，用于从日志中提取相关信息
         :return: 日志内容或提取的相关信息
         """
         try:
-            current_dir = os.getcwd()
-            log_file = os.path.join(current_dir, "META_post.log")
-            
-            if os.path.exists(log_file):
-                with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                
-                # 如果提供了查询需求，则通过大模型提取相关信息
-                if query:
-                    return self._extract_relevant_info(content, query)
-                
-                return content
-            else:
+            log_file = os.path.join(os.getcwd(), "META_post.log")
+            content = self._read_log(os.getcwd())
+            if content is None:
                 return f"Log file not found at: {log_file}"
+            
+            # 如果提供了查询需求，则通过大模型提取相关信息
+            if query:
+                return self._extract_relevant_info(content, query)
+            
+            return content
         except Exception as e:
             return f"An error occurred while extracting log content: {str(e)}"
     
@@ -171,6 +396,14 @@ class MCPToolKit:
         :return: 提取的相关信息
         """
         try:
+            # 日志中的工况信息可确定性解析时，直接给出去重后的工况列表，不再让大模型推导等效时间点
+            catalog = parse_case_catalog(log_content)
+            if catalog.entries:
+                case_section = ("            6. 日志中的工况已按STEP/TIME等效性去重，有效工况及case_id如下（直接使用，无需再推导）：\n"
+                                + catalog.to_text())
+            else:
+                case_section = CASE_TEACHING_SECTION
+            
             # 构造提示词
             prompt = f"""
             你是一个专业的有限元分析结果处理助手。用户需要从下面的日志内容中提取与查询需求相关的信息。
@@ -188,28 +421,17 @@ class MCPToolKit:
             3. 当用户询问特定工况的载荷情况时，只需要提取对应id后的载荷信息，不要包含其他工况的载荷数据。
             4. 请确保提取的信息完整且准确，以简洁的信息格式返回需要的信息。如果查询需求无法满足，请返回"未找到相关信息"。
             5. 如果查询的节点存在局部坐标系，需要同时提取并返回全局坐标及局部坐标系下的位移
-            6. 日志文件中以Reading开头的行表示正在读取的结果文件，这些行信息包含结果文件中的工况数量信息：
-                对于ODB文件需要特殊注意。例如日志内容为:
-                Reading "STEP 1        (AnonymousSTEP1),TIME 0.00000000E+00"
-                Reading "STEP 1        (AnonymousSTEP1),TIME 1.00000000E+00"
-                Reading "STEP 2        (AnonymousSTEP2),TIME 1.00000000E+00"
-                Reading "STEP 2        (AnonymousSTEP2),TIME 1.10302734E+00"
-                Reading "STEP 2        (AnonymousSTEP2),TIME 1.36381531E+00"
-                Reading "STEP 2        (AnonymousSTEP2),TIME 2.00000000E+00"
-                Reading "STEP 3        (AnonymousSTEP3),TIME 2.00000000E+00"
-                Reading "STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00"
-                其中共有三个分析步骤，STEP 1包含两个时间点（0和1），STEP 2包含四个时间点（1、1.103、1.364和2），STEP 3包含两个时间点（2和3）。
-                注意：STEP 1工况的TIME 1与STEP 2工况的TIME 0是等效的，在提取工况信息时，请特别注意这种时间点的等效性，避免重复提取或遗漏信息。第一个时间节点开始的工况编号为0，依次类推(STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00的id为7)。
-                所以最终有效的工况为：
-                STEP 1        (AnonymousSTEP1),TIME 1.00000000E+00 (case_id: 1)
-                STEP 2        (AnonymousSTEP2),TIME 1.10302734E+00 (case_id: 3)
-                STEP 2        (AnonymousSTEP2),TIME 1.36381531E+00 (case_id: 4)
-                STEP 2        (AnonymousSTEP2),TIME 2.00000000E+00 (case_id: 5)
-                STEP 3        (AnonymousSTEP3),TIME 3.00000000E+00 (case_id: 7)
+{case_section}
             """
             
-            # 调用大模型
-            response = model.invoke(prompt)
+            # 调用大模型，记录耗时及token用量
+            with metrics.span("llm_extract") as span:
+                response = model.invoke(prompt)
+                usage = getattr(response, "usage_metadata", None) or {}
+                span["prompt_tokens"] = usage.get("input_tokens", 0)
+                span["completion_tokens"] = usage.get("output_tokens", 0)
+            metrics.inc("llm_tokens_total", span["prompt_tokens"], kind="prompt", component="log_extract")
+            metrics.inc("llm_tokens_total", span["completion_tokens"], kind="completion", component="log_extract")
             
             # 返回提取的信息
             return response.content if hasattr(response, 'content') else str(response)
@@ -219,8 +441,10 @@ class MCPToolKit:
     def _build_geometry_path(self, result_file: str) -> str:
         """根据结果文件自动推断几何文件路径
         :param result_file: 结果文件路径
-        :return: 几何文件路径
+        :return: 几何文件路径（绝对路径）
         """
+        # META在临时任务目录中运行，相对路径需按当前工作目录转为绝对路径
+        result_file = os.path.abspath(result_file)
         base_path = os.path.splitext(result_file)[0]
         ext = os.path.splitext(result_file)[1].lower()
         self.output_dir = os.path.dirname(result_file)
@@ -245,105 +469,179 @@ class MCPToolKit:
         :param result_category: 结果类型（如Displacement, Mises等）
         :return: 命令列表
         """
+        if self.prefetcher is not None:
+            self.prefetcher.touch(result_file)
+        result_file = os.path.abspath(result_file)
         try:
             geometry_file = self._build_geometry_path(result_file)
         except (FileNotFoundError, ValueError) as e:
             return [f"echo '{str(e)}'"]
         
-        ext = os.path.splitext(result_file)[1].lower()
-        result_type = "Hypermesh" if ext == ".h3d" else "Abaqus" if ext == ".odb" else "Unknown"
-        
+        result_type = self._result_file_type(result_file)
         commands = [f"read geom AUTO {geometry_file}"]
+        if result_category in RESULT_FUNCTIONS.get(result_type, {}):
+            commands.extend([
+                f"read dis {result_type} {result_file} all {RESULT_DEFORMATIONS[result_type]}",
+                self._read_function_command(result_file, result_category)
+            ])
         
-        if result_type == "Hypermesh":
-            if result_category == "Displacement":
-                commands.extend([
-                    f"read dis Hypermesh {result_file} all Displacement",
-                    f"read onlyfun Hypermesh {result_file} all Displacement,Magnitude"
-                ])
-            elif result_category == "Mises":
-                commands.extend([
-                    f"read dis Hypermesh {result_file} all Displacement",
-                    f"read onlyfun Hypermesh {result_file} all ElementStresses(2D&3D),VonMises,Max",
-                ])
-        
-        elif result_type == "Abaqus":
-            if result_category == "Displacement":
-                commands.extend([
-                    f'read dis Abaqus {result_file} all Displacements',
-                    f"read onlyfun Abaqus {result_file} all Displacements,Magnitude"
-                ])
-            elif result_category == "Mises":
-                commands.extend([
-                    f'read dis Abaqus {result_file} all Displacements',
-                    f"read onlyfun Abaqus {result_file} all Stresscomponents,VonMises,MaxofInOut/AllLayers,Centroid"
-                ])
-            elif result_category == "Strain":
-                commands.extend([
-                    f'read dis Abaqus {result_file} all Displacements',
-                    f"read onlyfun Abaqus {result_file} all Straincomponents,Triaxiality,MaxofInOut/AllLayers,Centroid"
-                ])
-            elif result_category == "PlasticStrain":
-                commands.extend([
-                    f'read dis Abaqus {result_file} all Displacements',
-                    f"read onlyfun Abaqus {result_file} all Equivalentplasticstrain,MaxofInOut/AllLayers,Centroid"
-                ])
-        
         return commands
+
+    @staticmethod
+    def _result_file_type(result_file: str) -> str:
+        """结果文件类型：.h3d为Hypermesh，.odb为Abaqus"""
+        ext = os.path.splitext(result_file)[1].lower()
+        return "Hypermesh" if ext == ".h3d" else "Abaqus" if ext == ".odb" else "Unknown"
+
+    def _read_function_command(self, result_file: str, result_category: str) -> str:
+        """读取指定结果类型标量函数的read onlyfun命令"""
+        result_type = self._result_file_type(result_file)
+        return f"read onlyfun {result_type} {os.path.abspath(result_file)} all {RESULT_FUNCTIONS[result_type][result_category]}"
+
+    @staticmethod
+    def _export_option_commands(entity: str, case_ids: List[int] = None, columns: List[str] = None) -> List[str]:
+        """全量结果导出（identify lres）前的输出设置：默认输出所有工况，只输出原始坐标/属性及标量结果
+        :param entity: 实体类型（node/element）
+        :param case_ids: 只导出的工况ID列表，默认全部工况
+        :param columns: 输出字段列表（列投影，见EXPORT_COLUMN_OPTIONS），默认使用上述输出设置
+        :return: 命令列表，字段不支持时抛出ValueError
+        """
+        commands = [
+            'identify outopts multistates enable',
+            'identify outopts multilabels include disp all',
+            'identify outopts multilabels include scalar all',
+        ]
+        if case_ids:
+            commands.append(f'identify outopts multistates include {",".join(map(str, case_ids))}')
+        else:
+            commands.extend([
+                'identify outopts multistates include all',
+                'identify outopts multistates exclude 0',
+            ])
+        if entity == "node":
+            commands.extend([
+                'identify node outopts origposx on',
+                'identify node outopts origposy on',
+                'identify node outopts origposz on',
+                'identify node outopts posx off',
+                'identify node outopts posy off',
+                'identify node outopts posz off',
+                'identify node outopts comment off',
+                'identify node outopts ldispx off',
+                'identify node outopts ldispy off',
+                'identify node outopts ldispz off',
+                'identify node outopts name off',
+                'identify node outopts scalartop off',
+                'identify node outopts scalarbot off',
+                'identify node outopts functop on',
+                'identify node outopts funcbot off',
+                'identify node outopts udispx off',
+                'identify node outopts udispy off',
+                'identify node outopts udispz off',
+                'identify node outopts vectorbot off',
+                'identify node outopts vectortop off',
+                'identify node outopts xfunctop off',
+                'identify node outopts xfuncbot off',
+                'identify node outopts yfunctop off',
+                'identify node outopts yfuncbot off',
+                'identify node outopts zfunctop off',
+                'identify node outopts zfuncbot off',
+            ])
+        else:
+            commands.extend([
+                'identify element outopts cog off',
+                'identify element outopts cornbot off',
+                'identify element outopts corntop off',
+                'identify element outopts elemname off',
+                'identify element outopts comment off',
+                'identify element outopts scalartop off',
+                'identify element outopts scalarbot off',
+                'identify element outopts funcbot off',
+                'identify element outopts functop on',
+                'identify element outopts funccorn off',
+                "identify element outopts vectormagtop off",
+                "identify element outopts vectormagbot off",
+                "identify element outopts vectortop off",
+                "identify element outopts vectorbottom off",
+                "identify element outopts vectorcomponents off",
+                'identify element outopts nodes off',
+                'identify element outopts principaltensor off',
+            ])
+        if columns is not None:
+            # 列投影：覆盖上面的默认设置（命令链优化时会去除被覆盖的设置）
+            options = EXPORT_COLUMN_OPTIONS[entity]
+            unknown = [column for column in columns if column not in options and column not in ("Id", "FunctionTop")]
+            if unknown:
+                raise ValueError(f"不支持的输出字段: {unknown}，可选字段：{list(options)}（Id及FunctionTop始终输出）")
+            for column, option in options.items():
+                commands.append(f'identify {entity} outopts {option} {"on" if column in columns else "off"}')
+        return commands
+
+    @staticmethod
+    def _entity_filter_commands(pids: List[int] = None, mids: List[int] = None, set_ids: List[int] = None) -> List[str]:
+        """全量导出的实体筛选：隐藏全部实体后只显示指定属性/材料/集合，未指定筛选时返回空列表"""
+        filters = [f'add {kind} {",".join(map(str, ids))}' for kind, ids in (("pid", pids), ("mid", mids), ("set", set_ids)) if ids]
+        return ['erase all'] + filters if filters else []
+
+    def _export_commands(
+        self,
+        entity: str,
+        output_path: str,
+        case_ids: List[int] = None,
+        pids: List[int] = None,
+        mids: List[int] = None,
+        set_ids: List[int] = None,
+        columns: List[str] = None,
+    ) -> List[str]:
+        """构建全量/部分结果导出命令（不含模型及结果加载命令）：输出设置、实体筛选及identify lres
+        有实体筛选时只导出可见实体（identify lres visible）
+        """
+        commands = self._export_option_commands(entity, case_ids, columns)
+        filters = self._entity_filter_commands(pids, mids, set_ids)
+        commands.extend(filters)
+        commands.append(f'identify {entity} lres {"visible" if filters else "all"} "{output_path}"')
+        return commands
+
+    @staticmethod
+    def _export_output_path(result_file: str, entity: str, result_category: str, selection: Dict[str, Any]) -> str:
+        """导出CSV路径：全量导出为<文件名>_all_<实体>_<结果类型>_results.csv，
+        按工况/实体/字段筛选的部分导出在文件名中加入筛选条件摘要，避免覆盖全量结果；返回绝对路径
+        """
+        base_path = os.path.splitext(os.path.abspath(result_file))[0]
+        if all(value is None for value in selection.values()):
+            return f'{base_path}_all_{entity}_{result_category}_results.csv'
+        digest = hashlib.sha1(json.dumps(selection, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+        return f'{base_path}_subset_{entity}_{result_category}_{digest}_results.csv'
     
     def get_all_node_results(
         self, 
         result_file: str, 
         result_category: str, 
+        case_ids: List[int] = None,
+        pids: List[int] = None,
+        mids: List[int] = None,
+        set_ids: List[int] = None,
+        columns: List[str] = None,
     ) -> Tuple[str, str]:
-        """获取所有工况下所有节点结果（输出到CSV文件）
+        """获取所有工况下所有节点结果（输出到CSV文件），可按工况、属性/材料/集合及输出字段筛选
         :param result_file: 结果文件路径
         :param result_category: 结果类型（如Displacement, Mises等）
+        :param case_ids: 只导出的工况ID列表，默认全部工况
+        :param pids: 只导出这些属性ID包含的节点
+        :param mids: 只导出这些材料ID包含的节点
+        :param set_ids: 只导出这些集合ID包含的节点
+        :param columns: 输出字段列表（列投影），默认输出全部默认字段
         :return: CSV文件路径和字段描述
         """
         commands = self._build_result_commands(result_file, result_category)
         
-        base_path = os.path.splitext(result_file)[0]
-        output_path = f'{base_path}_all_node_{result_category}_results.csv'
-        commands.extend([
-            'identify outopts multistates enable',
-            'identify outopts multilabels include disp all',
-            'identify outopts multilabels include scalar all',
-            'identify outopts multistates include all',
-            'identify outopts multistates exclude 0',
-            'identify node outopts origposx on',
-            'identify node outopts origposy on',
-            'identify node outopts origposz on',
-            'identify node outopts posx off',
-            'identify node outopts posy off',
-            'identify node outopts posz off',
-            'identify node outopts comment off',
-            'identify node outopts ldispx off',
-            'identify node outopts ldispy off',
-            'identify node outopts ldispz off',
-            'identify node outopts name off',
-            'identify node outopts scalartop off',
-            'identify node outopts scalarbot off',
-            'identify node outopts functop on',
-            'identify node outopts funcbot off',
-            'identify node outopts udispx off',
-            'identify node outopts udispy off',
-            'identify node outopts udispz off',
-            'identify node outopts vectorbot off',
-            'identify node outopts vectortop off',
-            'identify node outopts xfunctop off',
-            'identify node outopts xfuncbot off',
-            'identify node outopts yfunctop off',
-            'identify node outopts yfuncbot off',
-            'identify node outopts zfunctop off',
-            'identify node outopts zfuncbot off',
-            f'identify node lres all "{output_path}"'
-        ])
-        
-        self._run_commands(commands)
-        
-        if not os.path.exists(output_path):
-            return f"结果文件未生成: {output_path}", ""
+        selection = {"case_ids": case_ids or None, "pids": pids or None, "mids": mids or None,
+                     "set_ids": set_ids or None, "columns": columns}
+        output_path = self._export_output_path(result_file, "node", result_category, selection)
+        try:
+            commands.extend(self._export_commands("node", output_path, **selection))
+        except ValueError as e:
+            return str(e), ""
         
         field_description = '''
             CSV文件采用多工况块循环结构，每个工况块包含三部分：
@@ -357,54 +655,44 @@ class MCPToolKit:
                 - Disptotal: 总位移
                 - origPosx, origPosy, origPosz: 原始坐标
                 - FunctionTop: 标量结果值（应变/塑性应变/Mises应力等）
+            大文件请流式读取，按工况逐块返回DataFrame，可通过columns只读取需要的字段:
+                from MCP_FemResExtract.result_reader import iter_result_blocks
+                for case_name, df in iter_result_blocks(csv_path, columns=["Id", "FunctionTop"]):
+                    ...
         '''
-        return output_path, field_description
+        return self._export_all_results(commands, output_path, result_file, "node", result_category, field_description,
+                                        populate_store=all(value is None for value in selection.values()))
 
     
     def get_all_element_results(
         self, 
         result_file: str, 
         result_category: str, 
+        case_ids: List[int] = None,
+        pids: List[int] = None,
+        mids: List[int] = None,
+        set_ids: List[int] = None,
+        columns: List[str] = None,
     ) -> Tuple[str, str]:
-        """获取所有工况下所有单元结果（输出到CSV文件）
+        """获取所有工况下所有单元结果（输出到CSV文件），可按工况、属性/材料/集合及输出字段筛选
         :param result_file: 结果文件路径
         :param result_category: 结果类型（如Displacement, Mises等）
+        :param case_ids: 只导出的工况ID列表，默认全部工况
+        :param pids: 只导出这些属性ID包含的单元
+        :param mids: 只导出这些材料ID包含的单元
+        :param set_ids: 只导出这些集合ID包含的单元
+        :param columns: 输出字段列表（列投影），默认输出全部默认字段
         :return: CSV文件路径和字段描述
         """
         commands = self._build_result_commands(result_file, result_category)
         
-        base_path = os.path.splitext(result_file)[0]
-        output_path = f'{base_path}_all_element_{result_category}_results.csv'
-        commands.extend([
-            'identify outopts multistates enable',
-            'identify outopts multilabels include disp all',
-            'identify outopts multilabels include scalar all',
-            'identify outopts multistates include all',
-            'identify outopts multistates exclude 0',
-            'identify element outopts cog off',
-            'identify element outopts cornbot off',
-            'identify element outopts corntop off',
-            'identify element outopts elemname off',
-            'identify element outopts comment off',
-            'identify element outopts scalartop off',
-            'identify element outopts scalarbot off',
-            'identify element outopts funcbot off',
-            'identify element outopts functop on',
-            'identify element outopts funccorn off',
-            "identify element outopts vectormagtop off",
-            "identify element outopts vectormagbot off",
-            "identify element outopts vectortop off",
-            "identify element outopts vectorbottom off",
-            "identify element outopts vectorcomponents off",
-            'identify element outopts nodes off',
-            'identify element outopts principaltensor off',
-            f'identify element lres all "{output_path}"'
-        ])
-        
-        self._run_commands(commands)
-        
-        if not os.path.exists(output_path):
-            return f"结果文件未生成: {output_path}", ""
+        selection = {"case_ids": case_ids or None, "pids": pids or None, "mids": mids or None,
+                     "set_ids": set_ids or None, "columns": columns}
+        output_path = self._export_output_path(result_file, "element", result_category, selection)
+        try:
+            commands.extend(self._export_commands("element", output_path, **selection))
+        except ValueError as e:
+            return str(e), ""
         
         field_description = '''
             CSV文件采用多工况块循环结构，每个工况块包含三部分：
@@ -416,8 +704,500 @@ class MCPToolKit:
                 - Pid: 部件ID
                 - PidName: 部件名称
                 - FunctionTop: 标量结果值（应变/塑性应变/应力等）
+            大文件请流式读取，按工况逐块返回DataFrame，可通过columns只读取需要的字段:
+                from MCP_FemResExtract.result_reader import iter_result_blocks
+                for case_name, df in iter_result_blocks(csv_path, columns=["Id", "Pid", "FunctionTop"]):
+                    ...
+        '''
+        return self._export_all_results(commands, output_path, result_file, "element", result_category, field_description,
+                                        populate_store=all(value is None for value in selection.values()))
+
+    def get_all_results_wide(
+        self,
+        result_file: str,
+        result_categories: List[str],
+        node_or_element_result: str = "node",
+    ) -> Tuple[str, str]:
+        """在一次META会话中导出多个结果类型的所有工况结果，合并为一个宽表CSV（每个结果类型一列）
+        模型及变形结果只加载一次，依次读取各结果类型的标量函数并导出
+        :param result_file: 结果文件路径
+        :param result_categories: 结果类型列表（如['Displacement', 'Mises', 'PlasticStrain']）
+        :param node_or_element_result: 导出节点结果还是单元结果（node或element）
+        :return: 宽表CSV文件路径和字段描述
+        """
+        entity = node_or_element_result
+        if entity not in ("node", "element"):
+            return "不支持的结果类型，node_or_element_result仅支持'node'或'element'", ""
+        categories = list(dict.fromkeys(result_categories or []))
+        if not categories:
+            return "必须提供至少一个结果类型", ""
+        supported = list(RESULT_FUNCTIONS.get(self._result_file_type(result_file), {}))
+        unsupported = [category for category in categories if category not in supported]
+        if unsupported:
+            return f"不支持的结果类型: {unsupported}，该结果文件支持：{supported}", ""
+
+        base_path = os.path.splitext(os.path.abspath(result_file))[0]
+        output_path = f'{base_path}_all_{entity}_{"_".join(categories)}_wide.csv'
+        # 各结果类型先导出到临时目录，合并后删除
+        tmp_dir = f'{base_path}_wide_tmp_{os.getpid()}_{datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")}'
+        category_csvs = {category: os.path.join(tmp_dir, f"{category}.csv") for category in categories}
+
+        commands = self._build_result_commands(result_file, categories[0])
+        commands.extend(self._export_option_commands(entity))
+        for i, category in enumerate(categories):
+            if i > 0:
+                commands.append(self._read_function_command(result_file, category))
+            commands.append(f'identify {entity} lres all "{category_csvs[category]}"')
+
+        field_description = f'''
+            CSV文件采用多工况块循环结构（与get_all_{entity}_results的CSV相同，可用iter_result_blocks流式读取），每个工况块包含三部分：
+                1. 工况名称行：单独1行，以STEP或Subcase开头
+                2. 字段名称行：紧随工况行
+                3. 数据行：紧随字段行，每行对应一个{entity}的数值数据
+            字段含义:
+                - Id: {entity}ID
+                - origPosx, origPosy, origPosz / Pid, PidName: 原始坐标（节点）/ 部件ID及名称（单元）
+                - {", ".join(categories)}: 各结果类型的标量结果值（每个结果类型一列）
+        '''
+
+        def export() -> Tuple[str, str]:
+            os.makedirs(tmp_dir, exist_ok=True)
+            try:
+                self._run_commands(commands, priority="bulk", label="get_all_results_wide")
+                missing = [path for path in category_csvs.values() if not os.path.exists(path)]
+                if missing:
+                    return f"结果文件未生成: {missing}", ""
+                try:
+                    with metrics.span("wide_merge") as span:
+                        _, span["rows"] = write_wide_results(category_csvs, output_path)
+                except ValueError as e:
+                    return f"宽表合并失败: {str(e)}", ""
+                return output_path, field_description
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        # 临时目录每次不同，按输出文件去重
+        result, shared = self.inflight.do(("export", output_path), export)
+        if shared:
+            metrics.inc("meta_coalesced_total", label="get_all_results_wide")
+        return result
+
+    def _export_all_results(
+        self,
+        commands: List[str],
+        output_path: str,
+        result_file: str,
+        entity: str,
+        result_category: str,
+        field_description: str,
+        populate_store: bool = True,
+    ) -> Tuple[str, str]:
+        """执行全量结果导出并写入二进制结果库
+        相同导出正在进行时等待其完成并复用结果，避免重复启动META及并发写同一CSV/结果库
+        :param commands: 导出命令列表
+        :param output_path: 导出的CSV文件路径
+        :param result_file: 结果文件路径
+        :param entity: 实体类型（node/element）
+        :param result_category: 结果类型
+        :param field_description: CSV字段描述
+        :param populate_store: 是否写入二进制结果库（按工况/实体筛选的部分结果不写入，避免覆盖全量结果库）
+        :return: CSV文件路径和字段描述
+        """
+        label = f"get_all_{entity}_results"
+
+        def export() -> Tuple[str, str]:
+            # 全量结果CSV晚于结果文件生成且结果库与之一致时（如已预热）直接复用，不再启动META
+            if populate_store and self._export_is_fresh(output_path, result_file, entity, result_category):
+                metrics.inc("cache_requests_total", cache="full_export", result="hit")
+                return output_path, field_description + self._populate_result_store(output_path, result_file, entity, result_category)
+            # 全量导出优先按工况范围分片，在多个META许可证上并行执行
+            shards = self._export_shard_states(result_file) if populate_store else None
+            if shards:
+                return self._export_sharded(shards, output_path, result_file, entity, result_category, field_description)
+            self._run_commands(commands, priority="bulk", label=label)
+            if not os.path.exists(output_path):
+                return f"结果文件未生成: {output_path}", ""
+            if not populate_store:
+                return output_path, field_description + "\n            （按工况/实体/字段筛选的部分结果，未写入二进制结果库）\n"
+            return output_path, field_description + self._populate_result_store(output_path, result_file, entity, result_category)
+
+        result, shared = self.inflight.do(("export", CommandPlan.from_commands(commands).cache_key()), export)
+        if shared:
+            metrics.inc("meta_coalesced_total", label=label)
+        return result
+
+    @staticmethod
+    def _export_is_fresh(output_path: str, result_file: str, entity: str, result_category: str) -> bool:
+        """全量结果CSV是否晚于结果文件及其几何文件生成，且二进制结果库由该CSV生成"""
+        base_path = os.path.splitext(result_file)[0]
+        sources = [result_file] + [base_path + ext for ext in (".fem", ".inp") if os.path.exists(base_path + ext)]
+        try:
+            if os.path.getmtime(output_path) < max(os.path.getmtime(path) for path in sources):
+                return False
+        except OSError:
+            return False
+        return ResultStore.is_fresh(ResultStore.store_dir_for(result_file, entity, result_category), output_path)
+
+    def _export_shard_states(self, result_file: str) -> Optional[List[List[int]]]:
+        """全量导出的分片方案：按工况目录将导出工况（不含状态0）均分为连续的工况范围
+        分片数为META_EXPORT_SHARDS（0时取批量任务可用许可证数），分片数小于2或工况不足时返回None（不分片）
+        """
+        n_shards = env.meta_export_shards or self.scheduler.bulk_seats
+        if n_shards < 2:
+            return None
+        try:
+            # 全量导出为批量任务，工况目录未缓存时以bulk优先级加载，不占用交互查询预留的许可证
+            catalog = self._load_case_catalog(result_file, priority="bulk")
+        except (FileNotFoundError, ValueError):
+            return None
+        states = [entry.state_index for entry in catalog.entries if entry.state_index != 0]
+        if len(states) < 2:
+            return None
+        return [[int(state) for state in chunk] for chunk in np.array_split(states, min(n_shards, len(states)))]
+
+    def _export_sharded(
+        self,
+        shards: List[List[int]],
+        output_path: str,
+        result_file: str,
+        entity: str,
+        result_category: str,
+        field_description: str,
+    ) -> Tuple[str, str]:
+        """按工况范围分片并行导出全量结果：各分片由独立的META进程导出到临时CSV，
+        校验完整性后按工况顺序流式拼接为与单次导出相同结构的CSV，再写入二进制结果库
+        :param shards: 各分片的工况ID列表（按工况顺序）
+        :param output_path: 导出的CSV文件路径
+        :param result_file: 结果文件路径
+        :param entity: 实体类型（node/element）
+        :param result_category: 结果类型
+        :param field_description: CSV字段描述
+        :return: CSV文件路径和字段描述
+        """
+        tmp_dir = f'{output_path}.shards-{os.getpid()}-{datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")}'
+        shard_csvs = [os.path.join(tmp_dir, f"shard_{i}.csv") for i in range(len(shards))]
+        user = current_user.get()
+
+        def run_shard(i: int) -> None:
+            # 线程池中的线程不继承调用方的上下文，显式传递用户以保持公平调度
+            current_user.set(user)
+            commands = self._build_result_commands(result_file, result_category)
+            commands.extend(self._export_commands(entity, shard_csvs[i], case_ids=shards[i]))
+            self._run_commands(commands, priority="bulk", label=f"get_all_{entity}_results_shard")
+
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            with metrics.span("sharded_export", entity=entity) as span:
+                span["shards"] = len(shards)
+                with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                    list(executor.map(run_shard, range(len(shards))))
+                error = self._validate_shards(shard_csvs, shards)
+                if error:
+                    span["status"] = "error"
+                    return error, ""
+                tmp_output = f"{output_path}.tmp-{os.getpid()}"
+                with open(tmp_output, "wb") as out:
+                    for path in shard_csvs:
+                        with open(path, "rb") as f:
+                            shutil.copyfileobj(f, out, 16 * 1024 * 1024)
+                os.replace(tmp_output, output_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return output_path, field_description + self._populate_result_store(output_path, result_file, entity, result_category)
+
+    @staticmethod
+    def _validate_shards(shard_csvs: List[str], shards: List[List[int]]) -> Optional[str]:
+        """校验分片导出的完整性：文件存在、工况块数与分片工况数一致、各工况实体数一致且非空
+        :return: 校验失败原因，通过时返回None
+        """
+        row_counts = set()
+        for path, states in zip(shard_csvs, shards):
+            if not os.path.exists(path):
+                return f"分片结果文件未生成: {path}（工况 {states}）"
+            blocks = scan_result_blocks(path)
+            if len(blocks) != len(states):
+                return f"分片导出不完整: 工况 {states} 期望{len(states)}个工况块，实际{len(blocks)}个"
+            row_counts.update(block.n_rows for block in blocks)
+        if len(row_counts) != 1 or 0 in row_counts:
+            return f"分片导出不完整: 各工况实体数不一致 {sorted(row_counts)}"
+        return None
+
+    def _populate_result_store(self, csv_path: str, result_file: str, entity: str, result_category: str) -> str:
+        """将导出的CSV写入内存映射二进制结果库，供其他会话/工具零拷贝读取
+        :param csv_path: 导出的CSV文件路径
+        :param result_file: 结果文件路径
+        :param entity: 实体类型（node/element）
+        :param result_category: 结果类型
+        :return: 结果库使用说明（写入失败时返回失败原因，不影响CSV结果）
+        """
+        store_dir = ResultStore.store_dir_for(result_file, entity, result_category)
+        try:
+            store = ResultStore.build_from_csv(csv_path, store_dir)
+        except Exception as e:
+            return f"\n            二进制结果库生成失败: {str(e)}\n"
+        return f'''
+            二进制结果库（内存映射，多个会话共享，优先用于全量统计）: {store_dir}
+                from MCP_FemResExtract.result_store import ResultStore
+                store = ResultStore("{store_dir}")
+                store.ids（{entity}ID）, store.values（{len(store.ids)} x {len(store.cases)}，按工况列存放）, store.cases（工况名称列表）
+                store.coords（节点原始坐标，可能为None）, store.pids（属性ID，可能为None）, store.rows_for_ids([...])（ID转行号）
         '''
-        return output_path, field_description
+
+    def _load_case_catalog(self, result_file: str, refresh: bool = False, priority: str = "interactive") -> CaseCatalog:
+        """获取结果文件的工况目录（优先读取缓存，否则加载模型并解析META日志后写入缓存）
+        :param result_file: 结果文件路径
+        :param refresh: 是否忽略缓存重新生成
+        :param priority: META任务优先级（后台预热使用bulk）
+        :return: 工况目录
+        """
+        if not refresh:
+            catalog = load_cached_catalog(result_file)
+            metrics.inc("cache_requests_total", cache="case_catalog", result="miss" if catalog is None else "hit")
+            if catalog is not None:
+                return catalog
+        commands = self._build_result_commands(result_file, "Displacement")
+        log_content = self._run_commands(commands, priority=priority, label="get_case_catalog")
+        catalog = parse_case_catalog(log_content, result_file=result_file)
+        if catalog.entries:
+            save_catalog(catalog)
+        return catalog
+
+    def get_case_catalog(self, result_file: str, refresh: bool = False) -> str:
+        """
+        获取结果文件的工况目录（分析步名称、时间、有效case_id及工况标签），结果按结果文件缓存
+        ODB中与上一分析步末时刻等效的起始帧已确定性去除，无需大模型推导
+        :param result_file: 结果文件路径
+        :param refresh: 是否忽略缓存重新生成
+        :return: 有效工况列表及完整目录JSON
+        """
+        try:
+            catalog = self._load_case_catalog(result_file, refresh)
+        except (FileNotFoundError, ValueError) as e:
+            return str(e)
+        if not catalog.entries:
+            return f"未能从日志中解析出工况信息: {result_file}"
+        return (f"有效工况（共{len(catalog.effective_cases)}个，options state使用case_id）:\n{catalog.to_text()}\n"
+                f"完整工况目录: {catalog.model_dump_json()}")
+
+    def get_meta_queue_status(self) -> str:
+        """
+        查询META任务队列状态：许可证数、运行中任务、各优先级排队任务数及新任务预计等待时间
+        :return: 队列状态描述
+        """
+        status = self.scheduler.status_text()
+        if self.prefetcher is not None:
+            status += "\n" + self.prefetcher.status_text()
+        return status
+
+    def ingest_result_file(self, result_file: str) -> None:
+        """新结果文件写入完成（或重新求解、派生文件已失效）后的入库处理：登记到结果文件目录，清除预热记录并重新提交后台预热"""
+        if self.prefetcher is not None:
+            self._update_file_catalog(result_file, STATUS_QUEUED)
+            self.prefetcher.forget(result_file)
+            self.prefetcher.touch(result_file)
+        else:
+            self._update_file_catalog(result_file)
+
+    def remove_result_file(self, result_file: str) -> None:
+        """结果文件被删除/移走后的处理：在结果文件目录中标记为deleted"""
+        try:
+            self.file_catalog.mark_deleted(result_file)
+        except (sqlite3.Error, OSError):
+            metrics.inc("file_catalog_errors_total")
+
+    def sync_file_catalog(self) -> Optional[Tuple[int, int]]:
+        """扫描管理目录同步结果文件目录
+        :return: (同步的文件数, 标记删除的文件数)，目录不可写时返回None
+        """
+        try:
+            return self.file_catalog.sync()
+        except (sqlite3.Error, OSError):
+            metrics.inc("file_catalog_errors_total")
+            return None
+
+    def _update_file_catalog(self, result_file: str, status: str = None, detail: str = None) -> None:
+        """更新结果文件目录记录（目录不可写时只记录指标，不影响查询/预热）"""
+        try:
+            self.file_catalog.upsert(result_file, status, detail)
+        except (sqlite3.Error, OSError):
+            metrics.inc("file_catalog_errors_total")
+
+    def _warm_up(self, result_file: str) -> Dict[str, str]:
+        """
+        结果文件预热（在后台线程中执行，META任务均以bulk优先级提交）：
+            1. 工况目录（写入工况目录缓存）
+            2. 预热结果类型的全量节点/单元结果导出及二进制结果库
+            3. 实体索引（节点/单元数量及ID范围、各属性ID的单元数）
+            4. 各结果类型的部件结果摘要（按属性ID汇总各工况最大值）
+        各阶段相互独立，单个阶段失败不影响其余阶段
+        :param result_file: 结果文件路径
+        :return: 各阶段结果描述
+        """
+        stages: Dict[str, str] = {}
+        try:
+            catalog = self._load_case_catalog(result_file, priority="bulk")
+            stages["case_catalog"] = f"{len(catalog.effective_cases)}个有效工况"
+        except Exception as e:
+            stages["case_catalog"] = f"失败: {str(e)}"
+
+        categories = [c for c in env.prefetch_categories if c in RESULT_FUNCTIONS.get(self._result_file_type(result_file), {})]
+        for category in categories:
+            for entity in ("node", "element"):
+                try:
+                    export = self.get_all_node_results if entity == "node" else self.get_all_element_results
+                    output_path, _ = export(result_file, category)
+                    stages[f"{entity}_{category}"] = output_path if os.path.exists(output_path) else f"失败: {output_path}"
+                except Exception as e:
+                    stages[f"{entity}_{category}"] = f"失败: {str(e)}"
+
+        try:
+            index = self._entity_index_from_stores(result_file, categories)
+            if index:
+                save_summary(result_file, entity_index_path_for(result_file), index)
+                stages["entity_index"] = "ok"
+            else:
+                stages["entity_index"] = "跳过: 没有可用的结果库"
+        except Exception as e:
+            stages["entity_index"] = f"失败: {str(e)}"
+
+        for category in categories:
+            try:
+                self._load_part_summary(result_file, category)
+                stages[f"part_summary_{category}"] = "ok"
+            except Exception as e:
+                stages[f"part_summary_{category}"] = f"失败: {str(e)}"
+        failed = {stage: result for stage, result in stages.items() if result.startswith("失败")}
+        self._update_file_catalog(result_file, STATUS_ERROR if failed else STATUS_READY,
+                                  json.dumps(failed, ensure_ascii=False) if failed else None)
+        return stages
+
+    def search_result_files(
+        self,
+        keywords: List[str] = None,
+        project: str = None,
+        vehicle: str = None,
+        solver: str = None,
+        status: str = None,
+        created_after: str = None,
+        created_before: str = None,
+        last_days: float = None,
+        limit: int = 50,
+        refresh: bool = False
+    ) -> str:
+        """
+        在结果文件目录（SQLite）中检索管理目录下的结果文件，按创建时间倒序
+        :param keywords: 路径关键词列表（均需包含，不区分大小写），如['torsion']
+        :param project: 项目（管理目录下的第一级目录名）
+        :param vehicle: 车型或车型前缀（如'X'匹配X01、X02）
+        :param solver: 求解器类型（'Hypermesh'或'Abaqus'）
+        :param status: 入库状态（discovered/queued/ready/error/deleted）
+        :param created_after: 创建日期下限（YYYY-MM-DD，含当天）
+        :param created_before: 创建日期上限（YYYY-MM-DD，不含当天）
+        :param last_days: 只返回最近N天创建的文件
+        :param limit: 返回条数上限
+        :param refresh: 是否先扫描管理目录同步目录
+        :return: 匹配的结果文件列表
+        """
+        try:
+            after = datetime.datetime.strptime(created_after, "%Y-%m-%d").timestamp() if created_after else None
+            before = datetime.datetime.strptime(created_before, "%Y-%m-%d").timestamp() if created_before else None
+        except ValueError as e:
+            return f"日期格式错误（应为YYYY-MM-DD）: {str(e)}"
+        if last_days:
+            since = (datetime.datetime.now() - datetime.timedelta(days=last_days)).timestamp()
+            after = max(after or since, since)
+        synced = self.sync_file_catalog() if refresh else None
+        try:
+            rows = self.file_catalog.search(keywords, project, vehicle, solver, status, after, before, limit=limit)
+        except (sqlite3.Error, OSError) as e:
+            return f"结果文件目录查询失败: {str(e)}"
+
+        lines = [f"已同步管理目录: {synced[0]}个结果文件，{synced[1]}个已删除"] if synced else []
+        if not rows:
+            lines.append("未找到匹配的结果文件")
+            return "\n".join(lines)
+        lines.append(f"找到{len(rows)}个结果文件（按创建时间倒序{'，已达上限' + str(limit) if len(rows) >= limit else ''}）:")
+        for row in rows:
+            created = datetime.datetime.fromtimestamp(row["created"]).strftime("%Y-%m-%d %H:%M")
+            model = (f"，{row['n_nodes']}节点/{row['n_elements']}单元" if row["n_nodes"] or row["n_elements"] else "")
+            cases = f"，{row['case_count']}个工况" if row["case_count"] is not None else ""
+            lines.append(f"- {row['path']}（{row['solver']}，{row['size'] / 1024 ** 2:.1f}MB，{created}，"
+                         f"项目 {row['project'] or '-'}，车型 {row['vehicle'] or '-'}{cases}{model}，状态 {row['status']}）")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _entity_index_from_stores(result_file: str, categories: List[str]) -> Dict[str, Any]:
+        """从任一可用结果类型的节点/单元结果库生成实体索引"""
+        for category in categories:
+            node_store = ResultStore.open(result_file, "node", category)
+            element_store = ResultStore.open(result_file, "element", category)
+            if node_store is not None or element_store is not None:
+                return build_entity_index(node_store, element_store)
+        return {}
+
+    def _load_part_summary(self, result_file: str, result_category: str) -> Dict[str, Any]:
+        """获取部件结果摘要（优先读取预计算文件，否则由单元结果库计算并写入文件）
+        :return: 部件摘要字典，单元结果库不存在时抛出FileNotFoundError
+        """
+        path = part_summary_path_for(result_file, result_category)
+        summary = load_summary(result_file, path)
+        metrics.inc("cache_requests_total", cache="part_summary", result="miss" if summary is None else "hit")
+        if summary is not None:
+            return summary
+        store = ResultStore.open(result_file, "element", result_category)
+        if store is None:
+            raise FileNotFoundError(f"未找到element_{result_category}结果库，请先调用get_all_element_results生成结果")
+        summary = build_part_summary(store)
+        save_summary(result_file, path, summary)
+        return summary
+
+    def get_part_summary(
+        self,
+        result_file: str,
+        result_category: str = "Mises",
+        pids: List[int] = None,
+        top_n: int = 20
+    ) -> str:
+        """
+        获取按属性ID（部件）汇总的结果摘要：各部件单元数、全工况最大值及其所在工况和单元，以及模型实体索引
+        优先使用后台预热生成的预计算结果，无需启动META
+        :param result_file: 结果文件路径
+        :param result_category: 结果类型（默认'Mises'）
+        :param pids: 只返回这些属性ID的摘要，默认返回最大值最高的top_n个部件
+        :param top_n: 未指定pids时返回的部件数量
+        :return: 部件摘要描述
+        """
+        try:
+            summary = self._load_part_summary(result_file, result_category)
+        except (FileNotFoundError, ValueError) as e:
+            status = self.prefetcher.status(result_file) if self.prefetcher is not None else None
+            if status is not None and status["state"] in ("queued", "running"):
+                return f"{str(e)}（结果文件正在后台预热，请稍后重试或调用get_meta_queue_status查看进度）"
+            return str(e)
+
+        parts = summary["parts"]
+        if pids:
+            wanted = set(int(pid) for pid in pids)
+            parts = [part for part in parts if part["pid"] in wanted]
+        else:
+            parts = sorted((part for part in parts if part.get("max") is not None),
+                           key=lambda part: part["max"], reverse=True)[:top_n]
+
+        lines = []
+        index = load_summary(result_file, entity_index_path_for(result_file))
+        if index is not None:
+            counts = [f"{index[entity]['count']}个{name}（ID {index[entity]['min_id']}~{index[entity]['max_id']}）"
+                      for entity, name in (("node", "节点"), ("element", "单元")) if entity in index]
+            lines.append(f"模型实体: {'，'.join(counts)}，{len(index.get('parts', {}))}个属性")
+        lines.append(f"{result_category}部件结果摘要（共{len(summary['parts'])}个属性，{len(summary['cases'])}个工况）:")
+        for part in parts:
+            if part.get("max") is None:
+                lines.append(f"  PID {part['pid']}: {part['n_elements']}个单元，无有效结果")
+                continue
+            lines.append(f"  PID {part['pid']}: {part['n_elements']}个单元，最大值 {part['max']:.4g}"
+                         f"（工况 {part['max_case']}，单元 {part['max_element']}）")
+        lines.append(f"各工况最大值见: {part_summary_path_for(result_file, result_category)}")
+        return "\n".join(lines)
 
     def _get_multi_entity_results(
         self,
@@ -438,24 +1218,47 @@ class MCPToolKit:
         :param query: 查询需求，用于从日志中提取相关信息
         :return: 查询结果日志或提取的相关信息
         """
+        try:
+            commands = self._entity_query_commands(entity_type, ids_per_case, names_per_case)
+        except ValueError as e:
+            return str(e)
+
+        # 与窗口期内同一结果文件、结果类型的其他查询合并执行，取回本查询的日志
+        try:
+            log_content = self.batcher.submit((result_file, result_category), (commands, f"get_multi_{entity_type}_results"))
+        except Exception as e:
+            return f"多{entity_type}结果查询日志:\nError: {str(e)}"
+        result = self._log_result(log_content, query)
+        return f"多{entity_type}结果查询日志:\n{result}"
+
+    def _entity_query_commands(
+        self,
+        entity_type: str,
+        ids_per_case: Dict[int, List[int]] = None,
+        names_per_case: Dict[int, List[str]] = None
+    ) -> List[str]:
+        """
+        构建多实体结果查询的工况查询命令（不含模型及结果加载命令）
+        :param entity_type: 实体类型（node/element/part/material/set）
+        :param ids_per_case: 字典，键为工况ID，值为该工况下的实体ID列表
+        :param names_per_case: 字典，键为工况ID，值为该工况下的实体名称列表
+        :return: 命令列表，参数不合法时抛出ValueError
+        """
         # 参数验证 - 必须提供ID或名称中的一种
         if not ids_per_case and not names_per_case:
-            return "必须提供ids_per_case或names_per_case参数中的至少一个"
+            raise ValueError("必须提供ids_per_case或names_per_case参数中的至少一个")
         if entity_type not in self.entity_type_map:
-            return f"不支持的实体类型: {entity_type}，支持类型：{list(self.entity_type_map.keys())}"
+            raise ValueError(f"不支持的实体类型: {entity_type}，支持类型：{list(self.entity_type_map.keys())}")
         
         # 确定使用ID还是名称查询
         use_ids = bool(ids_per_case)
         case_entity_map = ids_per_case if use_ids else names_per_case
-        case_ids = list(case_entity_map.keys())
         
         # 获取实体类型映射信息
         entity_name, output_type, id_param, name_param = self.entity_type_map[entity_type]
         
-        # 构建基础命令链
-        commands = self._build_result_commands(result_file, result_category)
-        
         # 添加每个工况的查询命令
+        commands = []
         for case_id, entities in case_entity_map.items():
             if not entities:
                 continue
@@ -470,10 +1273,99 @@ class MCPToolKit:
             filter_param = id_param if use_ids else name_param
             filter_cmd = f'identify advfilter {output_type} add:{entity_name}:{filter_param}:{entity_range}:Keep All'
             commands.append(filter_cmd)
-        
-        # 执行命令并返回日志
-        result = self._run_commands(commands, query)
-        return f"多{entity_type}结果查询日志:\n{result}"
+        return commands
+
+    def run_result_batch(
+        self,
+        result_file: str,
+        result_category: str,
+        sub_queries: List[Union[ResultSubQuery, Dict[str, Any]]]
+    ) -> str:
+        """
+        在一次META会话中执行多个不同类型的子查询（实体结果/实体最大结果/模型信息）：
+        模型及结果只加载一次，各子查询以options message分段标记隔开，执行后按标记拆分日志
+        :param result_file: 结果文件路径
+        :param result_category: 结果类型
+        :param sub_queries: 子查询列表
+        :return: JSON列表，按子查询顺序给出类型、状态及结果（日志或按query提取的信息）
+        """
+        try:
+            sub_queries = [ResultSubQuery.model_validate(sub) for sub in sub_queries]
+        except ValueError as e:
+            return f"子查询参数不合法: {str(e)}"
+        if not sub_queries:
+            return "必须提供至少一个子查询"
+
+        results: List[Dict[str, Any]] = [{"index": i, "type": sub.type} for i, sub in enumerate(sub_queries)]
+        commands = self._build_result_commands(result_file, result_category)
+        sections: List[Tuple[int, str]] = []
+        for i, sub in enumerate(sub_queries):
+            try:
+                sub_commands = self._subquery_commands(sub)
+            except ValueError as e:
+                results[i].update(status="error", result=str(e))
+                continue
+            marker = new_marker()
+            commands.append(f'options message "{marker}"')
+            commands.extend(sub_commands)
+            sections.append((i, marker))
+
+        if sections:
+            try:
+                log_content = self._run_meta(commands, label="run_result_batch")
+            except Exception as e:
+                log_content, error = None, f"Error: {str(e)}"
+            else:
+                error = "Log file not found"
+            logs = split_sections(log_content, [marker for _, marker in sections]) if log_content is not None else [None] * len(sections)
+            # 按子查询提取信息（大模型调用并行进行）
+            with ThreadPoolExecutor(max_workers=min(len(sections), 4)) as executor:
+                extracted = list(executor.map(
+                    lambda item: self._log_result(item[1], sub_queries[item[0]].query) if item[1] is not None else error,
+                    [(i, log) for (i, _), log in zip(sections, logs)]
+                ))
+            for (i, _), log, result in zip(sections, logs, extracted):
+                results[i].update(status="ok" if log is not None else "error", result=result)
+        return json.dumps(results, ensure_ascii=False, indent=2)
+
+    def _subquery_commands(self, sub: ResultSubQuery) -> List[str]:
+        """构建批量查询中单个子查询的命令（不含模型及结果加载命令），参数不合法时抛出ValueError"""
+        if sub.type in self.entity_type_map:
+            return self._entity_query_commands(sub.type, sub.ids_per_case, sub.names_per_case)
+        if sub.type == "max":
+            # 最大结果查询会隐藏部分实体，结束后恢复显示全部实体，避免影响后续子查询
+            return self._max_result_commands(
+                sub.entity_type, sub.ids_per_case, sub.names_per_case, sub.node_or_element_result
+            ) + ['erase none']
+        if sub.type == "model_info":
+            if not sub.info_type:
+                raise ValueError("model_info子查询必须提供info_type")
+            return self._model_info_commands(sub.info_type, sub.ids_per_case, sub.names_per_case)
+        raise ValueError(f"不支持的子查询类型: {sub.type}，支持类型：{list(self.entity_type_map) + ['max', 'model_info']}")
+
+    def _run_entity_batch(self, key: Tuple[str, str], sections: List[Tuple[List[str], str]]) -> List[Optional[str]]:
+        """
+        合并执行一批多实体结果查询：共享一次模型及结果加载，各查询以options message分段标记隔开，
+        执行后按标记将日志拆分给各查询
+        :param key: (结果文件路径, 结果类型)
+        :param sections: 各查询的(工况查询命令列表, 任务标签)
+        :return: 各查询的日志（未生成日志时为None）
+        """
+        result_file, result_category = key
+        commands = self._build_result_commands(result_file, result_category)
+        if len(sections) == 1:
+            section_commands, label = sections[0]
+            return [self._run_meta(commands + section_commands, label=label)]
+
+        markers = [new_marker() for _ in sections]
+        for marker, (section_commands, _) in zip(markers, sections):
+            commands.append(f'options message "{marker}"')
+            commands.extend(section_commands)
+        metrics.inc("meta_batched_queries_total", len(sections))
+        log_content = self._run_meta(commands, label="get_multi_results_batch")
+        if log_content is None:
+            return [None] * len(sections)
+        return split_sections(log_content, markers)
 
     def get_multi_node_results(
         self,
@@ -631,9 +1523,34 @@ class MCPToolKit:
         :param query: 查询需求，用于从日志中提取相关信息
         :return: 查询结果日志或提取的相关信息
         """
+        try:
+            commands = self._build_result_commands(result_file, result_category)
+            commands.extend(self._max_result_commands(entity_type, ids_per_case, names_per_case, node_or_element_result))
+        except ValueError as e:
+            return str(e)
+
+        # 执行命令并返回日志
+        result = self._run_commands(commands, query, label="get_max_result_for_entities")
+        return f"{entity_type}最大结果查询日志:\n{result}"
+
+    def _max_result_commands(
+        self,
+        entity_type: str,
+        ids_per_case: Dict[int, List[int]] = None,
+        names_per_case: Dict[int, List[str]] = None,
+        node_or_element_result: str = "node"
+    ) -> List[str]:
+        """
+        构建实体最大结果查询的工况查询命令（不含模型及结果加载命令）
+        :param entity_type: 实体类型（material/property/ansapart）
+        :param ids_per_case: 字典，键为工况ID，值为该工况下的实体ID列表
+        :param names_per_case: 字典，键为工况ID，值为该工况下的实体名称列表
+        :param node_or_element_result: 结果类型（node或element）
+        :return: 命令列表，参数不合法时抛出ValueError
+        """
         # 参数验证
         if entity_type not in ["material", "property", "ansapart"]:
-            return f"不支持的实体类型: {entity_type}，支持类型：['material', 'property', 'ansapart']"
+            raise ValueError(f"不支持的实体类型: {entity_type}，支持类型：['material', 'property', 'ansapart']")
         
         # 处理实体ID与工况的映射关系，都为空则查询全部模型
         if not ids_per_case and not names_per_case:
@@ -648,10 +1565,8 @@ class MCPToolKit:
             use_ids = False
             use_all = False
         
-        # 构建基础命令链
-        commands = self._build_result_commands(result_file, result_category)
         # 先隐藏所有实体
-        commands.append('erase all')
+        commands = ['erase all']
         
         # 添加工况查询命令
         for case_id, entities in case_entity_map.items():
@@ -689,11 +1604,8 @@ class MCPToolKit:
                 # 单元结果
                 commands.append('function info visible')
             else:
-                return "不支持的结果类型"
-        
-        # 执行命令并返回日志
-        result = self._run_commands(commands, query)
-        return f"{entity_type}最大结果查询日志:\n{result}"
+                raise ValueError("不支持的结果类型")
+        return commands
 
     def get_model_info(
         self,
@@ -717,64 +1629,80 @@ class MCPToolKit:
         :return: 查询结果日志或提取的相关信息
         """
         try:
-            # 验证信息类型
-            valid_info_types = ["loads", "spc", "ansapart", "property", "material", "set"]
-            if info_type.lower() not in valid_info_types:
-                return f"不支持的信息类型: {info_type}，支持类型：{valid_info_types}"
-
-            # 处理查询对象与工况的映射关系，都为空则查询全部
-            if not ids_per_case and not names_per_case:
-                case_entity_map = {0: []}  # 使用0作为默认工况
-                use_all = True
-            elif ids_per_case:
-                case_entity_map = ids_per_case
-                use_ids = True
-                use_all = False
-            else:
-                case_entity_map = names_per_case
-                use_ids = False
-                use_all = False
-
-            # 构建基础命令链
             commands = self._build_result_commands(result_file, result_category)
+            commands.extend(self._model_info_commands(info_type, ids_per_case, names_per_case))
             
-            # 添加工况查询命令
-            for case_id, entities in case_entity_map.items():
-                if case_id != 0:
-                    commands.append(f'options state "{case_id}"')
-                commands.append(f'options message "----- 开始查询工况 {case_id} 的模型{info_type}信息 -----"')
-                
-                # 构建查询命令
-                base_cmds = {
-                    "loads": "identify loads",
-                    "spc": "identify spc",
-                    "ansapart": "identify ansapart",
-                    "property": "identify part",
-                    "material": "identify mid",
-                    "set": "identify set"  # 新增集合查询支持
-                }
-                
-                base_cmd = base_cmds.get(info_type.lower())
-                if not base_cmd:
-                    return "不支持的信息类型"
-                
-                if use_all:
-                    # 查询全部信息
-                    commands.append(f"{base_cmd} all")
-                else:
-                    if not entities:
-                        continue
-                    
-                    entity_range = ','.join(map(str, entities))
-                    if use_ids:
-                        commands.append(f"{base_cmd} {entity_range}")
-                    else:
-                        commands.append(f"{base_cmd} name {entity_range}")
-            
-            return f"模型信息查询日志文件内容:\n{self._run_commands(commands, query)}"
+            result = self._run_commands(commands, query, label="get_model_info")
+            return f"模型信息查询日志文件内容:\n{result}"
         except (FileNotFoundError, ValueError) as e:
             return str(e)
             
+    def _model_info_commands(
+        self,
+        info_type: str,
+        ids_per_case: Dict[int, List[int]] = None,
+        names_per_case: Dict[int, List[str]] = None
+    ) -> List[str]:
+        """
+        构建模型信息查询命令（不含模型及结果加载命令）
+        :param info_type: 信息类型（loads, spc, ansapart, property, material, set）
+        :param ids_per_case: 字典，键为工况ID，值为该工况下的实体ID列表
+        :param names_per_case: 字典，键为工况ID，值为该工况下的实体名称列表
+        :return: 命令列表，参数不合法时抛出ValueError
+        """
+        # 验证信息类型
+        valid_info_types = ["loads", "spc", "ansapart", "property", "material", "set"]
+        if info_type.lower() not in valid_info_types:
+            raise ValueError(f"不支持的信息类型: {info_type}，支持类型：{valid_info_types}")
+
+        # 处理查询对象与工况的映射关系，都为空则查询全部
+        if not ids_per_case and not names_per_case:
+            case_entity_map = {0: []}  # 使用0作为默认工况
+            use_all = True
+        elif ids_per_case:
+            case_entity_map = ids_per_case
+            use_ids = True
+            use_all = False
+        else:
+            case_entity_map = names_per_case
+            use_ids = False
+            use_all = False
+
+        # 添加工况查询命令
+        commands = []
+        for case_id, entities in case_entity_map.items():
+            if case_id != 0:
+                commands.append(f'options state "{case_id}"')
+            commands.append(f'options message "----- 开始查询工况 {case_id} 的模型{info_type}信息 -----"')
+            
+            # 构建查询命令
+            base_cmds = {
+                "loads": "identify loads",
+                "spc": "identify spc",
+                "ansapart": "identify ansapart",
+                "property": "identify part",
+                "material": "identify mid",
+                "set": "identify set"  # 新增集合查询支持
+            }
+            
+            base_cmd = base_cmds.get(info_type.lower())
+            if not base_cmd:
+                raise ValueError("不支持的信息类型")
+            
+            if use_all:
+                # 查询全部信息
+                commands.append(f"{base_cmd} all")
+            else:
+                if not entities:
+                    continue
+                
+                entity_range = ','.join(map(str, entities))
+                if use_ids:
+                    commands.append(f"{base_cmd} {entity_range}")
+                else:
+                    commands.append(f"{base_cmd} name {entity_range}")
+        return commands
+
     def capture_screenshots(
         self,
         result_file: str,
@@ -784,7 +1712,11 @@ class MCPToolKit:
         names_per_case: Dict[int, List[str]] = None,
         output_dir: str = env.images_path,
         query: str = None,
-        node_or_element_result: str = "node"
+        node_or_element_result: str = "node",
+        layout: str = "vertical",
+        views: List[str] = None,
+        resolutions: Dict[str, List[int]] = None,
+        mode: str = "full"
     ) -> str:
         """
         多方位截取指定实体的最大节点或单元结果云图
@@ -797,13 +1729,28 @@ class MCPToolKit:
         :param output_dir: 输出目录
         :param node_or_element_result: 云图显示结果类型（node或element）
         :param query: 查询需求，用于从日志中提取相关信息
+        :param layout: 多视图拼接布局（'vertical'、'horizontal'、'grid'）
+        :param views: 需要截取的视图角度列表（isometric/top/front/left/btm/back/right），默认全部7个，预览模式默认仅isometric
+        :param resolutions: 字典，键为视图角度（或'default'表示所有视图），值为[宽, 高]像素，默认使用窗口原始分辨率
+        :param mode: 截图模式（'full'全分辨率，'preview'低分辨率预览，可随后以'full'模式按需升级）
         :return: 截图文件路径列表
         """
         # 参数验证
         if entity_type not in ["material", "property", "ansapart"]:
             raise ValueError("entity_type必须是'material', 'property', 'ansapart'之一")
+        if mode not in ("full", "preview"):
+            raise ValueError("mode必须是'full'或'preview'")
+        if views is None:
+            views = list(PREVIEW_VIEWS if mode == "preview" else SCREENSHOT_VIEWS)
+        invalid_views = [view for view in views if view not in SCREENSHOT_VIEWS]
+        if invalid_views or not views:
+            raise ValueError(f"不支持的视图角度: {invalid_views}，支持视图：{list(SCREENSHOT_VIEWS)}")
+        resolutions = dict(resolutions or {})
+        if mode == "preview":
+            resolutions.setdefault("default", list(PREVIEW_RESOLUTION))
         
-        # 创建输出目录
+        # 创建输出目录（META在临时任务目录中运行，截图路径须为绝对路径）
+        output_dir = os.path.abspath(output_dir)
         os.makedirs(output_dir, exist_ok=True)
         
         # 处理实体ID与工况的映射关系，都为空则查询全部模型
@@ -820,16 +1767,8 @@ class MCPToolKit:
             use_ids = False
             use_all = False
         
-        # 定义视图角度
-        views = [
-            "default isometric",
-            "default top",
-            "default front",
-            "default left",
-            "default btm",
-            "default back",
-            "default right",
-        ]
+        # 定义视图角度（META视图命令参数）
+        views = [f"default {view}" for view in views]
         
         # 构建基础命令链
         base_commands = self._build_result_commands(result_file, result_category)
@@ -922,7 +1861,17 @@ class MCPToolKit:
             
             # 多角度截图
             screenshot_paths = []
+            window_size = None
             for view in views:
+                # 按视图调整窗口分辨率（仅在尺寸变化时下发命令）；未设置分辨率的视图使用窗口原始尺寸，
+                # 之前的视图调整过窗口时需恢复，避免沿用上一视图的分辨率
+                size = resolutions.get(view.split(' ')[-1], resolutions.get("default"))
+                if not size and window_size is not None:
+                    size = env.meta_window_size
+                if size and tuple(size) != window_size:
+                    window_size = tuple(size)
+                    commands.append(WINDOW_SIZE_COMMAND.format(width=window_size[0], height=window_size[1]))
+                
                 # 设置视图
                 commands.append(f'view {view}')
                 
@@ -942,10 +1891,14 @@ class MCPToolKit:
                 screenshot_paths.append(filepath)
             
             # 执行截图命令
-            self._run_commands(commands, query)
+            self._run_commands(commands, query, priority="screenshot", label="capture_screenshots")
             
             # 拼接截图并返回HTML格式
-            case_html = self._stitch_screenshots(screenshot_paths)
+            case_html = self._stitch_screenshots(
+                screenshot_paths,
+                labels=[view.split(' ')[-1] for view in views],
+                layout=layout,
+            )
             
             # 添加工况标题
             if use_all:
@@ -954,6 +1907,141 @@ class MCPToolKit:
                 title = f"<h3>工况 {case_id} 结果</h3>"
             html_results.append(title + case_html)
         
+        if mode == "preview":
+            html_results.append(
+                f"<p>当前为低分辨率预览（视图：{', '.join(view.split(' ')[-1] for view in views)}），"
+                f"如需高清云图请以mode='full'并指定views重新截图。</p>"
+            )
+        
         # 返回所有工况的HTML结果
         return "<div>" + "".join(html_results) + "</div>"
-    
\ No newline at end of file
+    
+
+    def compute_fatigue_damage(
+        self,
+        result_file: str,
+        sn_curves: Dict[str, Any],
+        cycles_per_case: Dict[int, float],
+        result_category: str = "Mises",
+        node_or_element_result: str = "element",
+        pid_materials: Dict[str, List[int]] = None,
+        default_material: str = None,
+        r_ratio: float = 0.0,
+        top_n: int = 20
+    ) -> str:
+        """
+        基于二进制结果库中各工况应力结果计算Miner累积疲劳损伤（Basquin + Goodman修正）
+        需先调用get_all_node_results/get_all_element_results生成结果库
+        :param result_file: 结果文件路径
+        :param sn_curves: 字典，键为材料名称，值为S-N曲线参数（sf, b, su, endurance_limit）
+        :param cycles_per_case: 字典，键为case_id（与get_case_catalog及其他查询工具一致），值为该工况循环次数
+        :param result_category: 结果类型（默认'Mises'）
+        :param node_or_element_result: 使用节点结果还是单元结果（'node'或'element'）
+        :param pid_materials: 字典，键为材料名称，值为属于该材料的属性ID列表
+        :param default_material: 未在pid_materials中出现的实体使用的材料；pid_materials为空时必须提供
+        :param r_ratio: 应力比R，默认0（脉动循环）
+        :param top_n: 返回损伤最大的实体数量
+        :return: 损伤计算结果摘要及损伤数组路径
+        """
+        if not sn_curves:
+            return "必须提供sn_curves参数"
+        store = ResultStore.open(result_file, node_or_element_result, result_category)
+        if store is None:
+            return (f"未找到{node_or_element_result}_{result_category}结果库，请先调用"
+                    f"get_all_{node_or_element_result}_results生成结果")
+        
+        # case_id -> 结果库列号（按工况目录解析各列的工况名称）
+        try:
+            catalog = self._load_case_catalog(result_file)
+        except (FileNotFoundError, ValueError) as e:
+            return f"无法获取工况目录: {str(e)}"
+        case_columns: Dict[int, int] = {}
+        for column, case_name in enumerate(store.cases):
+            entry = catalog.resolve(case_name)
+            if entry is not None and entry.case_id is not None:
+                case_columns.setdefault(entry.case_id, column)
+        unknown = [case_id for case_id in cycles_per_case if int(case_id) not in case_columns]
+        if unknown:
+            available = ", ".join(f"{case_id}({store.cases[column]})" for case_id, column in case_columns.items())
+            return f"case_id {unknown} 不在结果库中，可用的case_id: {available}"
+        cycles = np.zeros(len(store.cases), dtype=np.float64)
+        for case_id, n_cycles in cycles_per_case.items():
+            cycles[case_columns[int(case_id)]] = n_cycles
+        
+        material_names = list(sn_curves.keys())
+        curves = [c if isinstance(c, SNCurve) else SNCurve.model_validate(c) for c in sn_curves.values()]
+        try:
+            curve_index = material_curve_index(
+                store.pids, len(store.ids), material_names, pid_materials, default_material
+            )
+        except ValueError as e:
+            return str(e)
+        
+        damage = miner_damage(store.values, cycles, curves, curve_index, r_ratio=r_ratio)
+        return self._summarize_damage(store, damage, "damage.npy", node_or_element_result, top_n)
+
+    def _summarize_damage(self, store: ResultStore, damage: np.ndarray, filename: str, entity: str, top_n: int) -> str:
+        """保存损伤数组并生成损伤最大实体的摘要"""
+        damage_path = os.path.join(store.store_dir, filename)
+        np.save(damage_path, damage.astype(np.float32))
+        
+        valid = np.isfinite(damage)
+        if not valid.any():
+            return "没有参与计算的实体，请检查pid_materials/default_material设置"
+        order = np.argsort(np.where(valid, damage, -np.inf))[::-1][:top_n]
+        top_lines = [f"  {entity} {int(store.ids[i])}: 损伤 {damage[i]:.4e}"
+                     + (f"，寿命 {1.0 / damage[i]:.4g} 个载荷谱循环" if damage[i] > 0 else "")
+                     for i in order]
+        
+        return "\n".join([
+            f"疲劳损伤计算完成（{entity}结果，{int(valid.sum())}个实体参与计算）",
+            f"最大损伤: {damage[order[0]]:.4e}，损伤大于1的实体数: {int((damage[valid] > 1).sum())}",
+            f"损伤数组（与结果库ids对齐，float32）: {damage_path}",
+            f"损伤最大的{len(order)}个实体:",
+            *top_lines,
+        ])
+
+    def compute_rainflow_damage(
+        self,
+        result_file: str,
+        sn_curves: Dict[str, Any],
+        result_category: str = "Mises",
+        node_or_element_result: str = "node",
+        pid_materials: Dict[str, List[int]] = None,
+        default_material: str = None,
+        repeats: float = 1.0,
+        top_n: int = 20
+    ) -> str:
+        """
+        对多时间步结果（如ODB的各STEP/TIME帧）逐节点/单元做雨流计数并累计Miner损伤
+        结果库中各工况按时间顺序构成每个实体的载荷时间历程，需先调用get_all_node_results/get_all_element_results
+        :param result_file: 结果文件路径
+        :param sn_curves: 字典，键为材料名称，值为S-N曲线参数（sf, b, su, endurance_limit）
+        :param result_category: 结果类型（默认'Mises'）
+        :param node_or_element_result: 使用节点结果还是单元结果（'node'或'element'）
+        :param pid_materials: 字典，键为材料名称，值为属于该材料的属性ID列表
+        :param default_material: 未在pid_materials中出现的实体使用的材料；pid_materials为空时必须提供
+        :param repeats: 载荷历程重复次数
+        :param top_n: 返回损伤最大的实体数量
+        :return: 损伤计算结果摘要及损伤数组路径
+        """
+        if not sn_curves:
+            return "必须提供sn_curves参数"
+        store = ResultStore.open(result_file, node_or_element_result, result_category)
+        if store is None:
+            return (f"未找到{node_or_element_result}_{result_category}结果库，请先调用"
+                    f"get_all_{node_or_element_result}_results生成结果")
+        if len(store.cases) < 2:
+            return f"结果库仅有{len(store.cases)}个工况，无法构成时间历程"
+        
+        material_names = list(sn_curves.keys())
+        curves = [c if isinstance(c, SNCurve) else SNCurve.model_validate(c) for c in sn_curves.values()]
+        try:
+            curve_index = material_curve_index(
+                store.pids, len(store.ids), material_names, pid_materials, default_material
+            )
+        except ValueError as e:
+            return str(e)
+        
+        damage = rainflow_damage(store.values, curves, curve_index, repeats=repeats)
+        return self._summarize_damage(store, damage, "rainflow_damage.npy", node_or_element_result, top_n)
@@ -8,6 +8,7 @@ from langchain_openai import ChatOpenAI
 from langchain_deepseek import ChatDeepSeek
 from dotenv import load_dotenv
 import EnvConfig
+from .command_plan import CommandPlan
 from PIL import Image, ImageDraw, ImageFont
 import os, datetime, json
 
@@ -133,6 +134,9 @@ class MCPToolKit:
         :param query: 查询需求，用于从日志中提取相关信息
         :return: 执行结果或提取的相关信息
         """
+        # 去除冗余的重复加载及设置命令
+        plan = CommandPlan.from_commands(commands).optimize()
+        commands = plan.commands
         with open('./commands.txt', 'w', encoding='utf-8') as f:
             f.write('\n'.join(commands))
         try:
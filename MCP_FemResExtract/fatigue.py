@@ -0,0 +1,150 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Union
+from pydantic import BaseModel, Field
+
+
+class SNCurve(BaseModel):
+    """材料S-N曲线参数（Basquin公式 σa = σf' * (2N)^b，Goodman平均应力修正）"""
+    sf: float = Field(description="疲劳强度系数σf'（MPa）")
+    b: float = Field(description="疲劳强度指数b（负数，如-0.085）")
+    su: float = Field(description="抗拉强度Su（MPa），用于Goodman平均应力修正")
+    endurance_limit: float = Field(default=0.0, description="疲劳极限（MPa），等效应力幅低于该值时不计损伤")
+
+
+def goodman_amplitude(sa: np.ndarray, sm: np.ndarray, su: Union[float, np.ndarray]) -> np.ndarray:
+    """Goodman修正后的等效应力幅 σar = σa / (1 - σm/Su)，平均应力达到Su时为无穷大"""
+    ratio = 1.0 - np.maximum(sm, 0.0) / su
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ratio > 0, sa / ratio, np.inf)
+
+
+def cycles_to_failure(
+    sa_eq: np.ndarray,
+    sf: Union[float, np.ndarray],
+    b: Union[float, np.ndarray],
+    endurance_limit: Union[float, np.ndarray] = 0.0,
+) -> np.ndarray:
+    """Basquin公式反算失效循环次数 N = 0.5 * (σar/σf')^(1/b)，低于疲劳极限时为无穷大"""
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        n = 0.5 * np.power(sa_eq / sf, 1.0 / b)
+    return np.where((sa_eq > endurance_limit) & (sa_eq > 0), n, np.inf)
+
+
+def cycle_damage(
+    ranges: np.ndarray,
+    means: np.ndarray,
+    counts: np.ndarray,
+    sf: Union[float, np.ndarray],
+    b: Union[float, np.ndarray],
+    su: Union[float, np.ndarray],
+    endurance_limit: Union[float, np.ndarray] = 0.0,
+) -> np.ndarray:
+    """按循环（应力范围、平均应力、次数）计算Miner损伤 D = n / N"""
+    sa_eq = goodman_amplitude(np.abs(ranges) / 2.0, means, su)
+    with np.errstate(divide="ignore"):
+        return counts / cycles_to_failure(sa_eq, sf, b, endurance_limit)
+
+
+def _case_damage_block(
+    stress: np.ndarray,
+    cycles: np.ndarray,
+    r_ratio: float,
+    sf: np.ndarray,
+    b: np.ndarray,
+    su: np.ndarray,
+    endurance_limit: np.ndarray,
+) -> np.ndarray:
+    """计算一个行块的累计损伤，stress为(行数, 工况数)，材料参数为(行数, 1)"""
+    peak = np.abs(np.nan_to_num(stress, nan=0.0)).astype(np.float64)
+    # 工况结果视为恒幅循环的峰值，按应力比R换算应力幅和平均应力
+    ranges = peak * (1.0 - r_ratio)
+    means = peak * (1.0 + r_ratio) / 2.0
+    damage = cycle_damage(ranges, means, cycles[np.newaxis, :], sf, b, su, endurance_limit)
+    return damage.sum(axis=1)
+
+
+def miner_damage(
+    stress: np.ndarray,
+    cycles: Sequence[float],
+    curves: List[SNCurve],
+    curve_index: Optional[np.ndarray] = None,
+    r_ratio: float = 0.0,
+    chunk_rows: int = 262144,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    基于各工况应力结果的Miner线性累积损伤，按行分块在多核上并行计算（NumPy运算释放GIL）
+    :param stress: 应力矩阵（实体数 x 工况数），可为ResultStore.values内存映射
+    :param cycles: 各工况循环次数（长度为工况数，0表示该工况不参与计算）
+    :param curves: S-N曲线列表
+    :param curve_index: 每个实体使用的S-N曲线序号（长度为实体数，-1表示不计算），默认全部使用curves[0]
+    :param r_ratio: 应力比R（最小应力/最大应力），默认0即脉动循环
+    :param chunk_rows: 每个计算块的行数
+    :param workers: 并行线程数，默认CPU核数
+    :return: 每个实体的累计损伤（未指定材料的实体为NaN）
+    """
+    cycles = np.asarray(cycles, dtype=np.float64)
+    n_rows = stress.shape[0]
+    if stress.shape[1] != len(cycles):
+        raise ValueError(f"工况数({stress.shape[1]})与循环次数数量({len(cycles)})不一致")
+    if curve_index is None:
+        curve_index = np.zeros(n_rows, dtype=np.int64)
+
+    # 材料参数表，末尾追加一行占位参数供未指定材料的实体使用
+    params = np.array(
+        [[c.sf, c.b, c.su, c.endurance_limit] for c in curves] + [[1.0, -1.0, np.inf, np.inf]],
+        dtype=np.float64,
+    )
+    lookup = np.where(curve_index >= 0, curve_index, len(curves))
+    active_cases = np.flatnonzero(cycles > 0)
+    damage = np.empty(n_rows, dtype=np.float64)
+
+    def run(start):
+        stop = min(start + chunk_rows, n_rows)
+        p = params[lookup[start:stop]]
+        damage[start:stop] = _case_damage_block(
+            stress[start:stop][:, active_cases],
+            cycles[active_cases],
+            r_ratio,
+            p[:, 0:1], p[:, 1:2], p[:, 2:3], p[:, 3:4],
+        )
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(run, range(0, n_rows, chunk_rows)))
+    damage[curve_index < 0] = np.nan
+    return damage
+
+
+def material_curve_index(
+    pids: Optional[np.ndarray],
+    n_rows: int,
+    material_names: List[str],
+    pid_materials: Optional[Dict[str, List[int]]] = None,
+    default_material: Optional[str] = None,
+) -> np.ndarray:
+    """
+    根据属性ID与材料的对应关系生成每个实体的S-N曲线序号
+    :param pids: 每个实体的属性ID（ResultStore.pids）
+    :param n_rows: 实体数
+    :param material_names: S-N曲线对应的材料名称列表（顺序即曲线序号）
+    :param pid_materials: 字典，键为材料名称，值为属于该材料的属性ID列表
+    :param default_material: 未在pid_materials中出现的实体使用的材料，None表示不计算；pid_materials为空时必须提供
+    :return: 曲线序号数组（-1表示不计算），参数不合法时抛出ValueError
+    """
+    if not pid_materials and not default_material:
+        raise ValueError(f"未提供pid_materials时必须通过default_material指定全部实体使用的材料，可选材料: {material_names}")
+    if default_material and default_material not in material_names:
+        raise ValueError(f"材料 {default_material} 未提供S-N曲线参数，可选材料: {material_names}")
+    default = material_names.index(default_material) if default_material else -1
+    index = np.full(n_rows, default, dtype=np.int64)
+    if not pid_materials:
+        return index
+    if pids is None:
+        raise ValueError("结果库中没有属性ID（Pid）字段，无法按材料分配S-N曲线")
+    for material, pid_list in pid_materials.items():
+        if material not in material_names:
+            raise ValueError(f"材料 {material} 未提供S-N曲线参数")
+        index[np.isin(pids, np.asarray(pid_list, dtype=np.int64))] = material_names.index(material)
+    return index
@@ -0,0 +1,281 @@
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .case_catalog import load_cached_catalog
+from .prefetch import load_summary, entity_index_path_for
+
+# 纳入目录的结果文件类型及求解器类型（与MCPToolKit._result_file_type一致）
+CATALOG_SOLVERS = {".h3d": "Hypermesh", ".odb": "Abaqus"}
+# 文件指纹读取的文件头/文件尾字节数
+FINGERPRINT_BLOCK_BYTES = 1024 * 1024
+# 入库状态
+STATUS_DISCOVERED = "discovered"
+STATUS_QUEUED = "queued"
+STATUS_READY = "ready"
+STATUS_ERROR = "error"
+STATUS_DELETED = "deleted"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS result_files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    solver TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    created REAL NOT NULL,
+    fingerprint TEXT NOT NULL,
+    case_count INTEGER,
+    n_nodes INTEGER,
+    n_elements INTEGER,
+    project TEXT,
+    vehicle TEXT,
+    status TEXT NOT NULL,
+    status_detail TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_result_files_project ON result_files (project, created);
+CREATE INDEX IF NOT EXISTS idx_result_files_vehicle ON result_files (vehicle, created);
+CREATE INDEX IF NOT EXISTS idx_result_files_solver ON result_files (solver, created);
+CREATE INDEX IF NOT EXISTS idx_result_files_created ON result_files (created);
+CREATE INDEX IF NOT EXISTS idx_result_files_status ON result_files (status);
+"""
+
+
+def quick_fingerprint(path: str, size: int) -> str:
+    """文件指纹：文件大小及文件头、文件尾的SHA-1（只读取首尾数据块，避免对大结果文件全量计算摘要）"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_BLOCK_BYTES))
+        if size > 2 * FINGERPRINT_BLOCK_BYTES:
+            f.seek(size - FINGERPRINT_BLOCK_BYTES)
+        digest.update(f.read(FINGERPRINT_BLOCK_BYTES))
+    return f"{size}-{digest.hexdigest()[:16]}"
+
+
+def parse_path_tags(path: str, root: str, vehicle_pattern: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    从路径解析项目及车型：项目为管理目录下的第一级目录，车型为目录名/文件名中首个匹配vehicle_pattern的片段
+    :param path: 结果文件路径
+    :param root: 管理目录
+    :param vehicle_pattern: 车型正则（第一个分组或整个匹配为车型）
+    :return: (项目, 车型)，无法解析时为None
+    """
+    try:
+        parts = os.path.relpath(path, root).split(os.sep)
+    except ValueError:
+        parts = [os.path.basename(path)]
+    if parts and parts[0] == os.pardir:
+        parts = [os.path.basename(path)]
+    project = parts[0] if len(parts) > 1 else None
+    vehicle = None
+    pattern = re.compile(vehicle_pattern)
+    for part in parts[:-1] + [os.path.splitext(parts[-1])[0]]:
+        match = pattern.search(part)
+        if match:
+            vehicle = (match.group(1) if match.groups() else match.group(0)).upper()
+            break
+    return project, vehicle
+
+
+class ResultFileCatalog:
+    """
+    管理目录下结果文件的本地SQLite目录：求解器类型、大小、指纹、工况数、模型规模、创建时间、
+    由路径解析的项目/车型及入库状态，按项目/车型/求解器/创建时间/状态建立索引
+    - 每次操作使用独立连接（WAL模式），可在工具调用、文件监视及后台预热线程中并发使用
+    - 工况数及模型规模取自工况目录缓存和实体索引（结果文件预热后生成）
+    """
+
+    def __init__(self, db_path: str, root: str, vehicle_pattern: str):
+        """
+        :param db_path: SQLite数据库文件路径
+        :param root: 管理目录（解析项目/车型的基准目录）
+        :param vehicle_pattern: 车型正则
+        """
+        self.db_path = db_path
+        self.root = root
+        self.vehicle_pattern = vehicle_pattern
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._init_lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+                conn = sqlite3.connect(self.db_path, timeout=30)
+                try:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                finally:
+                    conn.close()
+                self._initialized = True
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _describe(self, path: str, previous: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        """生成结果文件的目录记录，文件不存在或类型不支持时返回None；大小/修改时间未变时沿用已有指纹"""
+        solver = CATALOG_SOLVERS.get(os.path.splitext(path)[1].lower())
+        if solver is None:
+            return None
+        try:
+            stat = os.stat(path)
+            if previous is not None and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+                fingerprint = previous["fingerprint"]
+            else:
+                fingerprint = quick_fingerprint(path, stat.st_size)
+        except OSError:
+            return None
+        project, vehicle = parse_path_tags(path, self.root, self.vehicle_pattern)
+        record = {
+            "path": path,
+            "name": os.path.basename(path),
+            "directory": os.path.dirname(path),
+            "solver": solver,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            # Linux不记录文件创建时间，结果文件写完后不再修改，以修改时间代替
+            "created": getattr(stat, "st_birthtime", stat.st_mtime),
+            "fingerprint": fingerprint,
+            "project": project,
+            "vehicle": vehicle,
+            "case_count": None,
+            "n_nodes": None,
+            "n_elements": None,
+        }
+        catalog = load_cached_catalog(path)
+        if catalog is not None:
+            record["case_count"] = len(catalog.effective_cases)
+        index = load_summary(path, entity_index_path_for(path))
+        if index is not None:
+            record["n_nodes"] = index.get("node", {}).get("count")
+            record["n_elements"] = index.get("element", {}).get("count")
+        return record
+
+    def upsert(self, result_file: str, status: Optional[str] = None, detail: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        新增或更新结果文件的目录记录
+        :param result_file: 结果文件路径
+        :param status: 入库状态，默认沿用已有状态（新文件为discovered；文件内容变化时重置为discovered）
+        :param detail: 状态说明（如预热失败原因）
+        :return: 目录记录，文件不存在或类型不支持时返回None
+        """
+        path = os.path.abspath(result_file)
+        with self._connect() as conn:
+            previous = conn.execute("SELECT * FROM result_files WHERE path = ?", (path,)).fetchone()
+            record = self._describe(path, previous)
+            if record is None:
+                return None
+            if status is None:
+                unchanged = previous is not None and previous["fingerprint"] == record["fingerprint"] \
+                    and previous["status"] != STATUS_DELETED
+                status = previous["status"] if unchanged else STATUS_DISCOVERED
+                detail = previous["status_detail"] if unchanged else None
+            record.update({"status": status, "status_detail": detail, "updated": time.time()})
+            columns = list(record)
+            conn.execute(
+                f"INSERT OR REPLACE INTO result_files ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [record[column] for column in columns],
+            )
+        return record
+
+    def mark_deleted(self, result_file: str) -> None:
+        """将已删除/移走的结果文件标记为deleted（保留记录便于追溯）"""
+        with self._connect() as conn:
+            conn.execute("UPDATE result_files SET status = ?, status_detail = NULL, updated = ? WHERE path = ?",
+                         (STATUS_DELETED, time.time(), os.path.abspath(result_file)))
+
+    def sync(self, root: Optional[str] = None) -> Tuple[int, int]:
+        """
+        扫描管理目录同步目录：新增/更新现有结果文件，目录中不再存在的文件标记为deleted
+        :param root: 扫描目录，默认为管理目录
+        :return: (同步的文件数, 标记删除的文件数)
+        """
+        root = os.path.abspath(root or self.root)
+        found = set()
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in CATALOG_SOLVERS:
+                    path = os.path.join(dirpath, filename)
+                    if self.upsert(path) is not None:
+                        found.add(path)
+        prefix = root.rstrip(os.sep) + os.sep
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path FROM result_files WHERE status != ? AND substr(path, 1, ?) = ?",
+                                (STATUS_DELETED, len(prefix), prefix)).fetchall()
+        missing = [row["path"] for row in rows if row["path"] not in found]
+        for path in missing:
+            self.mark_deleted(path)
+        return len(found), len(missing)
+
+    def search(
+        self,
+        keywords: Optional[List[str]] = None,
+        project: Optional[str] = None,
+        vehicle: Optional[str] = None,
+        solver: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[float] = None,
+        created_before: Optional[float] = None,
+        include_deleted: bool = False,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """
+        按条件查询结果文件，按创建时间倒序
+        :param keywords: 路径关键词列表（均需包含，不区分大小写），如['torsion']
+        :param project: 项目（精确匹配）
+        :param vehicle: 车型或车型前缀（如'X'匹配X01、X02）
+        :param solver: 求解器类型（Hypermesh/Abaqus）
+        :param status: 入库状态
+        :param created_after: 创建时间下限（时间戳）
+        :param created_before: 创建时间上限（时间戳）
+        :param include_deleted: 是否包含已删除的文件
+        :param limit: 返回条数上限
+        :return: 目录记录列表
+        """
+        clauses, params = [], []
+        for keyword in keywords or []:
+            clauses.append("path LIKE ? ESCAPE '\\'")
+            params.append("%" + re.sub(r"([%_\\])", r"\\\1", keyword) + "%")
+        if project:
+            clauses.append("project = ?")
+            params.append(project)
+        if vehicle:
+            clauses.append("vehicle >= ? AND vehicle < ?")
+            params.extend([vehicle.upper(), vehicle.upper() + "\uffff"])
+        if solver:
+            clauses.append("solver = ?")
+            params.append(solver)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        elif not include_deleted:
+            clauses.append("status != ?")
+            params.append(STATUS_DELETED)
+        if created_after is not None:
+            clauses.append("created >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            clauses.append("created < ?")
+            params.append(created_before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM result_files {where} ORDER BY created DESC LIMIT ?",
+                                params + [max(1, limit)]).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """各入库状态的文件数"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM result_files GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
@@ -0,0 +1,8 @@
+import os
+from typing import Dict
+
+
+def file_fingerprint(path: str) -> Dict[str, float]:
+    """文件指纹（大小及修改时间），用于判断工况目录、结果库、预计算摘要等派生数据是否由当前文件生成"""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
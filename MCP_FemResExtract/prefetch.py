@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from Metrics import metrics
+from .result_store import ResultStore
+from .fingerprint import file_fingerprint
+from .scheduler import current_user
+from .watcher import solver_running
+
+# 触发预热的结果文件类型
+PREFETCH_EXTENSIONS = (".h3d", ".odb")
+SUMMARY_VERSION = 1
+
+
+def entity_index_path_for(result_file: str) -> str:
+    """实体索引文件：与结果文件同目录的<文件名>_entity_index.json"""
+    return f"{os.path.splitext(result_file)[0]}_entity_index.json"
+
+
+def part_summary_path_for(result_file: str, result_category: str) -> str:
+    """部件结果摘要文件：与结果文件同目录的<文件名>_part_summary_<结果类型>.json"""
+    return f"{os.path.splitext(result_file)[0]}_part_summary_{result_category}.json"
+
+
+def save_summary(result_file: str, path: str, data: Dict[str, Any]) -> str:
+    """写入预计算结果（记录结果文件指纹，先写临时文件再替换）"""
+    data = {"version": SUMMARY_VERSION, "source": file_fingerprint(result_file), **data}
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_summary(result_file: str, path: str) -> Optional[Dict[str, Any]]:
+    """读取预计算结果，结果文件变化（大小/修改时间）或文件不存在时返回None"""
+    if not os.path.exists(path) or not os.path.exists(result_file):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != SUMMARY_VERSION or data.get("source") != file_fingerprint(result_file):
+        return None
+    return data
+
+
+def build_entity_index(node_store: Optional[ResultStore], element_store: Optional[ResultStore]) -> Dict[str, Any]:
+    """
+    由结果库生成实体索引：节点/单元数量及ID范围、各属性ID包含的单元数
+    :param node_store: 节点结果库（可为None）
+    :param element_store: 单元结果库（可为None）
+    :return: 实体索引字典
+    """
+    index: Dict[str, Any] = {}
+    for entity, store in (("node", node_store), ("element", element_store)):
+        if store is None or not len(store.ids):
+            continue
+        index[entity] = {"count": int(len(store.ids)), "min_id": int(store.ids[0]), "max_id": int(store.ids[-1])}
+    if element_store is not None and element_store.pids is not None:
+        pids, counts = np.unique(element_store.pids, return_counts=True)
+        index["parts"] = {str(int(pid)): int(count) for pid, count in zip(pids, counts)}
+    return index
+
+
+def build_part_summary(store: ResultStore) -> Dict[str, Any]:
+    """
+    由单元结果库按属性ID汇总结果：各工况最大值、全工况最大值及其所在工况和单元
+    按属性ID排序后对每个工况列分段求最大值（NaN不参与），只对最大工况列逐部件定位单元
+    :param store: 含pids的单元结果库
+    :return: 部件摘要字典（cases为工况名称列表，parts按属性ID列出）
+    """
+    if store.pids is None:
+        raise ValueError(f"结果库缺少属性ID（pids），无法按部件汇总: {store.store_dir}")
+    order = np.argsort(store.pids, kind="stable")
+    sorted_pids = np.asarray(store.pids)[order]
+    starts = np.flatnonzero(np.r_[True, sorted_pids[1:] != sorted_pids[:-1]])
+    ends = np.r_[starts[1:], len(sorted_pids)]
+    part_max = np.empty((len(starts), len(store.cases)), dtype=np.float32)
+    for j in range(len(store.cases)):
+        column = np.asarray(store.values[:, j])[order]
+        part_max[:, j] = np.fmax.reduceat(column, starts)
+
+    parts = []
+    for k, (start, end) in enumerate(zip(starts, ends)):
+        row = part_max[k]
+        finite = np.isfinite(row)
+        entry: Dict[str, Any] = {"pid": int(sorted_pids[start]), "n_elements": int(end - start),
+                                 "max_per_case": [float(v) if np.isfinite(v) else None for v in row]}
+        if finite.any():
+            best_case = int(np.nanargmax(np.where(finite, row, np.nan)))
+            rows = order[start:end]
+            best_row = rows[int(np.nanargmax(np.asarray(store.values[rows, best_case])))]
+            entry.update({"max": float(row[best_case]), "max_case": store.cases[best_case],
+                          "max_element": int(store.ids[best_row])})
+        parts.append(entry)
+    return {"cases": store.cases, "parts": parts}
+
+
+class ResultPrefetcher:
+    """
+    结果文件预热：结果文件首次被引用（或出现在管理目录下）时，在后台执行预热函数生成预计算数据
+    - 同一结果文件按指纹（大小/修改时间）只预热一次，文件重新求解后再次引用时重新预热
+    - 预热在独立线程池中执行，META任务以bulk优先级提交，不占用交互查询预留的许可证
+    - 可选轮询扫描管理目录：新出现的结果文件在相邻两次扫描中大小不变且求解作业已结束（写入完成）后预热
+    """
+
+    def __init__(self, warm_up: Callable[[str], Dict[str, str]], workers: int = 1):
+        """
+        :param warm_up: 预热函数 (结果文件路径) -> {阶段名称: 结果描述}
+        :param workers: 同时预热的结果文件数
+        """
+        self.warm_up = warm_up
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._known: Optional[Dict[str, Tuple[float, float]]] = None
+        self._pending: Dict[str, Tuple[float, float]] = {}
+        self._scanner: Optional[threading.Thread] = None
+
+    def touch(self, result_file: str) -> bool:
+        """
+        登记结果文件的引用，未预热（或已重新求解）时提交后台预热
+        :param result_file: 结果文件路径
+        :return: 是否提交了新的预热任务
+        """
+        if not result_file or os.path.splitext(result_file)[1].lower() not in PREFETCH_EXTENSIONS:
+            return False
+        path = os.path.abspath(result_file)
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            return False
+        with self._lock:
+            job = self._jobs.get(path)
+            if job is not None and job["source"] == fingerprint:
+                return False
+            job = self._jobs[path] = {"source": fingerprint, "state": "queued", "stages": {},
+                                      "submitted": time.time(), "finished": None}
+        self._executor.submit(self._run, path, job)
+        return True
+
+    def forget(self, result_file: str) -> None:
+        """清除结果文件的预热记录（如几何文件变化、派生文件已失效），下次引用时重新预热"""
+        with self._lock:
+            self._jobs.pop(os.path.abspath(result_file), None)
+
+    def _run(self, path: str, job: Dict[str, Any]) -> None:
+        current_user.set("prefetch")
+        with self._lock:
+            job["state"] = "running"
+        with metrics.span("prefetch", file_type=os.path.splitext(path)[1].lower()) as span:
+            try:
+                stages = self.warm_up(path)
+                state = "done"
+            except Exception as e:
+                stages, state = {"error": str(e)}, "error"
+                span["status"] = "error"
+            span["stages"] = len(stages)
+        metrics.inc("prefetch_jobs_total", status=state)
+        with self._lock:
+            # 预热期间记录被清除或替换（文件再次变化）时不影响新任务的状态
+            job.update({"state": state, "stages": stages, "finished": time.time()})
+
+    def status(self, result_file: str) -> Optional[Dict[str, Any]]:
+        """结果文件的预热状态（queued/running/done/error及各阶段结果），未登记时返回None"""
+        with self._lock:
+            job = self._jobs.get(os.path.abspath(result_file))
+            return dict(job) if job is not None else None
+
+    def status_text(self) -> str:
+        """预热任务的文本描述"""
+        with self._lock:
+            jobs = {path: dict(job) for path, job in self._jobs.items()}
+        counts: Dict[str, int] = {}
+        for job in jobs.values():
+            counts[job["state"]] = counts.get(job["state"], 0) + 1
+        lines = [f"结果文件预热: 共{len(jobs)}个（" + "，".join(f"{state} {n}" for state, n in counts.items()) + "）"]
+        for path, job in jobs.items():
+            if job["state"] in ("queued", "running"):
+                lines.append(f"  [{job['state']}] {path}")
+        return "\n".join(lines)
+
+    def scan(self, root: str, quiet: float = 60.0) -> List[str]:
+        """
+        扫描管理目录一次：首次扫描只记录已有文件；之后新出现或发生变化的结果文件，
+        在相邻两次扫描中大小和修改时间均不变、且求解作业已结束时视为写入完成并提交预热
+        :param root: 管理目录
+        :param quiet: 求解器状态/消息文件（.sta/.msg）的静默时间（秒），见solver_running
+        :return: 本次提交预热的结果文件列表
+        """
+        current: Dict[str, Tuple[float, float]] = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in PREFETCH_EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                current[path] = (stat.st_size, stat.st_mtime)
+        if self._known is None:
+            self._known = current
+            return []
+        submitted = []
+        for path, fingerprint in current.items():
+            if self._known.get(path) == fingerprint:
+                continue
+            if self._pending.get(path) == fingerprint:
+                if solver_running(path, quiet):
+                    continue
+                self._pending.pop(path)
+                self._known[path] = fingerprint
+                if self.touch(path):
+                    submitted.append(path)
+            else:
+                self._pending[path] = fingerprint
+        return submitted
+
+    def start_scanner(self, root: str, interval: float) -> None:
+        """启动后台线程按固定间隔扫描管理目录（目录不存在或间隔不大于0时不启动）"""
+        if interval <= 0 or not os.path.isdir(root) or self._scanner is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                try:
+                    self.scan(root, quiet=interval)
+                except Exception:
+                    metrics.inc("prefetch_scan_errors_total")
+                time.sleep(interval)
+
+        self._scanner = threading.Thread(target=loop, name="prefetch-scanner", daemon=True)
+        self._scanner.start()
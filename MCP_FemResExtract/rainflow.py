@@ -0,0 +1,122 @@
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional
+from .fatigue import SNCurve, cycle_damage
+
+
+class RainflowCycles(NamedTuple):
+    """雨流计数结果（扁平数组，每个元素为一个循环或半循环）"""
+    row: np.ndarray     # 所属时间历程的行号
+    range: np.ndarray   # 应力范围
+    mean: np.ndarray    # 平均应力
+    count: np.ndarray   # 循环次数（1.0为全循环，0.5为残余半循环）
+
+
+def rainflow_count(histories: np.ndarray) -> RainflowCycles:
+    """
+    ASTM E1049四点法雨流计数，对一批时间历程按时间步同步推进，每一步的栈操作对所有行向量化执行
+    峰谷提取在入栈时完成：与栈顶同向延伸的点直接替换栈顶，因此无需预先提取转折点
+    残余序列按相邻点计为半循环
+    :param histories: 时间历程矩阵（历程数 x 时间步数），NaN按0处理
+    :return: 雨流计数结果
+    """
+    histories = np.nan_to_num(np.asarray(histories, dtype=np.float64), nan=0.0)
+    n_rows, n_steps = histories.shape
+    stack = np.empty((n_rows, n_steps), dtype=np.float64)
+    top = np.zeros(n_rows, dtype=np.int64)
+    all_rows = np.arange(n_rows)
+    rows_out: List[np.ndarray] = []
+    ranges_out: List[np.ndarray] = []
+    means_out: List[np.ndarray] = []
+
+    for t in range(n_steps):
+        x = histories[:, t]
+        # 与栈顶同向（或相等）的点替换栈顶，否则入栈
+        prev = stack[all_rows, np.maximum(top - 1, 0)]
+        prev2 = stack[all_rows, np.maximum(top - 2, 0)]
+        extend = ((top >= 2) & ((prev - prev2) * (x - prev) >= 0)) | ((top == 1) & (x == prev))
+        replace_rows = all_rows[extend]
+        stack[replace_rows, top[replace_rows] - 1] = x[replace_rows]
+        push_rows = all_rows[~extend]
+        stack[push_rows, top[push_rows]] = x[push_rows]
+        top[push_rows] += 1
+
+        # 四点法：|s3-s2| <= |s4-s3| 且 |s3-s2| <= |s2-s1| 时计一个全循环并移除s2、s3
+        candidates = all_rows[top >= 4]
+        while candidates.size:
+            k = top[candidates]
+            s1 = stack[candidates, k - 4]
+            s2 = stack[candidates, k - 3]
+            s3 = stack[candidates, k - 2]
+            s4 = stack[candidates, k - 1]
+            y = np.abs(s3 - s2)
+            hit = (y <= np.abs(s4 - s3)) & (y <= np.abs(s2 - s1))
+            if not hit.any():
+                break
+            hit_rows = candidates[hit]
+            rows_out.append(hit_rows)
+            ranges_out.append(y[hit])
+            means_out.append((s2[hit] + s3[hit]) / 2.0)
+            stack[hit_rows, top[hit_rows] - 3] = s4[hit]
+            top[hit_rows] -= 2
+            candidates = hit_rows[top[hit_rows] >= 4]
+
+    n_full = sum(len(r) for r in rows_out)
+
+    # 残余序列：相邻点计为半循环
+    pair_mask = np.arange(n_steps - 1)[np.newaxis, :] < (top - 1)[:, np.newaxis]
+    res_rows, res_idx = np.nonzero(pair_mask)
+    a = stack[res_rows, res_idx]
+    b = stack[res_rows, res_idx + 1]
+    rows_out.append(res_rows)
+    ranges_out.append(np.abs(b - a))
+    means_out.append((a + b) / 2.0)
+
+    return RainflowCycles(
+        row=np.concatenate(rows_out).astype(np.int64),
+        range=np.concatenate(ranges_out),
+        mean=np.concatenate(means_out),
+        count=np.concatenate([np.ones(n_full), np.full(len(res_rows), 0.5)]),
+    )
+
+
+def rainflow_damage(
+    histories: np.ndarray,
+    curves: List[SNCurve],
+    curve_index: Optional[np.ndarray] = None,
+    repeats: float = 1.0,
+    batch_size: int = 65536,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    分批雨流计数并直接累计Miner损伤，循环数组用完即弃，内存占用与批大小相关
+    :param histories: 时间历程矩阵（历程数 x 时间步数），可为ResultStore.values内存映射
+    :param curves: S-N曲线列表
+    :param curve_index: 每个历程使用的S-N曲线序号（-1表示不计算），默认全部使用curves[0]
+    :param repeats: 载荷历程重复次数
+    :param batch_size: 每批历程数
+    :param workers: 并行线程数，默认CPU核数
+    :return: 每个历程的累计损伤（未指定材料的为NaN）
+    """
+    n_rows = histories.shape[0]
+    if curve_index is None:
+        curve_index = np.zeros(n_rows, dtype=np.int64)
+    params = np.array(
+        [[c.sf, c.b, c.su, c.endurance_limit] for c in curves] + [[1.0, -1.0, np.inf, np.inf]],
+        dtype=np.float64,
+    )
+    lookup = np.where(curve_index >= 0, curve_index, len(curves))
+    damage = np.zeros(n_rows, dtype=np.float64)
+
+    def run(start):
+        stop = min(start + batch_size, n_rows)
+        cycles = rainflow_count(histories[start:stop])
+        p = params[lookup[start:stop][cycles.row]]
+        d = cycle_damage(cycles.range, cycles.mean, cycles.count, p[:, 0], p[:, 1], p[:, 2], p[:, 3])
+        damage[start:stop] = np.bincount(cycles.row, weights=d, minlength=stop - start) * repeats
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        list(pool.map(run, range(0, n_rows, batch_size)))
+    damage[curve_index < 0] = np.nan
+    return damage
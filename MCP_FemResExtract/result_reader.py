@@ -0,0 +1,206 @@
+import io
+from itertools import zip_longest
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# 工况名称行的起始关键字（META多工况CSV中每个工况块的第一行）
+CASE_LINE_PREFIXES = ("STEP", "Subcase")
+
+
+class ResultBlock(NamedTuple):
+    """多工况CSV中的一个工况块"""
+    case_name: str          # 工况名称行内容
+    columns: List[str]      # 字段名称行
+    data_offset: int        # 数据行起始字节偏移
+    n_rows: int             # 数据行数
+
+
+def is_case_line(line: str) -> bool:
+    """判断是否为工况名称行（以STEP或Subcase开头）"""
+    return line.strip().strip('"').startswith(CASE_LINE_PREFIXES)
+
+
+def _parse_case_name(line: str) -> str:
+    """去除工况名称行中的引号及行尾多余分隔符"""
+    return line.strip().rstrip(',').strip().strip('"')
+
+
+def _parse_header(line: str) -> List[str]:
+    """解析字段名称行，空字段名（行尾多余逗号）保留为空字符串以维持列位置"""
+    return [name.strip().strip('"') for name in line.rstrip('\r\n').split(',')]
+
+
+def scan_result_blocks(csv_path: str) -> List[ResultBlock]:
+    """
+    快速扫描多工况CSV的块结构（不解析数值），用于获取工况列表、字段及每块行数
+    :param csv_path: get_all_node_results/get_all_element_results生成的CSV文件路径
+    :return: 工况块列表
+    """
+    blocks = []
+    case_name, columns, data_offset, n_rows = None, None, 0, 0
+    with open(csv_path, 'rb') as f:
+        offset = 0
+        for raw in f:
+            line = raw.decode('utf-8', errors='ignore')
+            offset += len(raw)
+            if not line.strip():
+                continue
+            if is_case_line(line):
+                if case_name is not None and columns is not None:
+                    blocks.append(ResultBlock(case_name, columns, data_offset, n_rows))
+                case_name, columns, n_rows = _parse_case_name(line), None, 0
+            elif case_name is not None and columns is None:
+                columns, data_offset = _parse_header(line), offset
+            elif columns is not None:
+                n_rows += 1
+    if case_name is not None and columns is not None:
+        blocks.append(ResultBlock(case_name, columns, data_offset, n_rows))
+    return blocks
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """将数值列降精度（整数列取最小整数类型，浮点列转为float32）以减少内存占用"""
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_integer_dtype(col):
+            df[name] = pd.to_numeric(col, downcast='integer')
+        elif pd.api.types.is_float_dtype(col):
+            df[name] = pd.to_numeric(col, downcast='float')
+    return df
+
+
+def _parse_chunk(lines: List[str], header: List[str], usecols: List[int], downcast: bool) -> pd.DataFrame:
+    """将缓冲的数据行解析为DataFrame"""
+    df = pd.read_csv(
+        io.StringIO(''.join(lines)),
+        header=None,
+        usecols=usecols,
+        on_bad_lines='skip',
+    )
+    df.columns = [header[i] for i in sorted(usecols)]
+    return downcast_frame(df) if downcast else df
+
+
+def iter_result_blocks(
+    csv_path: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = 200000,
+    downcast: bool = True,
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    流式读取多工况CSV，逐块返回(工况名称, DataFrame分块)，内存占用与文件大小无关
+    同一工况的数据行超过chunksize时会分多次返回（工况名称相同）
+    :param csv_path: get_all_node_results/get_all_element_results生成的CSV文件路径
+    :param columns: 需要读取的字段列表（列投影），默认None读取全部字段
+    :param chunksize: 每个DataFrame分块的最大行数
+    :param downcast: 是否对数值列降精度（float64->float32，整数取最小类型）
+    :return: (工况名称, DataFrame分块)生成器
+    """
+    for _, case_name, df in iter_indexed_result_blocks(csv_path, columns, chunksize, downcast):
+        if len(df):
+            yield case_name, df
+
+
+def iter_indexed_result_blocks(
+    csv_path: str,
+    columns: Optional[List[str]] = None,
+    chunksize: int = 200000,
+    downcast: bool = True,
+) -> Iterator[Tuple[int, str, pd.DataFrame]]:
+    """
+    流式读取多工况CSV，逐块返回(工况块序号, 工况名称, DataFrame分块)
+    工况块序号与scan_result_blocks返回的列表下标一致：同名的相邻工况块序号不同，
+    没有数据行的工况块返回一个空DataFrame，调用方可据此按块定位而不依赖工况名称
+    :param csv_path: get_all_node_results/get_all_element_results生成的CSV文件路径
+    :param columns: 需要读取的字段列表（列投影），默认None读取全部字段
+    :param chunksize: 每个DataFrame分块的最大行数
+    :param downcast: 是否对数值列降精度（float64->float32，整数取最小类型）
+    :return: (工况块序号, 工况名称, DataFrame分块)生成器
+    """
+    block_index, case_name, header, usecols = -1, None, None, None
+    buffer: List[str] = []
+    yielded = False
+
+    def flush() -> Iterator[Tuple[int, str, pd.DataFrame]]:
+        if buffer:
+            yield block_index, case_name, _parse_chunk(buffer, header, usecols, downcast)
+        elif header is not None and not yielded:
+            yield block_index, case_name, pd.DataFrame(columns=[header[i] for i in sorted(usecols)])
+
+    with open(csv_path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if is_case_line(line):
+                yield from flush()
+                buffer, yielded = [], False
+                case_name, header = _parse_case_name(line), None
+                continue
+            if case_name is None:
+                continue
+            if header is None:
+                # 每个工况块的字段行单独检测，不同工况块字段可以不同
+                header = _parse_header(line)
+                wanted = columns if columns is not None else [name for name in header if name]
+                usecols = [i for i, name in enumerate(header) if name and name in wanted]
+                if not usecols:
+                    raise ValueError(f"工况 {case_name} 中不存在字段 {columns}，可用字段：{[n for n in header if n]}")
+                block_index += 1
+                continue
+            buffer.append(line)
+            if len(buffer) >= chunksize:
+                yield block_index, case_name, _parse_chunk(buffer, header, usecols, downcast)
+                buffer, yielded = [], True
+        yield from flush()
+
+
+def write_wide_results(
+    category_csvs: Dict[str, str],
+    output_path: str,
+    value_columns: Sequence[str] = ("FunctionTop", "Disptotal"),
+    chunksize: int = 200000,
+) -> Tuple[List[str], int]:
+    """
+    将同一模型、同一实体类型下多个结果类型的多工况CSV合并为一个宽表CSV（每个结果类型一列），流式处理
+    输出保持多工况块结构（工况名称行、字段名称行、数据行），可直接用iter_result_blocks读取；
+    按工况块序号而非工况名称输出块头，同名的相邻工况块及没有数据行的工况块均保持为独立的块
+    各输入文件需来自同一次META会话（工况顺序及实体顺序一致）
+    :param category_csvs: 字典，键为结果类型（作为宽表列名），值为该结果类型导出的CSV路径
+    :param output_path: 宽表CSV输出路径
+    :param value_columns: 标量结果列候选（按优先级）
+    :param chunksize: 每次合并的最大行数
+    :return: (宽表字段列表, 数据行数)
+    """
+    categories = list(category_csvs)
+    readers = [iter_indexed_result_blocks(category_csvs[category], chunksize=chunksize, downcast=False)
+               for category in categories]
+    columns: List[str] = []
+    n_rows = 0
+    current_block = None
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        for chunks in zip_longest(*readers):
+            if any(chunk is None for chunk in chunks):
+                raise ValueError("各结果类型导出的数据行数不一致")
+            block_index, case_name = chunks[0][0], chunks[0][1]
+            if any((index, name) != (block_index, case_name) for index, name, _ in chunks):
+                raise ValueError(f"各结果类型导出的工况不一致: {[(index, name) for index, name, _ in chunks]}")
+            merged = None
+            for category, (_, _, df) in zip(categories, chunks):
+                value_col = next((col for col in value_columns if col in df.columns), None)
+                if value_col is None:
+                    raise ValueError(f"{category}结果中不存在结果字段 {list(value_columns)}，可用字段：{list(df.columns)}")
+                if merged is None:
+                    # 第一个结果类型保留ID、坐标/属性等字段，去除其余结果字段
+                    merged = df.drop(columns=[col for col in value_columns if col in df.columns])
+                elif not np.array_equal(merged["Id"].to_numpy(), df["Id"].to_numpy()):
+                    raise ValueError(f"工况 {case_name} 中{category}结果的实体顺序与其他结果类型不一致")
+                merged[category] = df[value_col].to_numpy()
+            if block_index != current_block:
+                columns = list(merged.columns)
+                f.write(f"{case_name}\n")
+                f.write(",".join(columns) + "\n")
+                current_block = block_index
+            merged.to_csv(f, header=False, index=False)
+            n_rows += len(merged)
+    return columns, n_rows
@@ -0,0 +1,208 @@
+import os
+import json
+import shutil
+import fcntl
+import numbers
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from .result_reader import scan_result_blocks, iter_indexed_result_blocks
+from .fingerprint import file_fingerprint
+
+# 标量结果列候选（按优先级），Displacement类型导出时FunctionTop即为位移幅值
+VALUE_COLUMNS = ("FunctionTop", "Disptotal")
+COORD_COLUMNS = ("origPosx", "origPosy", "origPosz")
+STORE_VERSION = 2
+
+
+class ResultStore:
+    """
+    按模型持久化的二进制结果库，所有数组以.npy存储并只读内存映射打开
+    多个会话/进程打开同一结果库时共享操作系统页缓存，不再各自持有DataFrame副本
+    目录结构：
+        ids.npy     实体ID（升序，int64）
+        values.npy  结果矩阵（实体数 x 工况数，float32，缺失为NaN）
+        coords.npy  节点原始坐标（实体数 x 3，float32，仅节点结果）
+        pids.npy    属性ID（实体数，int64，CSV含Pid字段时生成）
+        meta.json   工况列表、来源文件指纹等元数据
+    """
+
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def _load(self, name: str) -> Optional[np.ndarray]:
+        """只读内存映射加载数组，不存在时返回None"""
+        if name not in self._arrays:
+            path = os.path.join(self.store_dir, f"{name}.npy")
+            self._arrays[name] = np.load(path, mmap_mode="r") if os.path.exists(path) else None
+        return self._arrays[name]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._load("ids")
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._load("values")
+
+    @property
+    def coords(self) -> Optional[np.ndarray]:
+        return self._load("coords")
+
+    @property
+    def pids(self) -> Optional[np.ndarray]:
+        return self._load("pids")
+
+    @property
+    def cases(self) -> List[str]:
+        return self.meta["cases"]
+
+    def case_index(self, case) -> int:
+        """根据工况序号（整数，含numpy整数）或工况名称（str）返回结果矩阵的列号"""
+        if isinstance(case, numbers.Integral):
+            return int(case)
+        return self.cases.index(case)
+
+    def rows_for_ids(self, ids: Sequence[int]) -> np.ndarray:
+        """返回实体ID对应的行号，不存在的ID返回-1"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(self.ids, ids)
+        pos = np.clip(pos, 0, len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, pos, -1)
+
+    def case_values(self, case) -> np.ndarray:
+        """返回指定工况下所有实体的结果（零拷贝视图）"""
+        return self.values[:, self.case_index(case)]
+
+    @staticmethod
+    def store_dir_for(result_file: str, entity: str, result_category: str) -> str:
+        """结果库目录：与结果文件同目录的<文件名>_result_store/<实体>_<结果类型>"""
+        base_path = os.path.splitext(result_file)[0]
+        return os.path.join(f"{base_path}_result_store", f"{entity}_{result_category}")
+
+    @classmethod
+    def open(cls, result_file: str, entity: str, result_category: str) -> Optional["ResultStore"]:
+        """打开结果库，不存在时返回None"""
+        store_dir = cls.store_dir_for(result_file, entity, result_category)
+        if not os.path.exists(os.path.join(store_dir, "meta.json")):
+            return None
+        return cls(store_dir)
+
+    @classmethod
+    def is_fresh(cls, store_dir: str, csv_path: str) -> bool:
+        """判断结果库是否由当前CSV生成（比对文件大小与修改时间）"""
+        meta_path = os.path.join(store_dir, "meta.json")
+        if not os.path.exists(meta_path) or not os.path.exists(csv_path):
+            return False
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta.get("version") == STORE_VERSION and meta.get("source") == file_fingerprint(csv_path)
+
+    @classmethod
+    def build_from_csv(cls, csv_path: str, store_dir: str, chunksize: int = 200000) -> "ResultStore":
+        """
+        流式解析多工况CSV并写入结果库（先写临时目录，完成后替换，读者不会看到半成品）
+        以第一个工况块的实体集合为准，其余工况按ID对齐，缺失值为NaN
+        :param csv_path: get_all_node_results/get_all_element_results生成的CSV文件路径
+        :param store_dir: 结果库目录
+        :param chunksize: 流式读取的分块行数
+        :return: 结果库对象
+        """
+        os.makedirs(os.path.dirname(store_dir), exist_ok=True)
+        lock_path = store_dir + ".lock"
+        with open(lock_path, "w") as lock_file:
+            # 多进程同时构建同一结果库时串行化，后到者直接复用已构建的结果
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if cls.is_fresh(store_dir, csv_path):
+                    return cls(store_dir)
+                tmp_dir = f"{store_dir}.tmp-{os.getpid()}"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                os.makedirs(tmp_dir)
+                cls._write_store(csv_path, tmp_dir, chunksize)
+                shutil.rmtree(store_dir, ignore_errors=True)
+                os.rename(tmp_dir, store_dir)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return cls(store_dir)
+
+    @classmethod
+    def _write_store(cls, csv_path: str, out_dir: str, chunksize: int) -> None:
+        """将CSV写为.npy数组及meta.json"""
+        blocks = scan_result_blocks(csv_path)
+        if not blocks:
+            raise ValueError(f"CSV中未找到工况块: {csv_path}")
+        first = blocks[0]
+        value_column = next((c for c in VALUE_COLUMNS if c in first.columns), None)
+        if value_column is None or "Id" not in first.columns:
+            raise ValueError(f"CSV缺少Id或结果字段{VALUE_COLUMNS}: {first.columns}")
+        has_coords = all(c in first.columns for c in COORD_COLUMNS)
+        has_pids = "Pid" in first.columns
+        columns = ["Id", value_column] + (list(COORD_COLUMNS) if has_coords else []) + (["Pid"] if has_pids else [])
+
+        # 第一个工况块确定实体集合（按ID升序存储，便于二分查找）
+        # 按工况块序号（而非工况名称）定位结果列：同名的相邻工况块、没有数据行的工况块都各占一列
+        chunks = iter_indexed_result_blocks(csv_path, columns=columns, chunksize=chunksize)
+        first_frames = []
+        pending = None
+        for block_index, _, df in chunks:
+            if block_index != 0:
+                pending = (block_index, df)
+                break
+            first_frames.append(df)
+        if not sum(len(df) for df in first_frames):
+            raise ValueError(f"第一个工况块没有数据行，无法确定实体集合: {first.case_name}")
+        first_ids = np.concatenate([df["Id"].to_numpy(np.int64) for df in first_frames])
+        order = np.argsort(first_ids, kind="stable")
+        ids = first_ids[order]
+        np.save(os.path.join(out_dir, "ids.npy"), ids)
+        if has_coords:
+            coords = np.concatenate([df[list(COORD_COLUMNS)].to_numpy(np.float32) for df in first_frames])
+            np.save(os.path.join(out_dir, "coords.npy"), coords[order])
+        if has_pids:
+            pids = np.concatenate([df["Pid"].to_numpy(np.int64) for df in first_frames])
+            np.save(os.path.join(out_dir, "pids.npy"), pids[order])
+
+        values = np.lib.format.open_memmap(
+            os.path.join(out_dir, "values.npy"), mode="w+", dtype=np.float32, shape=(len(ids), len(blocks))
+        )
+        values[:] = np.nan
+        first_values = np.concatenate([df[value_column].to_numpy(np.float32) for df in first_frames])
+        values[:, 0] = first_values[order]
+        del first_frames
+
+        def fill(case_idx, df):
+            if case_idx >= len(blocks):
+                raise ValueError(f"CSV工况块数超出扫描结果（{len(blocks)}个），文件可能在写入中")
+            chunk_ids = df["Id"].to_numpy(np.int64)
+            pos = np.clip(np.searchsorted(ids, chunk_ids), 0, len(ids) - 1)
+            valid = ids[pos] == chunk_ids
+            values[pos[valid], case_idx] = df[value_column].to_numpy(np.float32)[valid]
+
+        # 其余工况块按ID对齐写入对应列
+        n_columns = 1
+        if pending is not None:
+            fill(*pending)
+            n_columns = pending[0] + 1
+            for block_index, _, df in chunks:
+                fill(block_index, df)
+                n_columns = block_index + 1
+        if n_columns != len(blocks):
+            raise ValueError(f"流式读取的工况块数（{n_columns}）与扫描结果（{len(blocks)}）不一致: {csv_path}")
+        values.flush()
+        del values
+
+        meta = {
+            "version": STORE_VERSION,
+            "source": file_fingerprint(csv_path),
+            "source_csv": os.path.abspath(csv_path),
+            "cases": [block.case_name for block in blocks],
+            "value_column": value_column,
+            "n_entities": int(len(ids)),
+        }
+        with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
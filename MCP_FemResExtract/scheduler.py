@@ -0,0 +1,250 @@
+import time
+import itertools
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+# 优先级类别（数值越小越优先）：交互查询 > 截图 > 批量导出
+PRIORITY_CLASSES = {"interactive": 0, "screenshot": 1, "bulk": 2}
+# 无历史耗时数据时各类别的预估耗时（秒）
+DEFAULT_ESTIMATES = {"interactive": 30.0, "screenshot": 90.0, "bulk": 600.0}
+# 耗时滑动平均的平滑系数
+EWMA_ALPHA = 0.3
+
+# 当前请求所属用户，由调用方（如Agent会话）设置，用于同一优先级内的用户间公平调度
+current_user: contextvars.ContextVar = contextvars.ContextVar("meta_user", default="default")
+# 从LangGraph运行配置（configurable）中识别用户的键，依次查找：认证用户、调用方传入的用户ID、会话（线程）ID
+USER_CONFIG_KEYS = ("langgraph_auth_user_id", "user_id", "thread_id")
+
+
+def user_from_config(config: Optional[Dict[str, Any]]) -> str:
+    """
+    由LangGraph运行配置确定当前请求所属用户
+    :param config: 工具调用时的RunnableConfig
+    :return: 用户标识，配置中没有用户/会话信息时为"default"
+    """
+    configurable = (config or {}).get("configurable") or {}
+    for key in USER_CONFIG_KEYS:
+        value = configurable.get(key)
+        if value:
+            return str(value)
+    return "default"
+
+
+class MetaJob:
+    """一个排队/运行中的META任务"""
+
+    def __init__(self, seq: int, func: Callable[[], Any], priority: str, label: str, user: str):
+        self.seq = seq
+        self.func = func
+        self.priority = priority
+        self.label = label
+        self.user = user
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.future: Future = Future()
+
+
+class MetaScheduler:
+    """
+    按META许可证数量限制并发的任务调度器
+    - 工作线程数等于许可证数，每个任务占用一个许可证
+    - 按优先级类别出队；可为交互查询预留许可证，批量导出/截图最多占用 seats - reserved_interactive 个
+    - 同一优先级内优先调度运行中任务最少、最久未被服务的用户（轮转公平）
+    - 按任务标签统计耗时滑动平均，用于估算排队等待时间
+    """
+
+    def __init__(self, seats: int = 1, reserved_interactive: int = 0):
+        self.seats = max(1, seats)
+        self.reserved_interactive = min(max(0, reserved_interactive), self.seats - 1)
+        self._cond = threading.Condition()
+        self._queues: Dict[str, List[MetaJob]] = {priority: [] for priority in PRIORITY_CLASSES}
+        self._running: List[MetaJob] = []
+        self._last_served: Dict[str, float] = {}
+        self._estimates: Dict[str, float] = {}
+        self._seq = itertools.count()
+        self._workers: List[threading.Thread] = []
+
+    def _ensure_workers(self) -> None:
+        if self._workers:
+            return
+        for i in range(self.seats):
+            worker = threading.Thread(target=self._worker_loop, name=f"meta-seat-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, func: Callable[[], Any], priority: str = "interactive", label: str = "query",
+               user: Optional[str] = None) -> Future:
+        """
+        提交任务，返回Future
+        :param func: 任务函数（无参数）
+        :param priority: 优先级类别（interactive/screenshot/bulk）
+        :param label: 任务标签（如工具方法名），用于耗时估算和队列展示
+        :param user: 用户标识，默认取current_user
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"不支持的优先级: {priority}，支持：{list(PRIORITY_CLASSES)}")
+        job = MetaJob(next(self._seq), func, priority, label, user or current_user.get())
+        with self._cond:
+            self._ensure_workers()
+            self._queues[priority].append(job)
+            self._cond.notify_all()
+        return job.future
+
+    def run(self, func: Callable[[], Any], priority: str = "interactive", label: str = "query",
+            user: Optional[str] = None) -> Any:
+        """提交任务并阻塞等待结果"""
+        return self.submit(func, priority, label, user).result()
+
+    def _bulk_limit(self) -> int:
+        return self.seats - self.reserved_interactive
+
+    @property
+    def bulk_seats(self) -> int:
+        """截图/批量导出任务可同时占用的许可证数"""
+        return self._bulk_limit()
+
+    def _next_job(self) -> Optional[MetaJob]:
+        """按优先级、许可证预留及用户公平性选出下一个任务（调用方持有锁）"""
+        non_interactive = sum(1 for job in self._running if job.priority != "interactive")
+        running_by_user: Dict[str, int] = {}
+        for job in self._running:
+            running_by_user[job.user] = running_by_user.get(job.user, 0) + 1
+        for priority in sorted(PRIORITY_CLASSES, key=PRIORITY_CLASSES.get):
+            queue = self._queues[priority]
+            if not queue or (priority != "interactive" and non_interactive >= self._bulk_limit()):
+                continue
+            job = min(queue, key=lambda j: (running_by_user.get(j.user, 0), self._last_served.get(j.user, 0.0), j.seq))
+            queue.remove(job)
+            return job
+        return None
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                job.started = time.monotonic()
+                self._running.append(job)
+                self._last_served[job.user] = job.started
+            try:
+                result = job.func()
+            except BaseException as e:
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                duration = time.monotonic() - job.started
+                with self._cond:
+                    self._running.remove(job)
+                    previous = self._estimates.get(job.label)
+                    self._estimates[job.label] = duration if previous is None else (
+                        EWMA_ALPHA * duration + (1 - EWMA_ALPHA) * previous)
+                    self._cond.notify_all()
+
+    def _estimate(self, job: MetaJob) -> float:
+        return self._estimates.get(job.label, DEFAULT_ESTIMATES[job.priority])
+
+    def estimate_wait(self, priority: str = "interactive") -> float:
+        """估算新提交的指定优先级任务开始执行前的等待时间（秒）"""
+        with self._cond:
+            return self._estimate_wait_locked(priority)
+
+    def _estimate_wait_locked(self, priority: str) -> float:
+        now = time.monotonic()
+        rank = PRIORITY_CLASSES[priority]
+        usable = self.seats if priority == "interactive" else self._bulk_limit()
+        # 运行中任务的剩余时间；不可用于该优先级的许可证上的任务不计入
+        running = [job for job in self._running if priority == "interactive" or job.priority != "interactive"]
+        remaining = sorted(max(self._estimate(job) - (now - job.started), 0.0) for job in running)
+        free_seats = usable - len(running)
+        ahead = sum(self._estimate(job) for p, queue in self._queues.items()
+                    if PRIORITY_CLASSES[p] <= rank for job in queue)
+        if free_seats > 0 and ahead == 0:
+            return 0.0
+        # 空闲许可证立即可用，其余需等待运行中任务结束，排在前面的任务按可用许可证均摊
+        first_free = 0.0 if free_seats > 0 else (remaining[0] if remaining else 0.0)
+        return first_free + ahead / max(usable, 1)
+
+    def status(self) -> Dict[str, Any]:
+        """队列状态：许可证、运行中任务、各优先级排队任务及预计等待时间"""
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "seats": self.seats,
+                "reserved_interactive": self.reserved_interactive,
+                "running": [
+                    {"label": job.label, "user": job.user, "priority": job.priority,
+                     "elapsed": round(now - job.started, 1), "estimate": round(self._estimate(job), 1)}
+                    for job in self._running
+                ],
+                "queued": {
+                    priority: [
+                        {"label": job.label, "user": job.user, "waiting": round(now - job.submitted, 1)}
+                        for job in sorted(queue, key=lambda j: j.seq)
+                    ]
+                    for priority, queue in self._queues.items()
+                },
+                "estimated_wait": {priority: round(self._estimate_wait_locked(priority), 1) for priority in PRIORITY_CLASSES},
+            }
+
+    def status_text(self) -> str:
+        """队列状态的文本描述"""
+        status = self.status()
+        lines = [f"META许可证: {status['seats']}个（为交互查询预留{status['reserved_interactive']}个），"
+                 f"运行中{len(status['running'])}个任务"]
+        for job in status["running"]:
+            lines.append(f"  运行中 [{job['priority']}] {job['label']}（用户 {job['user']}，已运行{job['elapsed']}s，"
+                         f"预计{job['estimate']}s）")
+        for priority, queue in status["queued"].items():
+            lines.append(f"排队 [{priority}] {len(queue)}个，新任务预计等待 {status['estimated_wait'][priority]}s")
+            for job in queue:
+                lines.append(f"  {job['label']}（用户 {job['user']}，已等待{job['waiting']}s）")
+        return "\n".join(lines)
+
+
+class SingleFlight:
+    """
+    进行中请求去重：相同键的并发调用只执行一次，后到的调用等待首个调用的结果
+    仅合并执行期间的重复调用，执行结束后的调用会重新执行（不作为结果缓存）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        执行或等待相同键的进行中调用
+        :param key: 去重键（如命令链规范形式的摘要）
+        :param func: 任务函数（无参数）
+        :return: (结果, 是否复用了其他调用的结果)；首个调用抛出的异常会同样抛给等待的调用
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = func()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+        self._finish(key)
+        future.set_result(result)
+        return result, False
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """进行中的调用数"""
+        with self._lock:
+            return len(self._calls)
@@ -1,16 +1,34 @@
 from langchain.tools import StructuredTool
-from .core import MCPToolKit
+from langchain_core.runnables import RunnableConfig
+from .core import MCPToolKit, ResultSubQuery, env
+from .scheduler import current_user, user_from_config
+from .watcher import ResultFileWatcher
+from .fatigue import SNCurve
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, List, Union, Tuple, Any
+from typing import Optional, Dict, List, Union, Tuple, Any, Callable
+import os, threading
 
 # 创建 MCPToolKit 实例
 mcp_toolkit = MCPToolKit()
+# 监视管理目录：新增/重新求解的结果文件写入完成后删除派生文件并后台预热；watchdog不可用时轮询扫描新文件
+result_watcher = ResultFileWatcher(env.manage_root_path, mcp_toolkit.ingest_result_file, env.watch_debounce_sec,
+                                   remove=mcp_toolkit.remove_result_file)
+if not (env.watch_enabled and result_watcher.start()) and mcp_toolkit.prefetcher is not None:
+    mcp_toolkit.prefetcher.start_scanner(env.manage_root_path, env.prefetch_scan_interval)
+# 启动时在后台扫描管理目录，同步结果文件目录（SQLite）
+if os.path.isdir(env.manage_root_path):
+    threading.Thread(target=mcp_toolkit.sync_file_catalog, name="file-catalog-sync", daemon=True).start()
 
 
 # 定义输入参数模型
 class GetAllNodeResultsInput(BaseModel):
     result_file: str = Field(description="结果文件路径（.h3d或.odb）")
     result_category: str = Field(description="结果类型（'Mises', 'Strain', 'PlasticStrain', 'Displacement'）")
+    case_ids: Optional[List[int]] = Field(default=None, description="只导出的工况ID列表（默认全部工况）")
+    pids: Optional[List[int]] = Field(default=None, description="只导出这些属性ID包含的节点（可选）")
+    mids: Optional[List[int]] = Field(default=None, description="只导出这些材料ID包含的节点（可选）")
+    set_ids: Optional[List[int]] = Field(default=None, description="只导出这些集合ID包含的节点（可选）")
+    columns: Optional[List[str]] = Field(default=None, description="输出字段列表（可选'origPosx', 'origPosy', 'origPosz', 'Name', 'Comment'，Id及FunctionTop始终输出，默认输出全部默认字段）")
 
 
 class GetMultiNodeResultsInput(BaseModel):
@@ -24,6 +42,17 @@ class GetMultiNodeResultsInput(BaseModel):
 class GetAllElementResultsInput(BaseModel):
     result_file: str = Field(description="结果文件路径（.h3d或.odb）")
     result_category: str = Field(description="结果类型（ 'Mises', 'Strain', 'PlasticStrain', 'Displacement'）")
+    case_ids: Optional[List[int]] = Field(default=None, description="只导出的工况ID列表（默认全部工况）")
+    pids: Optional[List[int]] = Field(default=None, description="只导出这些属性ID包含的单元（可选）")
+    mids: Optional[List[int]] = Field(default=None, description="只导出这些材料ID包含的单元（可选）")
+    set_ids: Optional[List[int]] = Field(default=None, description="只导出这些集合ID包含的单元（可选）")
+    columns: Optional[List[str]] = Field(default=None, description="输出字段列表（可选'Name', 'Comment', 'Cog', 'Nodes'，Id及FunctionTop始终输出，默认输出全部默认字段）")
+
+
+class GetAllResultsWideInput(BaseModel):
+    result_file: str = Field(description="结果文件路径（.h3d或.odb）")
+    result_categories: List[str] = Field(description="结果类型列表（'Displacement', 'Mises', 'Strain', 'PlasticStrain'，.h3d仅支持'Displacement', 'Mises'）")
+    node_or_element_result: str = Field(default="node", description="导出节点结果还是单元结果（'node'或'element'，默认'node'）")
 
 
 class GetMultiElementResultsInput(BaseModel):
@@ -79,6 +108,13 @@ class GetMaxResultForEntitiesInput(BaseModel):
     query: str = Field(description="从日志文件中提取相关信息的查询需求,必须填写")
 
 
+class RunResultBatchInput(BaseModel):
+    """批量结果查询的输入参数"""
+    result_file: str = Field(description="结果文件路径（.h3d或.odb）")
+    result_category: str = Field(description="结果类型（'Displacement', 'Mises', 'Strain', 'PlasticStrain'）")
+    sub_queries: List[ResultSubQuery] = Field(description="子查询列表，在同一次META会话中按顺序执行")
+
+
 class CaptureScreenshotsInput(BaseModel):
     """截取云图的输入参数"""
     result_file: str = Field(description="结果文件路径（.h3d或.odb）")
@@ -104,22 +140,108 @@ class CaptureScreenshotsInput(BaseModel):
         default=None, 
         description="查询需求描述，用于从日志中提取与截图相关的辅助信息（非必需，可省略）"
     )
+    layout: str = Field(
+        default="vertical",
+        description="多视图拼接布局（'vertical'纵向、'horizontal'横向、'grid'网格，默认'vertical'）"
+    )
+    views: Optional[List[str]] = Field(
+        default=None,
+        description="需要截取的视图角度列表（'isometric', 'top', 'front', 'left', 'btm', 'back', 'right'），默认全部7个视图，预览模式默认仅'isometric'"
+    )
+    resolutions: Optional[Dict[str, List[int]]] = Field(
+        default=None,
+        description="字典，键为视图角度（或'default'表示所有视图），值为[宽, 高]像素，默认使用窗口原始分辨率"
+    )
+    mode: str = Field(
+        default="full",
+        description="截图模式（'full'全分辨率，'preview'低分辨率快速预览，默认'full'）"
+    )
+
+
+class GetCaseCatalogInput(BaseModel):
+    """获取工况目录的输入参数"""
+    result_file: str = Field(description="结果文件路径（.h3d或.odb）")
+    refresh: bool = Field(default=False, description="是否忽略缓存重新生成（默认False）")
+
+
+class GetMetaQueueStatusInput(BaseModel):
+    """查询META任务队列状态的输入参数（无参数）"""
+
+
+class SearchResultFilesInput(BaseModel):
+    keywords: Optional[List[str]] = Field(default=None, description="路径关键词列表，均需包含（不区分大小写），如['torsion']")
+    project: Optional[str] = Field(default=None, description="项目（管理目录下的第一级目录名）")
+    vehicle: Optional[str] = Field(default=None, description="车型或车型前缀（如'X'匹配X01、X02等X系列）")
+    solver: Optional[str] = Field(default=None, description="求解器类型（'Hypermesh'对应.h3d，'Abaqus'对应.odb）")
+    status: Optional[str] = Field(default=None, description="入库状态（'discovered', 'queued', 'ready', 'error', 'deleted'）")
+    created_after: Optional[str] = Field(default=None, description="创建日期下限（YYYY-MM-DD，含当天）")
+    created_before: Optional[str] = Field(default=None, description="创建日期上限（YYYY-MM-DD，不含当天）")
+    last_days: Optional[float] = Field(default=None, description="只返回最近N天创建的文件（如上周可填7）")
+    limit: int = Field(default=50, description="返回条数上限（默认50）")
+    refresh: bool = Field(default=False, description="是否先扫描管理目录同步目录（默认False，目录由文件监视自动更新）")
+
+
+class GetPartSummaryInput(BaseModel):
+    result_file: str = Field(description="结果文件路径（.h3d或.odb）")
+    result_category: str = Field(default="Mises", description="结果类型（'Mises', 'Strain', 'PlasticStrain', 'Displacement'）")
+    pids: Optional[List[int]] = Field(default=None, description="只返回这些属性ID的摘要（可选）")
+    top_n: int = Field(default=20, description="未指定pids时返回最大值最高的部件数量（默认20）")
+
+
+class ComputeFatigueDamageInput(BaseModel):
+    """疲劳损伤计算的输入参数"""
+    result_file: str = Field(description="结果文件路径（.h3d或.odb）")
+    sn_curves: Dict[str, SNCurve] = Field(description="字典，键为材料名称，值为S-N曲线参数（sf疲劳强度系数, b疲劳强度指数, su抗拉强度, endurance_limit疲劳极限）")
+    cycles_per_case: Dict[int, float] = Field(description="字典，键为case_id（与get_case_catalog返回的case_id一致），值为该工况循环次数")
+    result_category: str = Field(default="Mises", description="结果类型（默认'Mises'）")
+    node_or_element_result: str = Field(default="element", description="使用节点结果还是单元结果（'node'或'element'，默认'element'）")
+    pid_materials: Optional[Dict[str, List[int]]] = Field(default=None, description="字典，键为材料名称，值为属于该材料的属性ID列表（可选）")
+    default_material: Optional[str] = Field(default=None, description="未在pid_materials中出现的实体使用的材料名称（未提供pid_materials时必填，否则默认不计算）")
+    r_ratio: float = Field(default=0.0, description="应力比R（默认0，脉动循环）")
+    top_n: int = Field(default=20, description="返回损伤最大的实体数量")
+
+
+class ComputeRainflowDamageInput(BaseModel):
+    """雨流计数损伤计算的输入参数"""
+    result_file: str = Field(description="结果文件路径（.h3d或.odb，通常为多STEP/TIME帧的.odb）")
+    sn_curves: Dict[str, SNCurve] = Field(description="字典，键为材料名称，值为S-N曲线参数（sf疲劳强度系数, b疲劳强度指数, su抗拉强度, endurance_limit疲劳极限）")
+    result_category: str = Field(default="Mises", description="结果类型（默认'Mises'）")
+    node_or_element_result: str = Field(default="node", description="使用节点结果还是单元结果（'node'或'element'，默认'node'）")
+    pid_materials: Optional[Dict[str, List[int]]] = Field(default=None, description="字典，键为材料名称，值为属于该材料的属性ID列表（可选）")
+    default_material: Optional[str] = Field(default=None, description="未在pid_materials中出现的实体使用的材料名称（未提供pid_materials时必填，否则默认不计算）")
+    repeats: float = Field(default=1.0, description="载荷历程重复次数（默认1）")
+    top_n: int = Field(default=20, description="返回损伤最大的实体数量")
+
+
+def _with_current_user(func: Callable[..., Any]) -> Callable[..., Any]:
+    """包装工具函数：调用期间按LangGraph运行配置设置current_user，使META任务按用户公平调度"""
+    def wrapper(config: RunnableConfig, **kwargs):
+        token = current_user.set(user_from_config(config))
+        try:
+            return func(**kwargs)
+        finally:
+            current_user.reset(token)
+    return wrapper
 
 
 def get_mcp_tools() -> list:
     """获取所有MCP工具列表，用于LangChain工具调用"""
-    return [
+    tools = [
         # 获取所有节点结果并生成CSV
         StructuredTool.from_function(
-            func=lambda result_file, result_category: 
+            func=lambda result_file, result_category, **selection: 
                 (lambda path, desc: f"CSV文件路径: {path}\n字段描述: {desc}")
-                (*mcp_toolkit.get_all_node_results(result_file, result_category)),
+                (*mcp_toolkit.get_all_node_results(result_file, result_category, **selection)),
             name="get_all_node_results",
             description=(
                 "获取所有工况下所有节点结果并输出到CSV文件(输出Mises/Strain/PlasticStrain类型的结果时会自动输出节点位移结果)\n"
                 "参数:\n"
                 "- result_file: 结果文件路径（.h3d或.odb）\n"
                 "- result_category: 结果类型（'Displacement', 'Mises', 'Strain', 'PlasticStrain'）\n"
+                "- case_ids: 只导出的工况ID列表（可选，默认全部工况）\n"
+                "- pids / mids / set_ids: 只导出指定属性/材料/集合ID包含的节点（可选）\n"
+                "- columns: 输出字段列表（可选，列投影，Id及FunctionTop始终输出）\n"
+                "只关心部分工况或部件时务必传入筛选参数，导出耗时与文件大小随筛选范围缩小\n"
                 "返回:\n"
                 "CSV文件路径和字段描述的格式化字符串"
             ),
@@ -148,21 +270,44 @@ def get_mcp_tools() -> list:
         
         # 获取所有单元结果并生成CSV
         StructuredTool.from_function(
-            func=lambda result_file, result_category: 
+            func=lambda result_file, result_category, **selection: 
                 (lambda path, desc: f"CSV文件路径: {path}\n字段描述: {desc}")
-                (*mcp_toolkit.get_all_element_results(result_file, result_category)),
+                (*mcp_toolkit.get_all_element_results(result_file, result_category, **selection)),
             name="get_all_element_results",
             description=(
                 "获取所有工况下所有单元结果并输出到CSV文件\n"
                 "参数:\n"
                 "- result_file: 结果文件路径（.h3d或.odb）\n"
                 "- result_category: 结果类型（'Displacement', 'Mises', 'Strain', 'PlasticStrain'）\n"
+                "- case_ids: 只导出的工况ID列表（可选，默认全部工况）\n"
+                "- pids / mids / set_ids: 只导出指定属性/材料/集合ID包含的单元（可选）\n"
+                "- columns: 输出字段列表（可选，列投影，Id及FunctionTop始终输出）\n"
+                "只关心部分工况或部件时务必传入筛选参数，导出耗时与文件大小随筛选范围缩小\n"
                 "返回:\n"
                 "CSV文件路径和字段描述的格式化字符串"
             ),
             args_schema=GetAllElementResultsInput
         ),
         
+        # 一次加载导出多个结果类型的宽表CSV
+        StructuredTool.from_function(
+            func=lambda result_file, result_categories, node_or_element_result="node":
+                (lambda path, desc: f"CSV文件路径: {path}\n字段描述: {desc}")
+                (*mcp_toolkit.get_all_results_wide(result_file, result_categories, node_or_element_result)),
+            name="get_all_results_wide",
+            description=(
+                "在一次META会话中导出多个结果类型（如位移+应力+塑性应变）所有工况下所有节点或单元的结果，合并为一个宽表CSV（每个结果类型一列）\n"
+                "同时需要多个结果类型时使用，比分别调用get_all_node_results/get_all_element_results少加载模型、少写文件\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- result_categories: 结果类型列表（'Displacement', 'Mises', 'Strain', 'PlasticStrain'，.h3d仅支持'Displacement', 'Mises'）\n"
+                "- node_or_element_result: 'node'或'element'（默认'node'）\n"
+                "返回:\n"
+                "CSV文件路径和字段描述的格式化字符串"
+            ),
+            args_schema=GetAllResultsWideInput
+        ),
+        
         # 获取单个或者多个单元结果
         StructuredTool.from_function(
             func=mcp_toolkit.get_multi_element_results,
@@ -288,6 +433,29 @@ def get_mcp_tools() -> list:
             args_schema=GetMaxResultForEntitiesInput
         ),
         
+        # 批量结果查询（一次META会话）
+        StructuredTool.from_function(
+            func=mcp_toolkit.run_result_batch,
+            name="run_result_batch",
+            description=(
+                "在一次META会话中执行同一结果文件的多个子查询，模型及结果只加载一次，比分别调用各查询工具快得多\n"
+                "需要同时查询节点/单元/属性/材料/集合结果、实体最大结果及模型信息时优先使用\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- result_category: 结果类型（'Displacement', 'Mises', 'Strain', 'PlasticStrain'）\n"
+                "- sub_queries: 子查询列表，每个子查询包含：\n"
+                "  type: 'node'/'element'/'part'/'material'/'set'（同get_multi_*_results），'max'（同get_max_result_for_entities），'model_info'（同get_model_info）\n"
+                "  ids_per_case / names_per_case: 字典，键为工况ID，值为实体ID/名称列表（max、model_info都为空时查询全部）\n"
+                "  entity_type: max子查询的实体类型（'material', 'property', 'ansapart'）\n"
+                "  node_or_element_result: max子查询使用节点还是单元结果（默认'node'）\n"
+                "  info_type: model_info子查询的信息类型（'loads', 'spc', 'ansapart', 'property', 'material', 'set'）\n"
+                "  query: 从该子查询日志中提取相关信息的查询需求（可选）\n"
+                "返回:\n"
+                "JSON列表，按子查询顺序给出type、status（ok/error）及result（日志或提取的信息）"
+            ),
+            args_schema=RunResultBatchInput
+        ),
+        
         # 截取云图
         StructuredTool.from_function(
                 func=mcp_toolkit.capture_screenshots,
@@ -304,12 +472,132 @@ def get_mcp_tools() -> list:
                     "- result_category：必须从['Displacement', 'Mises', 'Strain', 'PlasticStrain']中选择；\n"
                     "- entity_type：必须从['material', 'property', 'ansapart', 'set']中选择，需与实体指定方式匹配；\n"
                     "- node_or_element_result：默认'node'（节点结果），可指定为'element'（单元结果）；\n"
+                    "- layout：多视图拼接布局，默认'vertical'，视图较多时可指定'grid'网格布局；\n"
+                    "- views：只需要部分视图时指定，如['isometric', 'top']，可显著减少截图耗时；\n"
+                    "- mode：快速回答时使用'preview'（低分辨率等轴测视图），用户需要高清图时再以'full'模式按需截取；\n"
                     "\n返回结果：\n"
-                    "HTML格式的截图集合，包含每个工况的7个角度视图（等轴测、正/背/左/右/顶/底视图），可直接在页面渲染查看。"
+                    "HTML格式的截图集合，默认包含每个工况的7个角度视图（等轴测、正/背/左/右/顶/底视图），可直接在页面渲染查看。"
                 ),
                 args_schema=CaptureScreenshotsInput
             ),
+        
+        # 获取工况目录
+        StructuredTool.from_function(
+            func=mcp_toolkit.get_case_catalog,
+            name="get_case_catalog",
+            description=(
+                "获取结果文件的工况目录：分析步编号/名称、时间点、工况标签及有效case_id（结果按结果文件缓存）\n"
+                "ODB中与上一分析步末时刻等效的起始帧已自动去除，返回的case_id可直接用于其他工具的工况参数\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- refresh: 是否忽略缓存重新生成（默认False）\n"
+                "返回:\n"
+                "有效工况列表及完整工况目录JSON"
+            ),
+            args_schema=GetCaseCatalogInput
+        ),
+        
+        # 查询META任务队列状态
+        StructuredTool.from_function(
+            func=mcp_toolkit.get_meta_queue_status,
+            name="get_meta_queue_status",
+            description=(
+                "查询META任务队列状态：许可证数量、运行中的任务、各优先级（interactive交互查询/screenshot截图/bulk批量导出）排队任务数及新任务预计等待时间\n"
+                "结果导出或截图耗时较长、需要向用户说明排队情况时调用\n"
+                "返回:\n"
+                "队列状态描述"
+            ),
+            args_schema=GetMetaQueueStatusInput
+        ),
+        
+        # 结果文件检索
+        StructuredTool.from_function(
+            func=mcp_toolkit.search_result_files,
+            name="search_result_files",
+            description=(
+                "在结果文件目录（SQLite，覆盖管理目录下全部.h3d/.odb）中按关键词、项目、车型、求解器、创建时间及入库状态检索结果文件，毫秒级返回\n"
+                "用户未给出完整路径（如'上周X系列的扭转工况'）时先调用本工具定位结果文件，无需逐级浏览目录\n"
+                "参数:\n"
+                "- keywords: 路径关键词列表（可选，如['torsion']）\n"
+                "- project: 项目（可选）\n"
+                "- vehicle: 车型或车型前缀（可选，如'X'）\n"
+                "- solver: 'Hypermesh'或'Abaqus'（可选）\n"
+                "- status: 入库状态（可选）\n"
+                "- created_after/created_before: 创建日期范围（YYYY-MM-DD，可选）\n"
+                "- last_days: 最近N天（可选）\n"
+                "- limit: 返回条数上限（默认50）\n"
+                "- refresh: 是否先重新扫描管理目录（默认False）\n"
+                "返回:\n"
+                "结果文件路径、求解器、大小、创建时间、项目、车型、工况数、模型规模及入库状态"
+            ),
+            args_schema=SearchResultFilesInput
+        ),
+        
+        # 部件结果摘要
+        StructuredTool.from_function(
+            func=mcp_toolkit.get_part_summary,
+            name="get_part_summary",
+            description=(
+                "获取按属性ID（部件）汇总的单元结果摘要：各部件单元数、全工况最大值及其所在工况和单元，以及模型节点/单元数量\n"
+                "结果文件首次被引用时会在后台预热生成该摘要，命中时无需启动META，适合回答'哪个部件应力最大'等问题\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- result_category: 结果类型（默认'Mises'）\n"
+                "- pids: 只返回这些属性ID的摘要（可选）\n"
+                "- top_n: 未指定pids时返回最大值最高的部件数量（默认20）\n"
+                "返回:\n"
+                "部件结果摘要；尚未生成时返回预热状态或生成方法"
+            ),
+            args_schema=GetPartSummaryInput
+        ),
+        
+        # 疲劳损伤计算
+        StructuredTool.from_function(
+            func=mcp_toolkit.compute_fatigue_damage,
+            name="compute_fatigue_damage",
+            description=(
+                "基于各工况应力结果计算Miner线性累积疲劳损伤（Basquin S-N曲线 + Goodman平均应力修正），输出全模型损伤分布\n"
+                "使用前需先调用get_all_node_results/get_all_element_results生成结果（会同时生成二进制结果库）\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- sn_curves: 字典，键为材料名称，值为{'sf': 疲劳强度系数, 'b': 疲劳强度指数, 'su': 抗拉强度, 'endurance_limit': 疲劳极限}\n"
+                "- cycles_per_case: 字典，键为case_id（同get_case_catalog），值为该工况循环次数\n"
+                "- result_category: 结果类型（默认'Mises'）\n"
+                "- node_or_element_result: 'node'或'element'（默认'element'）\n"
+                "- pid_materials: 字典，键为材料名称，值为属性ID列表（可选）\n"
+                "- default_material: 未指定属性使用的材料（未提供pid_materials时必填）\n"
+                "- r_ratio: 应力比R（默认0）\n"
+                "返回:\n"
+                "最大损伤、损伤大于1的实体数、损伤最大的实体列表及损伤数组路径"
+            ),
+            args_schema=ComputeFatigueDamageInput
+        ),
+        
+        # 雨流计数疲劳损伤计算
+        StructuredTool.from_function(
+            func=mcp_toolkit.compute_rainflow_damage,
+            name="compute_rainflow_damage",
+            description=(
+                "对多时间步结果（如ODB中各STEP/TIME帧）逐节点/单元进行雨流计数（ASTM E1049四点法，含残余半循环），并累计Miner疲劳损伤\n"
+                "各工况按时间顺序构成载荷时间历程，使用前需先调用get_all_node_results/get_all_element_results生成结果\n"
+                "参数:\n"
+                "- result_file: 结果文件路径（.h3d或.odb）\n"
+                "- sn_curves: 字典，键为材料名称，值为{'sf': 疲劳强度系数, 'b': 疲劳强度指数, 'su': 抗拉强度, 'endurance_limit': 疲劳极限}\n"
+                "- result_category: 结果类型（默认'Mises'）\n"
+                "- node_or_element_result: 'node'或'element'（默认'node'）\n"
+                "- pid_materials: 字典，键为材料名称，值为属性ID列表（可选）\n"
+                "- default_material: 未指定属性使用的材料（未提供pid_materials时必填）\n"
+                "- repeats: 载荷历程重复次数（默认1）\n"
+                "返回:\n"
+                "最大损伤、损伤大于1的实体数、损伤最大的实体列表及损伤数组路径"
+            ),
+            args_schema=ComputeRainflowDamageInput
+        ),
     ]
+    # 工具调用时由StructuredTool传入RunnableConfig（按config参数的类型注解识别）
+    for tool in tools:
+        tool.func = _with_current_user(tool.func)
+    return tools
 
 
 if __name__ == "__main__":
@@ -0,0 +1,252 @@
+import os
+import glob
+import time
+import shutil
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from Metrics import metrics
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog未安装时不可用，由调用方回退为轮询扫描
+    Observer = None
+    FileSystemEventHandler = object
+
+# 结果文件及其几何文件（几何文件变化时对应的结果文件视为重新求解）
+RESULT_EXTENSIONS = (".h3d", ".odb")
+GEOMETRY_RESULTS = {".fem": ".h3d", ".inp": ".odb"}
+# 由结果文件派生的文件（<文件名>后缀的glob模式）：全量/筛选导出CSV、宽表、Parquet、结果库、工况目录、实体索引、部件摘要
+DERIVED_PATTERNS = (
+    "_all_node_*_results.csv",
+    "_all_element_*_results.csv",
+    "_subset_node_*_results.csv",
+    "_subset_element_*_results.csv",
+    "_all_node_*_wide.csv",
+    "_all_element_*_wide.csv",
+    "_all_node_*_results.parquet",
+    "_all_element_*_results.parquet",
+    "_result_store",
+    "_case_catalog.json",
+    "_entity_index.json",
+    "_part_summary_*.json",
+)
+# 求解器运行标志：作业锁文件存在，或状态/消息文件在静默时间内仍有更新时视为仍在求解（结果文件可能未写完）
+SOLVER_LOCK_EXTENSIONS = (".lck",)
+SOLVER_ACTIVITY_EXTENSIONS = (".sta", ".msg")
+
+
+def result_files_for(path: str) -> List[str]:
+    """变化的文件对应的结果文件：结果文件本身，或几何文件同名的.h3d/.odb"""
+    base, ext = os.path.splitext(path)
+    ext = ext.lower()
+    if ext in RESULT_EXTENSIONS:
+        return [path]
+    if ext in GEOMETRY_RESULTS:
+        return [base + GEOMETRY_RESULTS[ext]]
+    return []
+
+
+def solver_running(path: str, quiet: float) -> bool:
+    """
+    结果文件/几何文件对应的求解作业是否仍在运行：存在<作业名>.lck，或<作业名>.sta/.msg在quiet秒内有修改
+    :param path: 结果文件或几何文件路径
+    :param quiet: 状态/消息文件的静默时间（秒）
+    :return: 是否仍在求解
+    """
+    base = os.path.splitext(path)[0]
+    if any(os.path.exists(base + ext) for ext in SOLVER_LOCK_EXTENSIONS):
+        return True
+    now = time.time()
+    for ext in SOLVER_ACTIVITY_EXTENSIONS:
+        try:
+            if now - os.path.getmtime(base + ext) < quiet:
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def derived_paths(result_file: str) -> List[str]:
+    """结果文件的全部派生文件/目录（含导出/构建过程中的临时文件）"""
+    base = glob.escape(os.path.splitext(result_file)[0])
+    paths: List[str] = []
+    for pattern in DERIVED_PATTERNS:
+        paths.extend(glob.glob(base + pattern))
+        paths.extend(glob.glob(base + pattern + ".*"))
+    return sorted(set(paths))
+
+
+def invalidate_derived(result_file: str) -> List[str]:
+    """
+    删除结果文件的全部派生文件，避免重新求解后读到旧结果
+    :param result_file: 结果文件路径
+    :return: 已删除的路径列表
+    """
+    removed = []
+    for path in derived_paths(result_file):
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            metrics.inc("watch_invalidate_errors_total")
+            continue
+        removed.append(path)
+    return removed
+
+
+class _EventHandler(FileSystemEventHandler):
+    """将文件系统事件转交给ResultFileWatcher"""
+
+    def __init__(self, watcher: "ResultFileWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, deleted=True)
+            self.watcher.notify(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.notify(event.src_path, deleted=True)
+
+
+class ResultFileWatcher:
+    """
+    监视管理目录下的结果文件（.h3d/.odb）及几何文件（.fem/.inp）：
+    - 新建/修改事件按文件去抖：大小和修改时间在debounce秒内不再变化，且求解作业已结束（无.lck，.sta/.msg在debounce秒内无更新）才视为写入完成
+    - 写入完成后删除对应结果文件的全部派生文件（CSV、结果库、工况目录、摘要等），再提交入库处理（如后台预热）
+    - 文件被删除或移走时立即删除派生文件，并调用删除处理函数
+    """
+
+    def __init__(self, root: str, ingest: Callable[[str], None], debounce: float = 30.0,
+                 remove: Optional[Callable[[str], None]] = None):
+        """
+        :param root: 监视的管理目录（递归）
+        :param ingest: 入库处理函数 (结果文件路径) -> None，派生文件删除后调用
+        :param debounce: 去抖时间（秒）
+        :param remove: 结果文件被删除/移走后的处理函数 (结果文件路径) -> None（可选）
+        """
+        self.root = root
+        self.ingest = ingest
+        self.remove = remove
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        # 路径 -> (最近一次事件时间, 上次检查时的(大小, 修改时间))
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, float]]]] = {}
+        self._observer = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def available() -> bool:
+        """watchdog是否可用"""
+        return Observer is not None
+
+    def notify(self, path: str, deleted: bool = False) -> None:
+        """登记文件事件（由watchdog事件回调或调用方调用）"""
+        ext = os.path.splitext(path)[1].lower()
+        if ext not in RESULT_EXTENSIONS and ext not in GEOMETRY_RESULTS:
+            return
+        if deleted:
+            with self._lock:
+                self._pending.pop(path, None)
+            if ext in RESULT_EXTENSIONS:
+                self._invalidate(path, reason="deleted")
+                if self.remove is not None:
+                    self.remove(path)
+            return
+        with self._lock:
+            _, last_stat = self._pending.get(path, (0.0, None))
+            self._pending[path] = (time.monotonic(), last_stat)
+
+    def poll(self) -> List[str]:
+        """
+        检查去抖中的文件，写入完成的文件删除派生文件并提交入库
+        :return: 本次提交入库的结果文件列表
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (last_event, last_stat) in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # 临时文件被改名或删除，等待后续事件
+                    self._pending.pop(path)
+                    continue
+                current = (stat.st_size, stat.st_mtime)
+                if current != last_stat:
+                    # 文件仍在写入：重新计时
+                    self._pending[path] = (now, current)
+                elif now - last_event >= self.debounce:
+                    if solver_running(path, self.debounce):
+                        # 求解器仍在运行（结果文件可能分阶段写入）：继续等待
+                        self._pending[path] = (now, current)
+                        continue
+                    self._pending.pop(path)
+                    ready.append(path)
+        ingested = []
+        for path in ready:
+            for result_file in result_files_for(path):
+                if not os.path.exists(result_file):
+                    continue
+                self._invalidate(result_file, reason="changed")
+                try:
+                    self.ingest(result_file)
+                except Exception:
+                    metrics.inc("watch_ingest_errors_total")
+                    continue
+                ingested.append(result_file)
+        return ingested
+
+    def _invalidate(self, result_file: str, reason: str) -> None:
+        removed = invalidate_derived(result_file)
+        metrics.inc("watch_invalidations_total", reason=reason)
+        metrics.emit({"type": "watch_invalidate", "result_file": result_file, "reason": reason, "removed": len(removed)})
+
+    def pending(self) -> int:
+        """去抖中的文件数"""
+        with self._lock:
+            return len(self._pending)
+
+    def start(self) -> bool:
+        """启动watchdog监视及去抖检查线程，watchdog不可用或目录不存在时返回False"""
+        if not self.available() or not os.path.isdir(self.root) or self._observer is not None:
+            return False
+        self._observer = Observer()
+        self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+        def loop() -> None:
+            while not self._stopped.wait(min(max(self.debounce / 4, 0.5), 5.0)):
+                try:
+                    self.poll()
+                except Exception:
+                    metrics.inc("watch_poll_errors_total")
+
+        self._thread = threading.Thread(target=loop, name="result-watcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """停止watchdog监视及去抖检查线程"""
+        self._stopped.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
@@ -9,6 +9,9 @@ import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from matplotlib.font_manager import FontProperties
 import EnvConfig
+import FigSandbox
+import FigDownsample
+from Metrics import metrics
 
 # 初始化环境配置
 env = EnvConfig.EnvConfig()
@@ -25,7 +28,7 @@ class FigGenerator:
         "green": (0/255, 175/255, 80/255)
     }
     
-    def __init__(self, base_dir=None, ui_dir=env.images_path, font_path=env.font_path):
+    def __init__(self, base_dir=None, ui_dir=env.images_path, font_path=env.font_path, sandbox=env.fig_sandbox):
         """
         初始化绘图工具
         
@@ -33,10 +36,19 @@ class FigGenerator:
             base_dir: 图像保存的基础目录
             ui_dir: UI端图像保存目录
             font_path: 中文字体文件路径
+            sandbox: 是否在受限子进程中执行绘图代码（CPU/内存/时间限制）
         """
         self.base_dir = os.path.dirname(__file__)
         self.ui_dir = ui_dir
         self.font_path = font_path 
+        self.sandbox = sandbox
+        # 大数据量折线/散点的降采样参数
+        self.reduce_options = {
+            "max_line_points": env.fig_max_line_points,
+            "max_scatter_points": env.fig_max_scatter_points,
+            "line_method": env.fig_line_method,
+            "scatter_method": env.fig_scatter_method,
+        }
         self.executor = ThreadPoolExecutor(max_workers=4)  # 线程池用于异步执行
         
         # 确保目录存在
@@ -53,31 +65,7 @@ class FigGenerator:
         """应用中文到图表所有元素，包括刻度值"""
         if ax is None:
             ax = plt.gca()
-        
-        # 设置标题、标签等使用中文字体
-        title = ax.get_title()
-        if title:
-            ax.set_title(title, fontproperties=self.chinese_font)
-        
-        xlabel = ax.get_xlabel()
-        if xlabel:
-            ax.set_xlabel(xlabel, fontproperties=self.chinese_font)
-        
-        ylabel = ax.get_ylabel()
-        if ylabel:
-            ax.set_ylabel(ylabel, fontproperties=self.chinese_font)
-        
-        # 设置坐标轴刻度文字
-        for label in ax.get_xticklabels():
-            label.set_fontproperties(self.chinese_font)
-        for label in ax.get_yticklabels():
-            label.set_fontproperties(self.chinese_font)
-        
-        # 设置图例使用中文
-        legend = ax.get_legend()
-        if legend:
-            for text in legend.get_texts():
-                text.set_fontproperties(self.chinese_font)  
+        FigSandbox.apply_chinese_font(ax, self.chinese_font)
     
     def add_data_labels(self, ax, bars=None):
         """在图表上添加数据标签"""
@@ -115,8 +103,48 @@ class FigGenerator:
             fname
         )
     
+    def _build_image_paths(self, fname):
+        """生成图像文件名及UI目录、本地目录两个保存路径"""
+        time_stamp = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+        image_filename = f"{fname}_{time_stamp}.png"
+        return image_filename, [os.path.join(self.ui_dir, image_filename), os.path.join(self.images_dir, image_filename)]
+
     def _sync_execute_code(self, py_code, fname="fig"):
-        """同步执行绘图代码的内部方法，供线程池调用"""
+        """同步执行绘图代码的内部方法，供线程池调用（记录耗时及成功/失败状态）"""
+        with metrics.span("fig_execute", sandbox=self.sandbox) as span:
+            if self.sandbox:
+                result = self._sandbox_execute_code(py_code, fname)
+            else:
+                result = self._inprocess_execute_code(py_code, fname)
+            if isinstance(result, tuple):
+                span["reductions"] = len(result[2])
+            else:
+                span["status"] = "error"
+                span["error_type"] = result.get("error_type") if isinstance(result, dict) else "exec_error"
+        return result
+
+    def _sandbox_execute_code(self, py_code, fname="fig"):
+        """在受限子进程中执行绘图代码，失败时返回结构化错误字典"""
+        image_filename, save_paths = self._build_image_paths(fname)
+        result = FigSandbox.run_sandboxed(
+            py_code,
+            fname,
+            font_path=self.font_path,
+            colors=self.COLORS,
+            save_paths=save_paths,
+            cpu_seconds=env.fig_cpu_seconds,
+            memory_mb=env.fig_memory_mb,
+            timeout=env.fig_timeout,
+            reduce_options=self.reduce_options,
+        )
+        metrics.inc("subprocess_exit_total", component="fig_sandbox", code=result.get("exit_code"))
+        if result.get("status") != "success":
+            return result
+        rel_path = os.path.join("images", image_filename)
+        return (f"<img src='{rel_path}'>", f"图片绝对路径：{save_paths[1]}", result.get("reductions", []))
+
+    def _inprocess_execute_code(self, py_code, fname="fig"):
+        """在当前进程内直接执行绘图代码（未启用沙箱时使用）"""
         # 保存当前后端设置
         current_backend = matplotlib.get_backend()
         matplotlib.use('Agg')
@@ -145,16 +173,16 @@ class FigGenerator:
                     self.apply_chinese_font(ax)
                     # self.add_data_labels(ax)
             
-            # 生成文件名并保存
-            time_stamp = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-            image_filename = f"{fname}_{time_stamp}.png"
-            rel_path = os.path.join("images", image_filename)
+            # 渲染前对大数据量折线/散点降采样
+            reductions = FigDownsample.reduce_figure(fig, **self.reduce_options)
             
-            # 保存到两个目录
-            fig.savefig(os.path.join(self.ui_dir, image_filename), bbox_inches='tight')
-            fig.savefig(os.path.join(self.images_dir, image_filename), bbox_inches='tight')
+            # 生成文件名并保存到两个目录
+            image_filename, save_paths = self._build_image_paths(fname)
+            rel_path = os.path.join("images", image_filename)
+            for path in save_paths:
+                fig.savefig(path, bbox_inches='tight')
             
-            return (f"<img src='{rel_path}'>", f"图片绝对路径：{os.path.join(self.images_dir, image_filename)}")
+            return (f"<img src='{rel_path}'>", f"图片绝对路径：{save_paths[1]}", reductions)
             
         except Exception as e:
             return f"❌ 执行失败：{str(e)}"
@@ -186,11 +214,18 @@ async def fig_inter(py_code: str, fname: str = "fig") -> str:
         # 统一返回格式为字符串（MCP工具要求返回字符串）
         if isinstance(result, tuple):
             # 将元组转换为JSON字符串
-            return json.dumps({
+            response = {
                 "status": "success",
                 "html_tag": result[0],
                 "absolute_path": result[1]
-            }, ensure_ascii=False)
+            }
+            # 附带大数据量降采样说明，便于向用户说明图中数据已被缩减
+            if len(result) > 2 and result[2]:
+                response["data_reduction"] = result[2]
+            return json.dumps(response, ensure_ascii=False)
+        elif isinstance(result, dict):
+            # 沙箱返回的结构化错误（timeout/cpu_limit/memory_limit/killed/exec_error等）
+            return json.dumps(result, ensure_ascii=False)
         else:
             # 错误信息直接返回
             return json.dumps({
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+import EnvConfig
+
+env = EnvConfig.EnvConfig()
+
+# 耗时直方图分桶上限（秒），覆盖SQL毫秒级到META分钟级
+LATENCY_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """
+    进程内指标登记：计数器（字节数、token数、退出码、缓存命中等）与耗时直方图（各阶段span）
+    指标可渲染为Prometheus文本格式；配置了JSONL文件时每个span/事件追加一行，多进程（如绘图MCP服务）可写同一文件
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, prefix: str = "duraai"):
+        self.jsonl_path = jsonl_path
+        self.prefix = prefix
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        # 直方图值为[各分桶计数..., 总和, 次数]
+        self._histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        """计数器累加"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """记录一次直方图观测值"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.setdefault(key, [0.0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    hist[i] += 1
+            hist[-2] += value
+            hist[-1] += 1
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """
+        记录代码块耗时到<name>_seconds直方图，并向JSONL输出span事件
+        块内可向返回的字典写入附加信息（如字节数、退出码），写入status可覆盖默认的ok/error状态
+        :param name: span名称
+        :param labels: 低基数标签（如工具名、是否命中缓存）
+        """
+        record: Dict[str, Any] = {}
+        status = "ok"
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            status = str(record.pop("status", status))
+            self.observe(f"{name}_seconds", duration, status=status, **labels)
+            self.emit({"type": "span", "name": name, "duration": round(duration, 6), "status": status,
+                       "labels": labels, **record})
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """向JSONL文件追加一条事件（未配置时忽略，写入失败不影响业务）"""
+        if not self.jsonl_path:
+            return
+        line = json.dumps({"ts": time.time(), "pid": os.getpid(), **event}, ensure_ascii=False, default=str)
+        try:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    def render_prometheus(self) -> str:
+        """按Prometheus文本格式输出所有指标"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+        lines = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {self.prefix}_{name} counter")
+            for (n, key), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{self.prefix}_{name}{_format_labels(key)} {value:g}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {self.prefix}_{name} histogram")
+            for (n, key), hist in sorted(histograms.items()):
+                if n != name:
+                    continue
+                for bound, count in zip(LATENCY_BUCKETS, hist):
+                    lines.append(f"{self.prefix}_{name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count:g}")
+                lines.append(f"{self.prefix}_{name}_bucket{_format_labels(key, (('le', '+Inf'),))} {hist[-1]:g}")
+                lines.append(f"{self.prefix}_{name}_sum{_format_labels(key)} {hist[-2]:.6f}")
+                lines.append(f"{self.prefix}_{name}_count{_format_labels(key)} {hist[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程级指标登记实例
+metrics = MetricsRegistry(jsonl_path=env.metrics_jsonl_path or None)
+
+
+def start_http_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = metrics) -> ThreadingHTTPServer:
+    """
+    在后台线程启动Prometheus抓取端点（GET /metrics）
+    :param port: 监听端口
+    :param host: 监听地址
+    :param registry: 指标登记实例
+    :return: HTTP服务对象
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,413 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from sqlalchemy import bindparam, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+from langchain.tools import StructuredTool
+from langchain_community.utilities.sql_database import SQLDatabase
+from Metrics import metrics
+
+# 表结构版本探测：表名、创建时间、更新时间及表注释任一变化即视为该表结构/数据变化
+TABLE_VERSION_SQL = text(
+    "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME, TABLE_COMMENT, TABLE_TYPE "
+    "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE()"
+)
+TABLE_VERSION_FILTER_SQL = text(
+    "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME, TABLE_COMMENT, TABLE_TYPE "
+    "FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN :names"
+).bindparams(bindparam("names", expanding=True))
+# MySQL 8默认缓存information_schema.TABLES统计信息（含UPDATE_TIME）最长86400秒，探测连接上关闭该缓存以读取实时值；
+# MySQL 5.7/MariaDB无此变量（统计信息本身即实时读取），设置失败时忽略
+STATS_EXPIRY_SQL = text("SET SESSION information_schema_stats_expiry = 0")
+# 流式导出/结果缓存只允许只读语句
+READ_ONLY_PATTERN = re.compile(r"^\s*(SELECT|WITH|SHOW|DESCRIBE|DESC|EXPLAIN)\b", re.IGNORECASE)
+# 语句切分时整体跳过的片段：引号字符串、反引号标识符及注释（其中的分号不是语句分隔符）
+SQL_LITERAL_PATTERN = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`|--[^\n]*|#[^\n]*|/\*.*?\*/""", re.DOTALL)
+# 结果随调用时间/会话变化的函数，含这些函数的查询不缓存结果
+NON_DETERMINISTIC_PATTERN = re.compile(
+    r"\b(?:(?:NOW|SYSDATE|CURDATE|CURTIME|UTC_DATE|UTC_TIME|UTC_TIMESTAMP|UNIX_TIMESTAMP|RAND|UUID|UUID_SHORT|"
+    r"CONNECTION_ID|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|USER|SESSION_USER|SYSTEM_USER|DATABASE|SLEEP)\s*\(|"
+    r"(?:CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|CURRENT_USER|LOCALTIME|LOCALTIMESTAMP)\b)",
+    re.IGNORECASE,
+)
+
+
+def engine_args(env) -> Dict[str, Any]:
+    """
+    根据EnvConfig生成SQLAlchemy引擎参数（连接池大小、取用前ping检测、连接回收时间）
+    :param env: EnvConfig实例
+    :return: create_engine参数字典，传给SQLDatabase.from_uri(engine_args=...)
+    """
+    return {
+        "pool_size": env.sql_pool_size,
+        "max_overflow": env.sql_max_overflow,
+        "pool_pre_ping": env.sql_pool_pre_ping,
+        "pool_recycle": env.sql_pool_recycle,
+    }
+
+
+def normalize_sql(query: str) -> str:
+    """规范化SQL文本作为缓存键：去除首尾空白及末尾分号，引号外的连续空白合并为一个空格"""
+    parts = re.split(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""", query.strip().rstrip(";").strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def split_statements(query: str) -> List[str]:
+    """按引号/注释外的分号切分SQL语句，返回去除首尾空白后的非空语句列表"""
+    statements, start, pos = [], 0, 0
+    while True:
+        semicolon = query.find(";", pos)
+        if semicolon < 0:
+            break
+        literal = SQL_LITERAL_PATTERN.search(query, pos)
+        if literal is not None and literal.start() < semicolon:
+            pos = literal.end()
+            continue
+        statements.append(query[start:semicolon])
+        start = pos = semicolon + 1
+    statements.append(query[start:])
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+class ResultCache:
+    """按字节数限制容量的LRU查询结果缓存（线程安全）"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, Dict[str, Tuple], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions: Dict[str, Tuple]) -> Optional[Any]:
+        """返回缓存结果；未命中或写入时的表版本与当前不一致（同时淘汰该条目）时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != versions:
+                self._pop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, result, versions: Dict[str, Tuple]) -> None:
+        """写入结果，超出容量时按最近最少使用淘汰；单条超过容量的结果不缓存"""
+        size = len(str(result).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (result, versions, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted
+
+    def _pop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    带表名列表和表结构描述缓存的SQLDatabase
+    sql_db_list_tables / sql_db_schema 工具直接从内存返回结果，
+    每隔probe_interval秒最多探测一次information_schema，按表的CREATE_TIME/UPDATE_TIME失效对应缓存
+    （探测连接设置information_schema_stats_expiry=0，避免MySQL 8统计信息缓存导致长时间读到旧的版本）；
+    sql_db_query 工具的只读查询结果按规范化SQL缓存，命中时按引用表的版本校验
+    """
+
+    def __init__(self, *args, probe_interval: float = 30.0, result_cache_bytes: int = 64 * 1024 * 1024, **kwargs):
+        self._cache_ready = False
+        super().__init__(*args, **kwargs)
+        self._probe_interval = probe_interval
+        self.result_cache = ResultCache(result_cache_bytes)
+        self._last_probe = 0.0
+        self._lock = threading.Lock()
+        self._table_versions: Optional[Dict[str, Tuple]] = None
+        self._table_info_cache: Dict[Tuple[str, bool], str] = {}
+        self._stats_expiry_supported = True
+        self._cache_ready = True
+
+    def _disable_stats_expiry(self, connection) -> None:
+        """在探测连接上关闭information_schema统计信息缓存（不支持该变量的数据库只尝试一次）"""
+        if not self._stats_expiry_supported:
+            return
+        try:
+            connection.execute(STATS_EXPIRY_SQL)
+        except SQLAlchemyError:
+            self._stats_expiry_supported = False
+            connection.rollback()
+
+    def _probe_table_versions(self, table_names: Optional[List[str]] = None) -> Dict[str, Tuple]:
+        """查询当前库中所有表（或指定表）的版本信息（读取实时UPDATE_TIME，不使用统计信息缓存）"""
+        with self._engine.connect() as connection:
+            self._disable_stats_expiry(connection)
+            if table_names is None:
+                rows = connection.execute(TABLE_VERSION_SQL).fetchall()
+            else:
+                rows = connection.execute(TABLE_VERSION_FILTER_SQL, {"names": list(table_names)}).fetchall()
+        return {row[0]: (str(row[1]), str(row[2]), row[3] or "", row[4]) for row in rows}
+
+    def _reload_table_names(self) -> None:
+        """表集合变化时重新读取表名（新建检查器以绕过SQLAlchemy的反射缓存）"""
+        self._inspector = inspect(self._engine)
+        self._all_tables = set(
+            list(self._inspector.get_table_names(schema=self._schema))
+            + (self._inspector.get_view_names(schema=self._schema) if self._view_support else [])
+        )
+        self._usable_tables = set(super().get_usable_table_names()) or self._all_tables
+
+    def _invalidate_table(self, table_name: str) -> None:
+        """清除单个表的结构描述缓存及已反射的表对象"""
+        for key in [key for key in self._table_info_cache if key[0] == table_name]:
+            del self._table_info_cache[key]
+        for table in list(self._metadata.tables.values()):
+            if table.name == table_name:
+                self._metadata.remove(table)
+
+    def refresh_if_stale(self, force: bool = False) -> None:
+        """按探测间隔检查表版本，失效发生变化的表缓存"""
+        if not self._cache_ready:
+            return
+        if not force and time.monotonic() - self._last_probe < self._probe_interval:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._last_probe < self._probe_interval:
+                return
+            self._last_probe = time.monotonic()
+            try:
+                versions = self._probe_table_versions()
+            except SQLAlchemyError:
+                # 无information_schema权限时保留缓存，仅依赖显式刷新
+                return
+            previous, self._table_versions = self._table_versions, versions
+            if previous is None:
+                return
+            changed = {name for name in set(versions) | set(previous) if versions.get(name) != previous.get(name)}
+            for name in changed:
+                self._invalidate_table(name)
+            if set(versions) != set(previous):
+                self._reload_table_names()
+
+    def get_table_comment(self, table_name: str) -> str:
+        """返回表注释（来自版本探测结果）"""
+        return (self._table_versions or {}).get(table_name, ("", "", "", ""))[2]
+
+    def get_usable_table_names(self) -> Iterable[str]:
+        self.refresh_if_stale()
+        return super().get_usable_table_names()
+
+    def referenced_tables(self, query: str) -> List[str]:
+        """按库中已知表名识别查询语句引用的表"""
+        tokens = set(re.findall(r"[A-Za-z0-9_$\u4e00-\u9fff]+", query))
+        return sorted(name for name in self._all_tables if name in tokens)
+
+    def run(self, command, fetch="all", include_columns: bool = False, *, parameters=None, execution_options=None):
+        """
+        在SQLDatabase.run外加查询结果缓存：键为规范化SQL及调用参数，
+        命中时用一次information_schema查询比对所引用表的版本（CREATE_TIME/UPDATE_TIME），任一表变化则重新查询
+        含NOW()/RAND()/UUID()等非确定性函数的查询不缓存；引用表UPDATE_TIME为NULL（InnoDB重启后尚未写入、
+        或存储引擎不记录）时无法确认数据版本，同样直接查询
+        """
+        cacheable = self._cache_ready and isinstance(command, str) and fetch != "cursor" \
+            and READ_ONLY_PATTERN.match(command) is not None and NON_DETERMINISTIC_PATTERN.search(command) is None
+        if not cacheable:
+            with metrics.span("sql_query", cache="bypass"):
+                return super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+
+        statement = normalize_sql(command)
+        key = (statement, fetch, include_columns, repr(parameters), repr(execution_options))
+        tables = self.referenced_tables(statement)
+        try:
+            versions = self._probe_table_versions(tables) if tables else {}
+        except SQLAlchemyError:
+            versions = {}
+        # 未识别出引用表、无法确认表版本（UPDATE_TIME为NULL）或引用视图（视图无更新时间）时不使用缓存
+        if not versions or any(version[3] == "VIEW" or version[1] == "None" for version in versions.values()):
+            with metrics.span("sql_query", cache="bypass"):
+                return super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+
+        cached = self.result_cache.get(key, versions)
+        metrics.inc("cache_requests_total", cache="sql_result", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+        with metrics.span("sql_query", cache="miss") as span:
+            result = super().run(command, fetch, include_columns, parameters=parameters, execution_options=execution_options)
+            span["bytes"] = len(str(result).encode("utf-8"))
+        self.result_cache.put(key, result, versions)
+        return result
+
+    def get_table_info(self, table_names: Optional[List[str]] = None, get_col_comments: bool = False) -> str:
+        all_table_names = list(self.get_usable_table_names())
+        if table_names is not None:
+            missing_tables = set(table_names).difference(all_table_names)
+            if missing_tables:
+                raise ValueError(f"table_names {missing_tables} not found in database")
+            all_table_names = table_names
+
+        tables = []
+        for name in all_table_names:
+            key = (name, get_col_comments)
+            info = self._table_info_cache.get(key)
+            metrics.inc("cache_requests_total", cache="sql_schema", result="miss" if info is None else "hit")
+            if info is None:
+                info = super().get_table_info([name], get_col_comments=get_col_comments)
+                comment = self.get_table_comment(name)
+                if comment:
+                    info = f"-- 表描述: {comment}\n{info}"
+                self._table_info_cache[key] = info
+            tables.append(info)
+        tables.sort()
+        return "\n\n".join(tables)
+
+
+class SQLQueryToParquetInput(BaseModel):
+    query: str = Field(description="只读SQL查询语句（SELECT/WITH/SHOW等），无需LIMIT，完整结果写入Parquet文件")
+
+
+def _arrow_schema(table: pa.Table, description: Optional[List[Tuple]] = None) -> pa.Schema:
+    """
+    以第一块数据推断Parquet文件结构，全空列按字符串处理
+    DECIMAL列由第一块数据推断的精度/小数位数只覆盖第一块的值，后续块中位数更多的值无法写入，
+    因此按游标描述（DB-API description的scale）固定为decimal128(38, scale)，没有小数位数信息时转为float64
+    :param table: 第一块数据
+    :param description: 结果游标的description（与列顺序一致），可为None
+    """
+    fields = []
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            field = pa.field(field.name, pa.string())
+        elif pa.types.is_decimal(field.type):
+            scale = description[i][5] if description and i < len(description) and len(description[i]) > 5 else None
+            if isinstance(scale, int) and 0 <= scale <= 38:
+                field = pa.field(field.name, pa.decimal128(38, scale))
+            else:
+                field = pa.field(field.name, pa.float64())
+        fields.append(field)
+    return pa.schema(fields)
+
+
+def _to_arrow(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """按既定文件结构转换数据块，字符串列中的非字符串值统一转为文本，浮点列中的Decimal转为浮点数"""
+    for field in schema:
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            df[field.name] = df[field.name].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+        elif pa.types.is_floating(field.type) and df[field.name].dtype == object:
+            df[field.name] = df[field.name].map(lambda v: None if v is None else float(v))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def stream_query_to_parquet(
+    db: SQLDatabase,
+    query: str,
+    output_dir: str,
+    chunk_rows: int = 50000,
+    preview_rows: int = 5,
+) -> str:
+    """
+    使用服务端游标流式执行只读查询，分块写入Parquet文件，内存占用与分块行数相关而与结果总行数无关
+    :param db: SQLDatabase实例
+    :param query: 只读SQL查询语句
+    :param output_dir: Parquet文件输出目录
+    :param chunk_rows: 每次从游标取回并写入的行数
+    :param preview_rows: 摘要中预览的行数
+    :return: 结果摘要（行数、字段类型、数值字段范围、预览行及文件路径），出错时返回错误信息
+    """
+    statements = split_statements(query)
+    statement = statements[0] if len(statements) == 1 else ""
+    if not READ_ONLY_PATTERN.match(statement):
+        return "Error: 仅支持单条只读查询语句（SELECT/WITH/SHOW/DESCRIBE/EXPLAIN）"
+    os.makedirs(output_dir, exist_ok=True)
+    digest = hashlib.md5(statement.encode("utf-8")).hexdigest()[:8]
+    output_path = os.path.join(output_dir, f"sql_{time.strftime('%Y%m%d_%H%M%S')}_{digest}.parquet")
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+
+    writer = None
+    total_rows = 0
+    preview = None
+    ranges: Dict[str, Tuple[Any, Any]] = {}
+    try:
+        with metrics.span("sql_parquet_export") as span, db._engine.connect() as connection:
+            if connection.dialect.name == "mysql":
+                # 下一个事务只读，服务端拒绝任何写操作
+                connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+            result = connection.execution_options(stream_results=True, max_row_buffer=chunk_rows).execute(text(statement))
+            columns = list(result.keys())
+            for rows in result.partitions(chunk_rows):
+                df = pd.DataFrame(rows, columns=columns)
+                if writer is None:
+                    schema = _arrow_schema(pa.Table.from_pandas(df, preserve_index=False), result.cursor.description)
+                    writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+                    preview = df.head(preview_rows)
+                table = _to_arrow(df, schema)
+                writer.write_table(table)
+                total_rows += table.num_rows
+                for field in schema:
+                    if pa.types.is_integer(field.type) or pa.types.is_floating(field.type) or pa.types.is_decimal(field.type):
+                        chunk_range = pc.min_max(table[field.name]).as_py()
+                        if chunk_range["min"] is None:
+                            continue
+                        low, high = ranges.get(field.name, (chunk_range["min"], chunk_range["max"]))
+                        ranges[field.name] = (min(low, chunk_range["min"]), max(high, chunk_range["max"]))
+            connection.rollback()
+            span["rows"] = total_rows
+    except Exception as e:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return f"Error: {e}"
+
+    if writer is None:
+        return f"查询结果为空，字段: {', '.join(columns)}"
+    writer.close()
+    os.replace(tmp_path, output_path)
+    metrics.inc("sql_parquet_bytes_total", os.path.getsize(output_path))
+
+    lines = [
+        f"查询结果共 {total_rows} 行 {len(schema)} 列，已完整写入Parquet文件: {output_path}",
+        f"文件大小: {os.path.getsize(output_path) / 1024 / 1024:.2f} MB，可通过 pd.read_parquet(路径, columns=[...]) 读取",
+        "字段类型: " + ", ".join(f"{field.name}({field.type})" for field in schema),
+    ]
+    if ranges:
+        lines.append("数值字段范围: " + ", ".join(f"{name}[{low}, {high}]" for name, (low, high) in ranges.items()))
+    lines.append(f"前{len(preview)}行预览:\n{preview.to_string(index=False)}")
+    return "\n".join(lines)
+
+
+def get_sql_tools(db: SQLDatabase, output_dir: str, chunk_rows: int = 50000) -> List[StructuredTool]:
+    """返回补充SQLDatabaseToolkit的SQL工具"""
+    def sql_db_query_parquet(query: str) -> str:
+        return stream_query_to_parquet(db, query, output_dir, chunk_rows=chunk_rows)
+
+    return [
+        StructuredTool.from_function(
+            func=sql_db_query_parquet,
+            name="sql_db_query_parquet",
+            description=(
+                "流式执行只读SQL查询并将完整结果写入Parquet文件，返回行数、字段类型、数值范围、前几行预览及文件路径\n"
+                "适用于结果行数较多的查询（如整表或多车型项目数据），避免完整结果以文本形式返回；后续分析或绘图通过pd.read_parquet读取该文件\n"
+                "参数:\n"
+                "- query: 只读SQL查询语句（无需LIMIT）\n"
+            ),
+            args_schema=SQLQueryToParquetInput,
+        ),
+    ]
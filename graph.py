@@ -21,9 +21,14 @@ import MCP_FemResExtract
 import MCP_Fig
 import EnvConfig
 import MCP_Chart
+import SQLTools
+import Metrics
 from langchain_mcp_adapters.client import MultiServerMCPClient
 env = EnvConfig.EnvConfig()
 tools =[]
+#指标抓取端点（Prometheus文本格式，GET /metrics）
+if env.metrics_port:
+    Metrics.start_http_server(env.metrics_port)
 
 #飞书工具
 def load_servers(file_path: str ="servers_config.json" ) -> Dict[str, Any]:
@@ -65,9 +70,16 @@ model = ChatOpenAI(
 #    base_url=env.li_api_URL_qwen,
 #    )
 
-#内置sql工具
-db = SQLDatabase.from_uri(f"mysql+pymysql://{env.user}:{env.password}@{env.host}:{env.port}/{env.database}")
+#内置sql工具（表名列表、表结构描述及查询结果缓存在内存中，按information_schema表版本失效）
+db = SQLTools.CachedSQLDatabase.from_uri(
+    f"mysql+pymysql://{env.user}:{env.password}@{env.host}:{env.port}/{env.database}",
+    engine_args=SQLTools.engine_args(env),
+    probe_interval=env.sql_schema_probe_interval,
+    result_cache_bytes=env.sql_result_cache_mb * 1024 * 1024,
+)
 tools.extend(SQLDatabaseToolkit(db=db, llm=model).get_tools())
+#大结果集流式导出为Parquet
+tools.extend(SQLTools.get_sql_tools(db, env.sql_export_path, chunk_rows=env.sql_chunk_rows))
 #内置python解释器
 # tools.append(PythonAstREPLTool())
 # 内置搜索工具